@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL 腳本共用的非同步批次 API 客戶端
+
+取代「逐筆送出 + 固定 sleep」的寫法，供各 ETL 腳本呼叫後端 API：
+
+    from batch_client import BatchClient, Job
+
+    jobs = [Job(key=record["id"], method="PATCH", path=f"/human_resources/{record['id']}", json=body) ...]
+    client = BatchClient("https://guangfu250923.pttapp.cc", concurrency=4, rate=5, checkpoint_path="update.checkpoint.jsonl")
+    result = client.run(jobs)
+
+功能特點:
+    - 併發上限: 同時最多 concurrency 個請求
+    - 速率限制: token bucket，平均每秒最多 rate 個請求（允許 burst 個瞬間突發）
+    - 自動重試: 以指數退避重試（尊重 Retry-After），其他 4xx 視為失敗不重試
+        - 429（伺服器未處理請求）: 所有方法都重試
+        - 5xx / 網路錯誤: 只重試冪等方法（GET / PUT / PATCH / DELETE）；POST 可能已在伺服器端建立資料，
+          重送會產生重複資料，因此直接視為失敗，由操作者確認後再處理
+    - 續傳紀錄: 成功的 job key 逐筆附加到 checkpoint 檔（JSON Lines），重跑時自動跳過
+    - 進度與吞吐量: 定期輸出已完成 / 成功 / 失敗 / 重試次數與每秒請求數
+
+測試:
+    base_url 可指向本機的替身伺服器（例如 uvicorn 啟動的 guanfu_backend），
+    或傳入 transport=httpx.MockTransport(handler) 完全不連網路。
+
+依賴套件:
+    pip install httpx
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import httpx
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 重送不會改變結果的方法；其他方法（POST）只在 429 時重試
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"}
+
+
+@dataclass
+class Job:
+    """單一 API 請求；key 需在同一批次中唯一（通常為資料 id 或來源列號），用於續傳。"""
+    key: str
+    method: str
+    path: str
+    json: Optional[Any] = None
+    label: str = ""
+
+
+@dataclass
+class JobResult:
+    key: str
+    ok: bool
+    status: Optional[int] = None
+    attempts: int = 0
+    response: Any = None
+    error: Optional[str] = None
+    label: str = ""
+
+
+@dataclass
+class BatchResult:
+    results: List[JobResult] = field(default_factory=list)
+    skipped: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> List[JobResult]:
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> List[JobResult]:
+        return [result for result in self.results if not result.ok]
+
+
+class TokenBucket:
+    """
+    token bucket 速率限制：每秒補充 rate 個 token，最多累積 burst 個；每個請求取用一個。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """
+    續傳紀錄（JSON Lines）：每筆成功的 job 附加一行 {"key": ..., "status": ...}，中斷後重跑時跳過這些 key。
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self.done: Set[str] = set()
+        if self.path and self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self.done.add(json.loads(line)["key"])
+        self._file = open(self.path, "a", encoding="utf-8") if self.path else None
+
+    def record(self, result: JobResult) -> None:
+        if self._file:
+            self._file.write(json.dumps({"key": result.key, "status": result.status}, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+
+class Progress:
+    """進度與吞吐量：每隔 interval 秒（以及結束時）輸出一行摘要。"""
+
+    def __init__(self, total: int, interval: float = 2.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def update(self, result: JobResult) -> None:
+        self.done += 1
+        if result.ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+            print(f"❌ 失敗: {result.label or result.key} ({result.status}) {result.error}")
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        print(
+            f"📊 {self.done}/{self.total} 完成 | ✅ {self.ok} | ❌ {self.failed} | 🔁 重試 {self.retries} | "
+            f"{self.done / elapsed:.1f} req/s | {elapsed:.1f}s"
+        )
+
+
+class BatchClient:
+    def __init__(
+            self,
+            base_url: str,
+            concurrency: int = 4,
+            rate: float = 5.0,
+            burst: Optional[int] = None,
+            max_retries: int = 5,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+            timeout: float = 30.0,
+            checkpoint_path: Optional[str] = None,
+            headers: Optional[Dict[str, str]] = None,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            progress_interval: float = 2.0,
+            on_success: Optional[Callable[[Job, JobResult], None]] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst if burst is not None else concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.checkpoint_path = checkpoint_path
+        self.headers = headers or {}
+        self.transport = transport
+        self.progress_interval = progress_interval
+        self.on_success = on_success  # 每筆成功後立即呼叫（例如寫入 manifest），中斷時已成功的結果不會遺失
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # 伺服器指定 Retry-After（秒）時優先使用，否則指數退避並加上隨機抖動
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _send(self, http: httpx.AsyncClient, bucket: TokenBucket, job: Job, progress: Progress) -> JobResult:
+        result = JobResult(key=job.key, ok=False, label=job.label)
+        idempotent = job.method.upper() in IDEMPOTENT_METHODS
+        while True:
+            result.attempts += 1
+            await bucket.acquire()
+            response = None
+            try:
+                response = await http.request(job.method, job.path, json=job.json)
+                result.status = response.status_code
+                if response.is_success:
+                    result.ok = True
+                    result.response = response.json() if response.content else None
+                    return result
+                result.error = response.text[:500]
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUS)
+            except httpx.TransportError as exc:
+                result.error = f"{type(exc).__name__}: {exc}"
+                retryable = idempotent
+            if not retryable or result.attempts > self.max_retries:
+                return result
+            progress.retries += 1
+            await asyncio.sleep(self._backoff(result.attempts, response))
+
+    async def run_async(self, jobs: Iterable[Job]) -> BatchResult:
+        checkpoint = Checkpoint(self.checkpoint_path)
+        jobs = list(jobs)
+        pending = [job for job in jobs if job.key not in checkpoint.done]
+        batch = BatchResult(skipped=len(jobs) - len(pending))
+        if batch.skipped:
+            print(f"⏭️  依續傳紀錄跳過 {batch.skipped} 筆已成功的請求")
+
+        progress = Progress(len(pending), self.progress_interval)
+        bucket = TokenBucket(self.rate, self.burst)
+        queue: asyncio.Queue = asyncio.Queue()
+        for job in pending:
+            queue.put_nowait(job)
+
+        async def worker(http: httpx.AsyncClient) -> None:
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await self._send(http, bucket, job, progress)
+                if result.ok:
+                    checkpoint.record(result)
+                    if self.on_success is not None:
+                        self.on_success(job, result)
+                batch.results.append(result)
+                progress.update(result)
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        try:
+            async with httpx.AsyncClient(
+                    base_url=self.base_url, headers=self.headers, timeout=self.timeout,
+                    limits=limits, transport=self.transport,
+            ) as http:
+                await asyncio.gather(*(worker(http) for _ in range(max(1, min(self.concurrency, len(pending))))))
+        finally:
+            checkpoint.close()
+            progress.report()
+        batch.retries = progress.retries
+        batch.elapsed = time.monotonic() - progress.started
+        return batch
+
+    def run(self, jobs: Iterable[Job]) -> BatchResult:
+        return asyncio.run(self.run_async(jobs))
@@ -1,45 +1,63 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-批量更新人力資源記錄
-根據 out.json 中的記錄，逐一發送 PATCH API 請求來更新資料庫
+批量同步人力資源記錄
+根據 out.json 中的記錄發送 API 請求同步資料庫；只送出上次同步後新增或內容有變的記錄
 
-API 格式: PATCH https://guangfu250923.pttapp.cc/human_resources/{id}
+API 格式:
+    PATCH https://guangfu250923.pttapp.cc/human_resources/{id}   # 已有資料庫 id 的記錄
+    POST  https://guangfu250923.pttapp.cc/human_resources        # 沒有 id 的新記錄，建立後 id 與 PIN 記入 manifest
 
 使用方法:
     python update_records.py                # 互動模式，會詢問確認
     python update_records.py --auto-confirm # 自動確認模式，直接執行
     python update_records.py -y             # 同上，簡短參數
+    python update_records.py -y --base-url http://localhost:8080  # 對本機替身伺服器測試
 
 參數說明:
     --auto-confirm, -y    自動確認，不需要互動輸入
+    --base-url            API 位址（預設為正式站）
+    --concurrency         同時進行的請求數（預設 4）
+    --rate                每秒最多請求數（預設 2）
+    --manifest            同步紀錄檔（預設 out.json.manifest.tsv.gz），記錄每筆來源資料的內容雜湊與資料庫 id
+    --full                忽略同步紀錄，全部重新送出
+    --prune               將來源中已消失的記錄從同步紀錄中移除（資料庫中的資料不會被刪除）
 
 依賴套件:
-    pip install requests
+    pip install httpx
 
 功能特點:
     - 安全確認: 執行前會顯示摘要並要求確認（除非使用 --auto-confirm）
-    - 錯誤處理: 包含完整的錯誤處理和日誌記錄
-    - 請求限制: 每次請求間隔 1 秒，避免過於頻繁的 API 調用
-    - 詳細日誌: 顯示每筆記錄的更新狀態和結果摘要
+    - 併發與限速: 透過 etl_scripts/batch_client.py 併發送出，並以 token bucket 限制請求速率
+    - 自動重試: 429 以指數退避重試；更新（PATCH）遇到 5xx / 網路錯誤也會重試，
+      新增（POST）則不重試以免重複建立，失敗的記錄下次執行時再送出
+    - 增量同步: 以 etl_scripts/manifest.py 比對內容雜湊，未變更的記錄不再送出，來源中消失的記錄會列出提醒
+    - 續傳: 每筆成功後立即寫入同步紀錄，中斷後重新執行只會送出尚未成功的記錄
+    - 詳細日誌: 定期顯示進度與吞吐量，最後列出失敗的記錄
     - 容錯機制: 單筆記錄失敗不會影響其他記錄的更新
 
 注意事項:
     - 確保 out.json 文件存在且格式正確
     - 確認網路連線正常，能夠訪問 API 端點
     - 腳本會自動移除請求主體中的 id 欄位
+    - 來源鍵: 有 id 的記錄以 id 識別；沒有 id 的記錄以 org + phone 識別（試算表重新匯出後仍對應到同一筆資料）
 """
 
+import argparse
 import json
-import requests
-import time
-from typing import List, Dict, Any
 import sys
-import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from batch_client import BatchClient, Job  # noqa: E402
+from manifest import Manifest, content_hash  # noqa: E402
 
 # API 設定
-BASE_URL = "https://guangfu250923.pttapp.cc/human_resources"
-REQUEST_DELAY = 1  # 每次請求間隔秒數，避免過於頻繁的請求
+BASE_URL = "https://guangfu250923.pttapp.cc"
+RESOURCE_PATH = "/human_resources"
+CONCURRENCY = 4  # 同時進行的請求數
+REQUEST_RATE = 2  # 每秒最多請求數，避免過於頻繁的請求
 
 def load_records(file_path: str) -> List[Dict[str, Any]]:
     """讀取 out.json 文件"""
@@ -61,48 +79,50 @@ def prepare_patch_data(record: Dict[str, Any]) -> Dict[str, Any]:
     patch_data.pop('id', None)  # 移除 id，因為它不應該在請求主體中
     return patch_data
 
-def update_record(record: Dict[str, Any]) -> bool:
-    """發送 PATCH 請求更新單筆記錄"""
-    record_id = record.get('id')
-    if not record_id:
-        print(f"❌ 記錄缺少 ID: {record}")
-        return False
-
-    url = f"{BASE_URL}/{record_id}"
-    patch_data = prepare_patch_data(record)
-
-    try:
-        print(f"🔄 更新記錄: {record_id} ({record.get('org', 'N/A')})")
-
-        # 發送 PATCH 請求
-        response = requests.patch(
-            url,
-            json=patch_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
-
-        if response.status_code == 200:
-            print(f"✅ 成功更新: {record_id}")
-            return True
+def source_key(record: Dict[str, Any]) -> str:
+    """來源鍵：有 id 時以 id 識別，否則以 org + phone 識別"""
+    if record.get('id'):
+        return f"id:{record['id']}"
+    return f"org+phone:{record.get('org', '')}|{record.get('phone', '')}"
+
+def build_jobs(rows: List[Tuple[str, Dict[str, Any]]], manifest: Manifest) -> List[Job]:
+    """將需要同步的記錄轉為請求：已知資料庫 id 的記錄 PATCH，其餘 POST 建立"""
+    jobs = []
+    for key, record in rows:
+        entry = manifest.get(key)
+        target_id = record.get('id') or (entry.target_id if entry else None)
+        body = prepare_patch_data(record)
+        if target_id:
+            if entry and entry.pin:
+                body['valid_pin'] = entry.pin
+            method, path = "PATCH", f"{RESOURCE_PATH}/{target_id}"
         else:
-            print(f"❌ 更新失敗: {record_id}")
-            print(f"   狀態碼: {response.status_code}")
-            print(f"   回應: {response.text}")
-            return False
-
-    except requests.exceptions.RequestException as e:
-        print(f"❌ 網路錯誤: {record_id} - {e}")
-        return False
-
-def show_summary(records: List[Dict[str, Any]]):
-    """顯示將要更新的記錄摘要"""
-    print("\n📊 準備更新的記錄摘要：")
+            method, path = "POST", f"{RESOURCE_PATH}/"
+        # job key 含內容雜湊：同一筆記錄內容改變後的請求視為新的請求（冪等鍵也隨之不同）
+        jobs.append(Job(
+            key=f"{key}@{content_hash(record)}",
+            method=method,
+            path=path,
+            json=body,
+            label=f"{target_id or '新增'} ({record.get('org', 'N/A')})",
+        ))
+    return jobs
+
+def show_summary(diff) -> None:
+    """顯示將要同步的記錄摘要"""
+    print("\n📊 準備同步的記錄摘要：")
     print("-" * 60)
-    for i, record in enumerate(records, 1):
-        print(f"{i:2d}. {record.get('id', 'N/A'):<40} | {record.get('org', 'N/A')}")
+    rows = [("新增", record) for _, record in diff.new] + [("變更", record) for _, record in diff.changed]
+    for i, (kind, record) in enumerate(rows, 1):
+        print(f"{i:2d}. [{kind}] {record.get('id', 'N/A'):<40} | {record.get('org', 'N/A')}")
     print("-" * 60)
-    print(f"總共 {len(records)} 筆記錄")
+    print(f"新增 {len(diff.new)} 筆，變更 {len(diff.changed)} 筆，未變更 {diff.unchanged} 筆（略過）")
+    for key in diff.duplicates:
+        print(f"⚠️  來源鍵重複，只處理第一筆: {key}")
+    if diff.removed:
+        print(f"⚠️  來源中已消失 {len(diff.removed)} 筆（不會刪除資料庫中的資料，請人工確認是否需結案）：")
+        for key in diff.removed:
+            print(f"    - {key}")
 
 def confirm_update(auto_confirm: bool = False) -> bool:
     """確認是否執行更新"""
@@ -125,54 +145,81 @@ def main():
     parser = argparse.ArgumentParser(description='批量更新人力資源記錄')
     parser.add_argument('--auto-confirm', '-y', action='store_true',
                        help='自動確認，不需要互動輸入')
+    parser.add_argument('--input', default='out.json', help='輸入文件')
+    parser.add_argument('--base-url', default=BASE_URL, help='API 位址')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='同時進行的請求數')
+    parser.add_argument('--rate', type=float, default=REQUEST_RATE, help='每秒最多請求數')
+    parser.add_argument('--manifest', help='同步紀錄檔（預設 <input>.manifest.tsv.gz）')
+    parser.add_argument('--full', action='store_true', help='忽略同步紀錄，全部重新送出')
+    parser.add_argument('--prune', action='store_true', help='將來源中已消失的記錄從同步紀錄中移除')
     args = parser.parse_args()
 
-    input_file = "out.json"
+    input_file = args.input
 
-    print("🚀 人力資源記錄批量更新工具")
+    print("🚀 人力資源記錄批量同步工具")
     print(f"📂 讀取文件: {input_file}")
-    print(f"🌐 API 端點: {BASE_URL}")
+    print(f"🌐 API 端點: {args.base_url}{RESOURCE_PATH}")
 
-    # 讀取記錄
+    # 讀取記錄並與上次同步的結果比對
     records = load_records(input_file)
+    manifest = Manifest(args.manifest or f"{input_file}.manifest.tsv.gz")
+    diff = manifest.diff(records, source_key, force=args.full)
 
     # 顯示摘要
-    show_summary(records)
+    show_summary(diff)
+
+    if args.prune and diff.removed:
+        manifest.forget(diff.removed)
+        manifest.save()
+        print(f"🧹 已從同步紀錄移除 {len(diff.removed)} 筆")
+
+    rows = diff.new + diff.changed
+    if not rows:
+        print("\n✅ 沒有需要同步的記錄")
+        return
 
     # 確認執行
     if not confirm_update(args.auto_confirm):
-        print("🛑 取消更新操作")
+        print("🛑 取消同步操作")
         return
 
-    # 執行批量更新
-    print(f"\n🔄 開始批量更新 (每次請求間隔 {REQUEST_DELAY} 秒)...")
-
-    success_count = 0
-    fail_count = 0
+    # 執行批量同步
+    print(f"\n🔄 開始批量同步 (併發 {args.concurrency}，每秒最多 {args.rate} 個請求)...")
 
-    for i, record in enumerate(records, 1):
-        print(f"\n[{i}/{len(records)}]", end=" ")
+    digests = {f"{key}@{content_hash(record)}": (key, content_hash(record), record.get('id')) for key, record in rows}
 
-        if update_record(record):
-            success_count += 1
-        else:
-            fail_count += 1
+    def on_success(job: Job, result) -> None:
+        # 每筆成功後立即記錄，中斷後重新執行不會重複建立
+        key, digest, record_id = digests[job.key]
+        response = result.response or {}
+        manifest.record(key, digest, str(record_id or response.get('id', '')), response.get('valid_pin'))
 
-        # 在請求之間添加延遲
-        if i < len(records):
-            time.sleep(REQUEST_DELAY)
+    client = BatchClient(
+        args.base_url,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        on_success=on_success,
+    )
+    try:
+        result = client.run(build_jobs(rows, manifest))
+    finally:
+        manifest.save()
+    success_count = len(result.succeeded)
+    fail_count = len(result.failed)
 
     # 顯示最終結果
     print("\n" + "="*60)
-    print("📊 更新結果摘要：")
+    print("📊 同步結果摘要：")
     print(f"✅ 成功: {success_count} 筆")
+    print(f"⏭️  未變更: {diff.unchanged} 筆")
     print(f"❌ 失敗: {fail_count} 筆")
-    print(f"📊 總計: {len(records)} 筆")
+    print(f"🔁 重試: {result.retries} 次")
+    print(f"📊 總計: {len(records)} 筆，耗時 {result.elapsed:.1f} 秒")
 
     if fail_count > 0:
-        print("\n⚠️  有部分記錄更新失敗，請檢查上方的錯誤訊息")
+        print("\n⚠️  有部分記錄同步失敗，請檢查上方的錯誤訊息；重新執行將只送出未成功的記錄")
     else:
-        print("\n🎉 所有記錄都已成功更新！")
+        print("\n🎉 所有記錄都已同步！")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL 增量同步用的本地 manifest：來源資料列 → (內容雜湊, 資料庫 id, PIN)
+
+每次重新匯出試算表再執行 ETL 時，只需送出新增或內容有變的資料列：
+
+    from manifest import Manifest, content_hash
+
+    manifest = Manifest("out.json.manifest.tsv.gz")
+    diff = manifest.diff(records, key_fn)
+    ...                                # 只送出 diff.new + diff.changed
+    manifest.record(key, content_hash(record), target_id, pin)   # 每筆成功後立即記錄
+    manifest.save()
+
+格式:
+    gzip 壓縮的 TSV，每行為「來源鍵 \t 內容雜湊 \t 資料庫 id \t PIN」，同一來源鍵以最後一行為準。
+    - record() 會把新的一行附加寫入並 flush，執行中斷時已成功的資料列不會遺失（讀取時略過被截斷的結尾）
+    - save() 將目前內容重寫為每個來源鍵一行，並以暫存檔改名的方式取代舊檔
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_ESCAPES = {"\\": "\\", "t": "\t", "n": "\n"}
+
+# 內容雜湊不包含的欄位（id 為資料列本身的識別，不是內容）
+HASH_EXCLUDE = {"id"}
+
+
+class Entry(NamedTuple):
+    digest: str
+    target_id: str
+    pin: str = ""
+
+
+@dataclass
+class ManifestDiff:
+    new: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    changed: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    unchanged: int = 0
+    removed: List[str] = field(default_factory=list)
+    duplicates: List[str] = field(default_factory=list)
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """資料列內容的雜湊：欄位順序不影響結果，id 等識別欄位不計入。"""
+    payload = {key: value for key, value in record.items() if key not in HASH_EXCLUDE}
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda match: _ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+class Manifest:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries: Dict[str, Entry] = {}
+        self._journal = None
+        if self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8", newline="\n") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # 中斷時寫到一半的行
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 4:
+                        key, digest, target_id, pin = (_unescape(part) for part in parts)
+                        self.entries[key] = Entry(digest, target_id, pin)
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            # 上次執行中斷時 gzip 結尾可能不完整，已讀到的資料仍有效；立即重寫，之後附加的紀錄才讀得到
+            self.save()
+
+    def get(self, key: str) -> Optional[Entry]:
+        return self.entries.get(key)
+
+    def diff(
+            self, records: Iterable[Dict[str, Any]], key_fn: Callable[[Dict[str, Any]], str], force: bool = False
+    ) -> ManifestDiff:
+        """
+        與上次同步的結果比對：
+        - new: manifest 中沒有的來源鍵
+        - changed: 內容雜湊與上次不同
+        - removed: manifest 中有、但這次來源資料中已消失的來源鍵（只回報，不刪除資料庫中的資料）
+        - duplicates: 這次來源資料中重複出現的來源鍵（只處理第一筆）
+        - force=True 時內容未變的資料列也列入 changed（全部重新送出）
+        """
+        result = ManifestDiff()
+        seen = set()
+        for record in records:
+            key = key_fn(record)
+            if key in seen:
+                result.duplicates.append(key)
+                continue
+            seen.add(key)
+            entry = self.entries.get(key)
+            if entry is None:
+                result.new.append((key, record))
+            elif force or entry.digest != content_hash(record):
+                result.changed.append((key, record))
+            else:
+                result.unchanged += 1
+        result.removed = [key for key in self.entries if key not in seen]
+        return result
+
+    def record(self, key: str, digest: str, target_id: str, pin: Optional[str] = None) -> None:
+        """記錄一筆同步成功的資料列；未提供 PIN 時沿用先前記錄的 PIN。"""
+        previous = self.entries.get(key)
+        entry = Entry(digest, target_id, pin or (previous.pin if previous else ""))
+        self.entries[key] = entry
+        if self._journal is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = gzip.open(self.path, "at", encoding="utf-8", newline="\n")
+        self._journal.write("\t".join(_escape(value) for value in (key, *entry)) + "\n")
+        self._journal.flush()
+
+    def forget(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def save(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8", newline="\n") as f:
+            for key, entry in self.entries.items():
+                f.write("\t".join(_escape(value) for value in (key, *entry)) + "\n")
+        tmp.replace(self.path)
@@ -0,0 +1,9 @@
+"""
+ETL 共用模組的測試：與各 ETL 腳本相同，將 etl_scripts 加入 sys.path 後直接 import batch_client / manifest。
+
+    cd etl_scripts && python -m pytest -q tests
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
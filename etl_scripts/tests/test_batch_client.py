@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from batch_client import BatchClient, Job, TokenBucket
+
+
+def _client(handler, **kwargs):
+    options = {"concurrency": 4, "rate": 1000, "backoff_base": 0.001, "progress_interval": 60}
+    return BatchClient("http://etl.test/", transport=httpx.MockTransport(handler), **{**options, **kwargs})
+
+
+def _jobs(count, method="PATCH"):
+    return [Job(key=str(i), method=method, path=f"/human_resources/{i}", json={"headcount_got": i}) for i in range(count)]
+
+
+class Script:
+    """
+    依請求路徑依序回傳預先安排的回應（狀態碼或例外），用完後回傳 200；記錄每條路徑的請求次數。
+    """
+
+    def __init__(self, **responses):
+        self.responses = {f"/human_resources/{key}": list(value) for key, value in responses.items()}
+        self.calls = {}
+
+    def __call__(self, request):
+        path = request.url.path
+        self.calls[path] = self.calls.get(path, 0) + 1
+        planned = self.responses.get(path)
+        outcome = planned.pop(0) if planned else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == 200:
+            return httpx.Response(200, json={"id": path.rsplit("/", 1)[-1], **json.loads(request.content)})
+        return httpx.Response(outcome, text=f"status {outcome}")
+
+
+def test_runs_all_jobs_within_concurrency():
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.005)
+        in_flight -= 1
+        return httpx.Response(200, json={"path": request.url.path})
+
+    result = _client(handler, concurrency=3).run(_jobs(12))
+
+    assert len(result.succeeded) == 12 and not result.failed
+    assert sorted(r.response["path"] for r in result.results) == sorted(
+        f"/human_resources/{i}" for i in range(12)
+    )
+    assert peak == 3
+
+
+def test_retries_transient_errors_for_idempotent_methods():
+    script = Script(**{"0": [503, 502], "1": [httpx.ConnectError("connection refused")], "2": [429]})
+
+    result = _client(script).run(_jobs(3))
+
+    assert len(result.succeeded) == 3
+    assert {r.key: r.attempts for r in result.results} == {"0": 3, "1": 2, "2": 2}
+    assert result.retries == 4
+    assert next(r for r in result.results if r.key == "0").response == {"id": "0", "headcount_got": 0}
+
+
+def test_post_only_retried_on_429():
+    script = Script(**{"0": [503], "1": [httpx.ReadTimeout("timed out")], "2": [429]})
+
+    result = _client(script).run(_jobs(3, method="POST"))
+
+    by_key = {r.key: r for r in result.results}
+    # 5xx / 網路錯誤時請求可能已建立資料，不重送
+    assert (by_key["0"].ok, by_key["0"].status, by_key["0"].attempts) == (False, 503, 1)
+    assert (by_key["1"].ok, by_key["1"].attempts) == (False, 1)
+    assert "ReadTimeout" in by_key["1"].error
+    assert (by_key["2"].ok, by_key["2"].attempts) == (True, 2)
+    assert script.calls == {"/human_resources/0": 1, "/human_resources/1": 1, "/human_resources/2": 2}
+
+
+def test_client_errors_fail_without_retry():
+    script = Script(**{"0": [400], "1": [404]})
+
+    result = _client(script).run(_jobs(2))
+
+    assert [(r.key, r.status, r.attempts, r.error) for r in sorted(result.results, key=lambda r: r.key)] == [
+        ("0", 400, 1, "status 400"), ("1", 404, 1, "status 404")
+    ]
+    assert result.retries == 0
+
+
+def test_gives_up_after_max_retries():
+    script = Script(**{"0": [503] * 10})
+
+    result = _client(script, max_retries=2).run(_jobs(1))
+
+    assert (result.failed[0].status, result.failed[0].attempts) == (503, 3)
+    assert script.calls == {"/human_resources/0": 3}
+
+
+def test_checkpoint_skips_succeeded_jobs_on_rerun(tmp_path):
+    checkpoint = tmp_path / "update.checkpoint.jsonl"
+    succeeded = []
+
+    first = _client(Script(**{"1": [400]}), checkpoint_path=str(checkpoint),
+                    on_success=lambda job, result: succeeded.append((job.key, result.status))).run(_jobs(3))
+    assert [r.key for r in first.failed] == ["1"]
+    assert sorted(succeeded) == [("0", 200), ("2", 200)]
+    lines = [json.loads(line) for line in checkpoint.read_text(encoding="utf-8").splitlines()]
+    assert sorted(line["key"] for line in lines) == ["0", "2"]
+
+    script = Script()
+    second = _client(script, checkpoint_path=str(checkpoint)).run(_jobs(3))
+    assert second.skipped == 2
+    assert [r.key for r in second.succeeded] == ["1"]
+    assert script.calls == {"/human_resources/1": 1}
+
+    third = _client(Script(), checkpoint_path=str(checkpoint)).run(_jobs(3))
+    assert (third.skipped, third.results) == (3, [])
+
+
+def test_backoff_honors_retry_after_and_grows_exponentially():
+    client = BatchClient("http://etl.test", backoff_base=0.5, backoff_max=30)
+
+    assert client._backoff(1, httpx.Response(429, headers={"Retry-After": "7"})) == 7
+    assert client._backoff(1, httpx.Response(429, headers={"Retry-After": "120"})) == 30
+    for attempt, full in [(1, 0.5), (2, 1.0), (4, 4.0), (10, 30.0)]:
+        assert full * 0.5 <= client._backoff(attempt, httpx.Response(503)) <= full
+        assert full * 0.5 <= client._backoff(attempt, None) <= full
+
+
+def test_token_bucket_limits_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=50, burst=2)
+        started = time.monotonic()
+        for _ in range(7):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 前 2 個為突發額度，其餘 5 個每個約 1/50 秒
+    assert asyncio.run(scenario()) >= 5 / 50 * 0.9
+
+
+@pytest.mark.parametrize("base_url", ["http://etl.test", "http://etl.test/"])
+def test_paths_are_joined_to_base_url(base_url):
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(204)
+
+    result = BatchClient(base_url, transport=httpx.MockTransport(handler), progress_interval=60).run(
+        [Job(key="a", method="DELETE", path="/reports/a")]
+    )
+
+    assert seen == ["http://etl.test/reports/a"]
+    assert result.succeeded[0].response is None
@@ -0,0 +1,106 @@
+import gzip
+import shutil
+
+from manifest import Entry, Manifest, content_hash
+
+
+def _key(record):
+    return record["id"]
+
+
+def test_content_hash_ignores_field_order_and_id():
+    record = {"id": "a", "org": "光復鄉公所", "headcount_need": 5, "tags": ["搬運"]}
+
+    assert content_hash(record) == content_hash({"tags": ["搬運"], "headcount_need": 5, "org": "光復鄉公所", "id": "b"})
+    assert content_hash(record) != content_hash({**record, "headcount_need": 6})
+    assert content_hash(record) != content_hash({**record, "tags": ["搬運", "清潔"]})
+
+
+def test_diff_classifies_records(tmp_path):
+    manifest = Manifest(str(tmp_path / "out.json.manifest.tsv.gz"))
+    same = {"id": "same", "org": "A"}
+    changed = {"id": "changed", "org": "B"}
+    manifest.record("same", content_hash(same), "db-1")
+    manifest.record("changed", content_hash(changed), "db-2")
+    manifest.record("gone", content_hash({"id": "gone"}), "db-3")
+
+    records = [same, {**changed, "org": "B2"}, {"id": "new", "org": "C"}, {"id": "new", "org": "C2"}]
+    diff = manifest.diff(records, _key)
+
+    assert [key for key, _ in diff.new] == ["new"]
+    assert diff.new[0][1]["org"] == "C"  # 重複的來源鍵只處理第一筆
+    assert [key for key, _ in diff.changed] == ["changed"]
+    assert diff.unchanged == 1
+    assert diff.removed == ["gone"]
+    assert diff.duplicates == ["new"]
+
+    forced = manifest.diff(records, _key, force=True)
+    assert [key for key, _ in forced.changed] == ["same", "changed"]
+    assert forced.unchanged == 0
+
+
+def test_record_survives_reload_and_keeps_pin(tmp_path):
+    path = tmp_path / "m.tsv.gz"
+    manifest = Manifest(str(path))
+    manifest.record("a", "h1", "db-1", "123456")
+    manifest.record("a", "h2", "db-1")  # 未提供 PIN 時沿用先前的 PIN
+    manifest.record("b", "h3", "db-2")
+    manifest.save()
+
+    reloaded = Manifest(str(path))
+    assert reloaded.entries == {"a": Entry("h2", "db-1", "123456"), "b": Entry("h3", "db-2", "")}
+    # save() 後每個來源鍵只有一行
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2
+
+    reloaded.forget(["b"])
+    reloaded.save()
+    assert set(Manifest(str(path)).entries) == {"a"}
+
+
+def test_keys_with_separators_round_trip(tmp_path):
+    path = tmp_path / "m.tsv.gz"
+    key = "光復鄉公所\t03-870\\1234\n第二行"
+    manifest = Manifest(str(path))
+    manifest.record(key, "h1", "db\t1", "12\\34")
+    manifest.save()
+
+    assert Manifest(str(path)).get(key) == Entry("h1", "db\t1", "12\\34")
+
+
+def test_journal_is_readable_after_interrupted_run(tmp_path):
+    path = tmp_path / "m.tsv.gz"
+    manifest = Manifest(str(path))
+    manifest.record("a", "h1", "db-1", "111111")
+    manifest.record("b", "h2", "db-2")
+
+    # 模擬執行中斷：journal 已 flush 但 gzip 結尾尚未寫入
+    crashed = tmp_path / "crashed.tsv.gz"
+    shutil.copy(path, crashed)
+    manifest.record("c", "h3", "db-3")
+    truncated = tmp_path / "truncated.tsv.gz"
+    truncated.write_bytes(path.read_bytes()[:-3])
+
+    recovered = Manifest(str(crashed))
+    assert recovered.entries == {"a": Entry("h1", "db-1", "111111"), "b": Entry("h2", "db-2", "")}
+    # 載入時已重寫為完整的 gzip，之後附加的紀錄可以讀到
+    recovered.record("d", "h4", "db-4")
+    recovered.save()
+    assert set(Manifest(str(crashed)).entries) == {"a", "b", "d"}
+
+    # 最後一行寫到一半時略過該行，不會產生內容錯誤的紀錄
+    partial = Manifest(str(truncated)).entries
+    assert {"a": manifest.get("a"), "b": manifest.get("b")}.items() <= partial.items()
+    assert partial.get("c") in (None, Entry("h3", "db-3", ""))
+
+
+def test_missing_manifest_starts_empty(tmp_path):
+    manifest = Manifest(str(tmp_path / "nested" / "m.tsv.gz"))
+    assert manifest.entries == {}
+
+    diff = manifest.diff([{"id": "a"}], _key)
+    assert ([key for key, _ in diff.new], diff.removed) == (["a"], [])
+
+    manifest.record("a", "h1", "db-1")
+    manifest.save()
+    assert Manifest(str(tmp_path / "nested" / "m.tsv.gz")).get("a") == Entry("h1", "db-1", "")
@@ -0,0 +1,6 @@
+"""
+大量資料匯入工具：讀取 CSV / JSON，逐筆以 API 相同的 Create schema 驗證，
+再以 PostgreSQL COPY 分區塊寫入暫存表並合併至目標資料表（不經過 HTTP API）。
+
+用法見 `python -m importer --help`。
+"""
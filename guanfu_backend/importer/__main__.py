@@ -0,0 +1,71 @@
+"""
+python -m importer <target> <source> [options]
+
+範例：
+    python -m importer human_resources ../etl_scripts/human_resources_etl/heavy_equipment_requirements/out.json --dry-run
+    python -m importer shelters shelters.csv --chunk-size 10000 --resume
+
+- 需在 guanfu_backend 目錄下執行，資料庫連線沿用 src.config 的設定（.env）。
+- 續傳紀錄預設為 <source>.<target>.checkpoint.json，錯誤報告預設為 <source>.<target>.errors.csv。
+- 資料庫連線中斷等 OperationalError 會中止匯入（結束碼 2），續傳紀錄停在最後一個已提交的區塊，以 --resume 繼續。
+- 結果報告預設為 <source>.<target>.results.csv（來源列號、id、狀態、新增時產生的 valid_pin）；
+  human_resources 的 PIN 只記錄在此檔，請妥善保存並交給資料提供者。
+- 匯入不經過 API，各 API 程序的回應快取只會在啟用 CHANGE_STREAM_ENABLED 時經由異動事件清除。
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from src.database import SessionLocal
+
+from .pipeline import ImportAborted, run_import
+from .readers import iter_records
+from .resources import TARGETS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m importer", description="以 COPY 大量匯入 CSV / JSON 資料")
+    parser.add_argument("target", choices=sorted(TARGETS), help="目標資料表")
+    parser.add_argument("source", type=Path, help="來源檔（CSV / JSON 陣列 / NDJSON）")
+    parser.add_argument("--format", choices=["auto", "csv", "json", "ndjson"], default="auto")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每個 COPY 區塊的筆數（每區塊一個交易）")
+    parser.add_argument("--on-conflict", choices=["update", "skip"], default="update",
+                        help="id 已存在時覆寫（update）或略過（skip）")
+    parser.add_argument("--dry-run", action="store_true", help="驗證並試寫每個區塊後回滾，不保留任何資料")
+    parser.add_argument("--resume", action="store_true", help="從續傳紀錄之後繼續")
+    parser.add_argument("--checkpoint", type=Path, help="續傳紀錄檔路徑")
+    parser.add_argument("--errors", type=Path, help="逐筆錯誤報告（CSV）路徑")
+    parser.add_argument("--results", type=Path, help="逐筆結果報告（CSV：列號、id、狀態、valid_pin）路徑")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    prefix = f"{args.source}.{args.target}"
+    db = SessionLocal()
+    try:
+        stats = run_import(
+            db,
+            args.target,
+            TARGETS[args.target],
+            args.source,
+            iter_records(args.source, args.format),
+            chunk_size=args.chunk_size,
+            on_conflict=args.on_conflict,
+            dry_run=args.dry_run,
+            checkpoint_path=args.checkpoint or Path(f"{prefix}.checkpoint.json"),
+            resume=args.resume,
+            error_path=args.errors or Path(f"{prefix}.errors.csv"),
+            results_path=args.results or Path(f"{prefix}.results.csv"),
+        )
+    except ImportAborted as exc:
+        logging.error("Aborted: %s; rerun with --resume to continue from the last committed chunk", exc)
+        logging.info("Partial: %s", exc.stats.summary())
+        return 2
+    finally:
+        db.close()
+    logging.info("Done%s: %s", " (dry run)" if args.dry_run else "", stats.summary())
+    return 1 if stats.invalid or stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
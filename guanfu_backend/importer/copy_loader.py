@@ -0,0 +1,94 @@
+import io
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .resources import ImportTarget
+
+# staging 表中記錄來源列號的欄位：同一區塊內 id 重複時以最後出現的資料為準
+_ROW_COLUMN = "import_row"
+
+
+def _csv_value(value: Any) -> str:
+    """
+    轉為 COPY ... (FORMAT csv) 的欄位值：NULL 為未加引號的空值，字串一律加引號（空字串因此不會被當成 NULL），
+    JSONB 欄位（list / dict）以 JSON 字串寫入。
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class CopyLoader:
+    """
+    以 COPY 將一個區塊的資料寫入暫存表，再以單一 INSERT ... SELECT ... ON CONFLICT 合併到目標資料表：
+    - 暫存表為 session 層級的 TEMP TABLE（ON COMMIT DELETE ROWS），每個區塊提交後自動清空。
+    - on_conflict="update" 時 id 已存在的資料以新值覆寫（preserve 欄位除外）；"skip" 時略過。
+    - 需要 PostgreSQL 與 psycopg2（使用 cursor.copy_expert）。
+    """
+
+    def __init__(self, db: Session, target: ImportTarget, columns: Sequence[str], on_conflict: str = "update"):
+        self.db = db
+        self.target = target
+        self.columns = list(columns)
+        quote = db.get_bind().dialect.identifier_preparer.quote
+        self.table = quote(target.model.__tablename__)
+        self.staging = quote(f"import_staging_{target.model.__tablename__}")
+        self.column_list = ", ".join(quote(column) for column in self.columns)
+
+        if on_conflict == "skip":
+            conflict = "DO NOTHING"
+        else:
+            assignments = [
+                f"{quote(column)} = EXCLUDED.{quote(column)}" for column in self.columns
+                if column not in target.preserve
+            ]
+            if assignments:
+                # 與 API 的 UPDATE 相同遞增資料列版本（ETag 依此判斷變更）
+                assignments.append(f"row_version = {self.table}.row_version + 1")
+            conflict = f"DO UPDATE SET {', '.join(assignments)}" if assignments else "DO NOTHING"
+        # xmax = 0 代表這一列是新插入的（不是因衝突而更新）
+        self.merge_sql = (
+            f"INSERT INTO {self.table} ({self.column_list}) "
+            f"SELECT DISTINCT ON (id) {self.column_list} FROM {self.staging} ORDER BY id, {_ROW_COLUMN} DESC "
+            f"ON CONFLICT (id) {conflict} "
+            f"RETURNING id, (xmax = 0) AS inserted"
+        )
+
+    def setup(self) -> None:
+        self.db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {self.staging} "
+            f"(LIKE {self.table} INCLUDING DEFAULTS, {_ROW_COLUMN} BIGINT) ON COMMIT DELETE ROWS"
+        ))
+        self.db.commit()
+
+    def load(self, rows: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[str], List[str]]:
+        """
+        寫入一個區塊（不提交），回傳 (新增的 id, 更新的 id)。
+        """
+        buffer = io.StringIO()
+        for number, row in rows:
+            buffer.write(",".join([*(_csv_value(row.get(column)) for column in self.columns), str(number)]))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self.staging} ({self.column_list}, {_ROW_COLUMN}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+        inserted, updated = [], []
+        for id_, is_insert in self.db.execute(text(self.merge_sql)):
+            (inserted if is_insert else updated).append(id_)
+        return inserted, updated
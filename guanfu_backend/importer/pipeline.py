@@ -0,0 +1,305 @@
+import csv
+import json
+import logging
+import time
+import typing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src import crud, events, models
+from src.enum_serializer import normalize_payload_dict
+from src.validation import simplify_errors
+
+from .copy_loader import CopyLoader
+from .readers import Record
+from .resources import ImportTarget
+
+logger = logging.getLogger(__name__)
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.skipped = 0  # 續傳時略過的已完成列
+        self.invalid = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0  # on_conflict=skip 時已存在、或同一區塊內重複 id 而未另外寫入的列
+        self.failed = 0  # 區塊寫入資料庫失敗的列
+        self.chunks = 0
+        self.started = time.monotonic()
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (
+            f"read={self.read} skipped={self.skipped} invalid={self.invalid} inserted={self.inserted} "
+            f"updated={self.updated} unchanged={self.unchanged} failed={self.failed} "
+            f"chunks={self.chunks} elapsed={elapsed:.1f}s"
+        )
+
+
+class ImportAborted(Exception):
+    """
+    資料庫連線或伺服器錯誤（OperationalError）時中止匯入；續傳紀錄停在最後一個已提交的區塊，
+    修復後以 --resume 從失敗的區塊重新開始。
+    """
+
+    def __init__(self, message: str, stats: ImportStats):
+        super().__init__(message)
+        self.stats = stats
+
+
+class Checkpoint:
+    """
+    續傳紀錄：每個區塊提交成功後寫入已完成的來源列號；來源檔或目標不同時視為新的匯入。
+    """
+
+    def __init__(self, path: Optional[Path], source: Path, target: str):
+        self.path = path
+        self.key = {"source": str(source.resolve()), "target": target}
+
+    def load(self) -> int:
+        if self.path is None or not self.path.exists():
+            return 0
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if {key: data.get(key) for key in self.key} != self.key:
+            return 0
+        return int(data.get("rows_done", 0))
+
+    def save(self, rows_done: int) -> None:
+        if self.path is None:
+            return
+        # 先寫暫存檔再改名，避免中斷時留下不完整的紀錄
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({**self.key, "rows_done": rows_done}), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+class ErrorReport:
+    """
+    逐筆錯誤報告（CSV：來源列號、錯誤內容 JSON），格式與 API 的 {field: [message]} 相同。
+    """
+
+    def __init__(self, path: Optional[Path], append: bool):
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8") if path else None
+        self._writer = csv.writer(self._file) if self._file else None
+        if self._writer and not append:
+            self._writer.writerow(["row", "errors"])
+
+    def add(self, number: int, errors: Dict[str, List[str]]) -> None:
+        if self._writer:
+            self._writer.writerow([number, json.dumps(errors, ensure_ascii=False)])
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+
+class ResultReport:
+    """
+    逐筆匯入結果（CSV：來源列號、id、狀態、valid_pin），讓匯入後可將資料 id 與 PIN 交給資料提供者：
+    - 狀態為 inserted / updated / unchanged；valid_pin 只在新增且產生了 PIN 時填入
+      （已存在的資料保留原本的 PIN，匯入時產生的值不會寫入）。
+    - 同一區塊內 id 重複時只記錄實際寫入的那一列（最後出現者）。
+    - 只記錄已提交的區塊；dry run 時不建立檔案。
+    """
+
+    def __init__(self, path: Optional[Path], append: bool):
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8") if path else None
+        self._writer = csv.writer(self._file) if self._file else None
+        if self._writer and not append:
+            self._writer.writerow(["row", "id", "status", "valid_pin"])
+
+    def add_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]], inserted: List[str], updated: List[str]) -> None:
+        if not self._writer:
+            return
+        inserted_ids, updated_ids = set(inserted), set(updated)
+        latest = {row["id"]: (number, row) for number, row in chunk}
+        for id_, (number, row) in sorted(latest.items(), key=lambda item: item[1][0]):
+            if id_ in inserted_ids:
+                self._writer.writerow([number, id_, "inserted", row.get("valid_pin") or ""])
+            else:
+                self._writer.writerow([number, id_, "updated" if id_ in updated_ids else "unchanged", ""])
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+
+def _is_json_field(annotation: Any) -> bool:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return any(_is_json_field(arg) for arg in typing.get_args(annotation))
+    if origin in (list, dict) or annotation in (list, dict):
+        return True
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _json_fields(schema: Type[BaseModel]) -> Set[str]:
+    # CSV 中的 list / dict / 內嵌物件欄位以 JSON 字串表示
+    return {name for name, field in schema.model_fields.items() if _is_json_field(field.annotation)}
+
+
+def _decode_json_fields(raw: Dict[str, Any], json_fields: Set[str]) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    data, decode_errors = {}, {}
+    for key, value in raw.items():
+        if key in json_fields and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError as exc:
+                decode_errors[key] = [f"Invalid JSON: {exc}"]
+        data[key] = value
+    return data, decode_errors
+
+
+def copy_columns(target: ImportTarget) -> List[str]:
+    """
+    COPY 的欄位：schema 中同時是資料表欄位者、id、具 Python 預設值的欄位（created_at 等），以及 valid_pin 等額外欄位。
+    未列入的欄位（例如以 SQL 預設值產生者）由資料庫套用預設值。
+    """
+    table_columns = target.model.__table__.columns
+    names = {"id"}
+    names.update(name for name in target.schema.model_fields if name in table_columns)
+    names.update(column.key for column in table_columns if column.default is not None and column.default.is_callable)
+    if target.prepare is not None and "valid_pin" in table_columns:
+        names.add("valid_pin")
+    return [column.key for column in table_columns if column.key in names]
+
+
+def _python_defaults(target: ImportTarget) -> List[Tuple[str, Any]]:
+    return [
+        (column.key, column.default.arg)
+        for column in target.model.__table__.columns
+        if column.default is not None and column.default.is_callable
+    ]
+
+
+def run_import(
+        db: Session,
+        target_name: str,
+        target: ImportTarget,
+        source: Path,
+        records: Iterable[Record],
+        chunk_size: int = 5000,
+        on_conflict: str = "update",
+        dry_run: bool = False,
+        checkpoint_path: Optional[Path] = None,
+        resume: bool = False,
+        error_path: Optional[Path] = None,
+        results_path: Optional[Path] = None,
+) -> ImportStats:
+    """
+    匯入流程：
+    - 逐筆以 Create schema 驗證（與 API 建立時相同），Enum 經 normalize_payload_dict 轉為字串；
+      驗證失敗的列寫入錯誤報告，不影響其他列。
+    - 通過驗證的資料累積成區塊，以 COPY + 合併寫入，每個區塊一個交易，記憶體用量與檔案大小無關。
+    - 來源資料帶有 id 時沿用（可重複匯入 / 更新既有資料），否則比照 ORM 預設產生。
+    - dry_run 時仍實際執行 COPY 與合併以檢查資料庫約束，但每個區塊都回滾，也不寫入續傳紀錄。
+    - resume 時從續傳紀錄的列號之後繼續；續傳紀錄只在區塊提交成功後前進。
+    - 區塊因資料違反約束而失敗時，該區塊的列寫入錯誤報告後繼續下一個區塊（與驗證失敗的列相同）；
+      OperationalError（連線中斷、資料庫停止服務等）與資料無關，重試同一區塊才有意義，因此立即中止（ImportAborted）。
+    - 已提交區塊的每一列寫入結果報告（列號、id、產生的 PIN），錯誤報告與結果報告在續傳時接續寫入。
+    """
+    stats = ImportStats()
+    checkpoint = Checkpoint(None if dry_run else checkpoint_path, source, target_name)
+    start_after = checkpoint.load() if resume else 0
+    errors = ErrorReport(error_path, append=resume and start_after > 0)
+    results = ResultReport(None if dry_run else results_path, append=resume and start_after > 0)
+    columns = copy_columns(target)
+    json_fields = _json_fields(target.schema)
+    defaults = _python_defaults(target)
+    table = target.model.__tablename__
+
+    loader = CopyLoader(db, target, columns, on_conflict=on_conflict)
+    loader.setup()
+    # COPY 直接使用 DBAPI cursor，錯誤不會包成 SQLAlchemyError
+    dbapi = db.get_bind().dialect.dbapi
+    db_errors = (SQLAlchemyError, dbapi.Error)
+    operational_errors = (OperationalError, dbapi.OperationalError)
+
+    def flush(chunk: List[Tuple[int, Dict[str, Any]]], last_number: int) -> None:
+        if chunk:
+            stats.chunks += 1
+            try:
+                inserted, updated = loader.load(chunk)
+                if target.model is models.SupplyItem:
+                    crud.refresh_supply_fulfillment(db, {row["supply_id"] for _, row in chunk})
+                events.notify(db, table, "create", inserted)
+                events.notify(db, table, "update", updated)
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+            except operational_errors as exc:
+                message = str(getattr(exc, "orig", exc)).strip()
+                try:
+                    db.rollback()
+                except db_errors:
+                    pass  # 連線已中斷時回滾也會失敗，交易由資料庫端放棄
+                logger.error("Chunk ending at row %d aborted the import: %s", last_number, message)
+                raise ImportAborted(message, stats) from exc
+            except db_errors as exc:
+                db.rollback()
+                message = str(getattr(exc, "orig", exc)).strip()
+                logger.error("Chunk ending at row %d failed: %s", last_number, message)
+                for number, _ in chunk:
+                    errors.add(number, {"general": [message]})
+                stats.failed += len(chunk)
+            else:
+                stats.inserted += len(inserted)
+                stats.updated += len(updated)
+                stats.unchanged += len(chunk) - len(inserted) - len(updated)
+                if not dry_run:
+                    results.add_chunk(chunk, inserted, updated)
+                checkpoint.save(last_number)
+        else:
+            # 區塊內的列全部驗證失敗（已寫入錯誤報告），沒有需要提交的資料
+            checkpoint.save(last_number)
+        logger.info("%s: %s", table, stats.summary())
+
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    last_number = start_after
+    try:
+        for number, raw in records:
+            stats.read += 1
+            if number <= start_after:
+                stats.skipped += 1
+                continue
+            last_number = number
+            data, decode_errors = _decode_json_fields(raw, json_fields)
+            if decode_errors:
+                stats.invalid += 1
+                errors.add(number, decode_errors)
+                continue
+            try:
+                obj_in = target.schema.model_validate(data)
+            except ValidationError as exc:
+                stats.invalid += 1
+                errors.add(number, simplify_errors(exc.errors()))
+                continue
+            row = normalize_payload_dict(obj_in.model_dump(mode="json"))  # Enum to value
+            if target.prepare is not None:
+                row_errors = target.prepare(obj_in, row)
+                if row_errors:
+                    stats.invalid += 1
+                    errors.add(number, row_errors)
+                    continue
+            if raw.get("id"):
+                row["id"] = str(raw["id"])
+            for key, default in defaults:
+                if row.get(key) is None:
+                    row[key] = default(None)
+            chunk.append((number, row))
+            if len(chunk) >= chunk_size:
+                flush(chunk, last_number)
+                chunk = []
+        if chunk or last_number > start_after:
+            flush(chunk, last_number)
+    finally:
+        errors.close()
+        results.close()
+    return stats
@@ -0,0 +1,75 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+# 讀取 JSON 陣列時每次讀入的字元數；只保留尚未解析完的部分，記憶體用量與檔案大小無關
+_JSON_READ_SIZE = 1 << 16
+
+Record = Tuple[int, Dict[str, Any]]
+
+
+def iter_csv(path: Path) -> Iterator[Record]:
+    """
+    逐列讀取 CSV（第一列為欄位名稱），產生 (列號, dict)；列號為檔案中的資料列序號（從 1 起算）。
+    空字串視為未提供，交由 schema 預設值處理。
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for number, row in enumerate(csv.DictReader(f), start=1):
+            yield number, {key: value for key, value in row.items() if key and value != ""}
+
+
+def iter_ndjson(path: Path) -> Iterator[Record]:
+    """
+    逐行讀取 NDJSON（每行一個 JSON 物件），空白行略過。
+    """
+    with open(path, encoding="utf-8") as f:
+        number = 0
+        for line in f:
+            if line.strip():
+                number += 1
+                yield number, json.loads(line)
+
+
+def iter_json_array(path: Path) -> Iterator[Record]:
+    """
+    串流讀取最外層為陣列的 JSON 檔（例如 ETL 產出的 out.json），逐一產生陣列元素，不將整個檔案載入記憶體。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8-sig") as f:
+        buffer = f.read(_JSON_READ_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path}: expected a JSON array")
+        buffer = buffer[1:]
+        number = 0
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                value, end = decoder.raw_decode(buffer)
+                # 剛好解析到緩衝區結尾時，元素可能尚未讀完（例如被截斷的數字），先補讀再解析
+                complete = eof or end < len(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                chunk = f.read(_JSON_READ_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            number += 1
+            yield number, value
+            buffer = buffer[end:]
+
+
+def iter_records(path: Path, fmt: str = "auto") -> Iterator[Record]:
+    """
+    依格式（csv / json / ndjson，auto 時依副檔名判斷）逐筆讀取來源檔。
+    """
+    if fmt == "auto":
+        fmt = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(path.suffix.lower(), "json")
+    readers = {"csv": iter_csv, "json": iter_json_array, "ndjson": iter_ndjson}
+    return readers[fmt](path)
@@ -0,0 +1,53 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from src import models, schemas
+from src.pin_related import generate_pin
+
+# 逐筆檢核 / 補值：接收已驗證的 schema 物件與即將寫入的 dict，可直接修改 dict；回傳錯誤訊息或 None
+Prepare = Callable[[BaseModel, dict], Optional[Dict[str, List[str]]]]
+
+
+class ImportTarget(NamedTuple):
+    """
+    匯入目標：ORM 模型、逐筆驗證用的 Create schema，以及與 API 建立時相同的額外檢核。
+    preserve 為資料已存在（id 相同）時合併不覆寫的欄位。
+    """
+    model: Type[models.Base]
+    schema: Type[BaseModel]
+    prepare: Optional[Prepare] = None
+    preserve: Tuple[str, ...] = ("id", "created_at")
+
+
+def _prepare_human_resource(resource_in: schemas.HumanResourceCreate, row: dict) -> Optional[Dict[str, List[str]]]:
+    # 與 POST /human_resources/ 相同：人數檢核，並為每筆產生 PIN（新增的資料列於結果報告中輸出）
+    if resource_in.headcount_got > resource_in.headcount_need:
+        return {"headcount_got": ["headcount_got must be less than or equal to headcount_need."]}
+    row["valid_pin"] = generate_pin()
+    return None
+
+
+def _prepare_supply_item(item_in: schemas.SupplyItemCreate, row: dict) -> Optional[Dict[str, List[str]]]:
+    # 與 POST /supply_items/ 相同的數量檢核；所屬供應單的到貨進度於合併後重新計算
+    if item_in.received_count is not None and item_in.received_count > item_in.total_number:
+        return {"received_count": ["Received_count must be less than or equal to total_number."]}
+    return None
+
+
+TARGETS: Dict[str, ImportTarget] = {
+    "volunteer_organizations": ImportTarget(models.VolunteerOrganization, schemas.VolunteerOrgCreate, preserve=("id",)),
+    "shelters": ImportTarget(models.Shelter, schemas.ShelterCreate),
+    "medical_stations": ImportTarget(models.MedicalStation, schemas.MedicalStationCreate),
+    "mental_health_resources": ImportTarget(models.MentalHealthResource, schemas.MentalHealthResourceCreate),
+    "accommodations": ImportTarget(models.Accommodation, schemas.AccommodationCreate),
+    "shower_stations": ImportTarget(models.ShowerStation, schemas.ShowerStationCreate),
+    "water_refill_stations": ImportTarget(models.WaterRefillStation, schemas.WaterRefillStationCreate),
+    "restrooms": ImportTarget(models.Restroom, schemas.RestroomCreate),
+    "human_resources": ImportTarget(
+        models.HumanResource, schemas.HumanResourceCreate, _prepare_human_resource,
+        preserve=("id", "created_at", "valid_pin"),
+    ),
+    "supply_items": ImportTarget(models.SupplyItem, schemas.SupplyItemCreate, _prepare_supply_item),
+    "reports": ImportTarget(models.Report, schemas.ReportCreate),
+}
@@ -0,0 +1,6 @@
+-- supply_items 補上 created_at / updated_at（Unix timestamp），
+-- 供 ETag 與條件式 GET 判斷物資項目是否變更。
+ALTER TABLE supply_items
+    ADD COLUMN IF NOT EXISTS created_at BIGINT NOT NULL DEFAULT extract(epoch FROM now())::BIGINT;
+ALTER TABLE supply_items
+    ADD COLUMN IF NOT EXISTS updated_at BIGINT NOT NULL DEFAULT extract(epoch FROM now())::BIGINT;
@@ -0,0 +1,13 @@
+-- (updated_at, id) 複合索引：支援 keyset 分頁、ETag 聚合 max(updated_at) 與 /changes 增量同步。
+-- CONCURRENTLY 不可在交易內執行，請直接以 psql -f 執行本檔。
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shelters_updated_at_id ON shelters (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medical_stations_updated_at_id ON medical_stations (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mental_health_resources_updated_at_id ON mental_health_resources (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accommodations_updated_at_id ON accommodations (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shower_stations_updated_at_id ON shower_stations (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_water_refill_stations_updated_at_id ON water_refill_stations (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_restrooms_updated_at_id ON restrooms (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_human_resources_updated_at_id ON human_resources (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supplies_updated_at_id ON supplies (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supply_items_updated_at_id ON supply_items (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reports_updated_at_id ON reports (updated_at, id);
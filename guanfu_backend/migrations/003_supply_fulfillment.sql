@@ -0,0 +1,31 @@
+-- supplies 新增到貨進度欄位（由 supply_items 彙總，於每次物資項目寫入的同一交易中更新），
+-- 取代清單查詢中逐筆檢查物資項目的 EXISTS 子查詢。
+ALTER TABLE supplies ADD COLUMN IF NOT EXISTS items_total INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE supplies ADD COLUMN IF NOT EXISTS items_fulfilled INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE supplies ADD COLUMN IF NOT EXISTS units_needed BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE supplies ADD COLUMN IF NOT EXISTS units_received BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE supplies ADD COLUMN IF NOT EXISTS is_fulfilled BOOLEAN NOT NULL DEFAULT TRUE;
+
+-- 回填既有資料（之後如需修復，可執行 python -m src.maintenance repair-supply-fulfillment）
+UPDATE supplies AS s
+SET items_total     = agg.items_total,
+    items_fulfilled = agg.items_fulfilled,
+    units_needed    = agg.units_needed,
+    units_received  = agg.units_received,
+    is_fulfilled    = agg.items_fulfilled = agg.items_total
+FROM (
+    SELECT sp.id,
+           count(si.id)                                                             AS items_total,
+           count(si.id) FILTER (WHERE coalesce(si.received_count, 0) >= si.total_number) AS items_fulfilled,
+           coalesce(sum(si.total_number), 0)                                        AS units_needed,
+           coalesce(sum(coalesce(si.received_count, 0)), 0)                         AS units_received
+    FROM supplies sp
+    LEFT JOIN supply_items si ON si.supply_id = sp.id
+    GROUP BY sp.id
+) AS agg
+WHERE s.id = agg.id;
+
+-- 只索引尚未全部到貨的供應單，預設清單依 (updated_at, id) 分頁時直接掃描此索引。
+-- CONCURRENTLY 不可在交易內執行，請直接以 psql -f 執行本檔。
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supplies_open_updated_at_id
+    ON supplies (updated_at, id) WHERE NOT is_fulfilled;
@@ -0,0 +1,70 @@
+-- 各據點資料表新增由 coordinates JSONB 產生的 lat / lng 數值欄位與 (lat, lng) 索引，
+-- 經緯度範圍查詢（/nearby、/map/pins 的索引載入）不再需要逐筆解析 JSONB。
+-- - 使用 generated column（需 PostgreSQL 12 以上）：API、importer 的 COPY 或直接以 SQL 寫入 coordinates 時皆自動同步，
+--   程式不會寫入這兩個欄位；lat / lng 不是數值（或沒有座標）時為 NULL。
+-- - ADD COLUMN ... STORED 會重寫整張表並計算既有資料列（即回填），期間持有該表的排他鎖；各據點表僅數千筆以內。
+
+ALTER TABLE shelters
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+ALTER TABLE medical_stations
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+ALTER TABLE mental_health_resources
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+ALTER TABLE accommodations
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+ALTER TABLE shower_stations
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+ALTER TABLE water_refill_stations
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+ALTER TABLE restrooms
+    ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lat') = 'number' THEN CAST(coordinates ->> 'lat' AS double precision) END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION GENERATED ALWAYS AS (
+        CASE WHEN jsonb_typeof(coordinates -> 'lng') = 'number' THEN CAST(coordinates ->> 'lng' AS double precision) END
+    ) STORED;
+
+-- CONCURRENTLY 不可在交易內執行，請直接以 psql -f 執行本檔。
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shelters_lat_lng ON shelters (lat, lng);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medical_stations_lat_lng ON medical_stations (lat, lng);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mental_health_resources_lat_lng ON mental_health_resources (lat, lng);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accommodations_lat_lng ON accommodations (lat, lng);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shower_stations_lat_lng ON shower_stations (lat, lng);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_water_refill_stations_lat_lng ON water_refill_stations (lat, lng);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_restrooms_lat_lng ON restrooms (lat, lng);
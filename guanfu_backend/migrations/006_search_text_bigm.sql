@@ -0,0 +1,62 @@
+-- 列表 q= 搜尋比對正規化後的 search_text 欄位，每張表只建立兩個 GIN 索引：
+-- - pg_bigm 以 2 字元為單位，子字串（LIKE）比對可使用索引，1～2 個中文字的詞（例如「光復」）也不會整表掃描
+--   （pg_trgm 的 trigram 需要 3 個字元）。
+-- - 錯字容忍的 word_similarity 使用 pg_trgm 索引。
+-- - pg_bigm 非 PostgreSQL 內建：Cloud SQL 需先將資料庫旗標 cloudsql.enable_pg_bigm 設為 on，自架則需安裝套件；
+--   pg_trgm 為內建 contrib extension。兩者皆需有建立 extension 的權限。
+-- - 資料庫 LC_CTYPE 須為 UTF-8 locale（例如 en_US.UTF-8、C.UTF-8），C locale 下 pg_trgm 會忽略中文字元；
+--   可用 SELECT show_trgm('中正路一段'); 確認結果不為空陣列。
+-- - search_text 為 generated column（需 PostgreSQL 13 以上的 normalize()，資料庫編碼須為 UTF8）：
+--   搜尋欄位以換行串接後轉為 NFKC 並轉小寫，與應用程式對 q 的正規化（search.normalize_text）相同；
+--   API、importer 的 COPY 或直接以 SQL 寫入時皆自動同步，程式不會寫入此欄位。
+-- - ADD COLUMN ... STORED 會重寫整張表並計算既有資料列（即回填），期間持有該表的排他鎖。
+-- - 未執行本檔時可設定 SEARCH_BACKEND=memory，改用行程內索引。
+CREATE EXTENSION IF NOT EXISTS pg_bigm;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE human_resources
+    ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+        lower(normalize(coalesce(org, '') || chr(10) || coalesce(address, '') || chr(10) || coalesce(role_name, ''), NFKC))
+    ) STORED;
+
+ALTER TABLE supplies
+    ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+        lower(normalize(coalesce(name, '') || chr(10) || coalesce(address, ''), NFKC))
+    ) STORED;
+
+ALTER TABLE supply_items
+    ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+        lower(normalize(coalesce(name, ''), NFKC))
+    ) STORED;
+
+ALTER TABLE shelters
+    ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+        lower(normalize(coalesce(name, '') || chr(10) || coalesce(location, ''), NFKC))
+    ) STORED;
+
+ALTER TABLE accommodations
+    ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+        lower(normalize(coalesce(name, '') || chr(10) || coalesce(address, ''), NFKC))
+    ) STORED;
+
+ALTER TABLE volunteer_organizations
+    ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+        lower(normalize(coalesce(organization_name, ''), NFKC))
+    ) STORED;
+
+-- 以下 CONCURRENTLY 不可在交易內執行，請直接以 psql -f 執行本檔。
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_human_resources_search_text_bigm ON human_resources USING gin (search_text gin_bigm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_human_resources_search_text_trgm ON human_resources USING gin (search_text gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supplies_search_text_bigm ON supplies USING gin (search_text gin_bigm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supplies_search_text_trgm ON supplies USING gin (search_text gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supply_items_search_text_bigm ON supply_items USING gin (search_text gin_bigm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supply_items_search_text_trgm ON supply_items USING gin (search_text gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shelters_search_text_bigm ON shelters USING gin (search_text gin_bigm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_shelters_search_text_trgm ON shelters USING gin (search_text gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accommodations_search_text_bigm ON accommodations USING gin (search_text gin_bigm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accommodations_search_text_trgm ON accommodations USING gin (search_text gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_volunteer_organizations_search_text_bigm
+    ON volunteer_organizations USING gin (search_text gin_bigm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_volunteer_organizations_search_text_trgm
+    ON volunteer_organizations USING gin (search_text gin_trgm_ops);
+
@@ -0,0 +1,17 @@
+-- 各資源資料表新增 row_version（資料列版本），ETag 改以 (id, row_version) 計算：
+-- updated_at 只精確到秒，同一秒內的第二次寫入不會改變 ETag，用戶端會收到過期的 304。
+-- - 新增時為 1；程式的每個 UPDATE（含條件式 UPDATE、批次更新與 importer 的合併寫入）在同一陳述式中加 1。
+-- - ADD COLUMN ... DEFAULT 常數（PostgreSQL 11 以上）只修改系統目錄，不會重寫資料表，既有資料列皆為 1。
+
+ALTER TABLE volunteer_organizations ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE shelters ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE medical_stations ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE mental_health_resources ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE shower_stations ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE water_refill_stations ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE restrooms ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE human_resources ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE supplies ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE supply_items ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
@@ -0,0 +1,173 @@
+"""
+輸入建議（/autocomplete）：
+- 各欄位的相異值依正規化後的文字（全形轉半形、忽略大小寫，與 q= 搜尋相同）放在排序陣列中，
+  以二分搜尋找出前綴範圍，依出現次數取前幾名，回傳最常見的原始寫法；查詢不存取資料庫。
+- 啟動時於背景載入；本 worker 經由 API 的寫入立即逐筆更新（observe），改名時舊值的次數一併扣除。
+- 其他 worker 的寫入使資料表的快取世代號變更時，下一次查詢重新載入（與地理、搜尋索引相同）；
+  不經過 API 的寫入（例如 importer）最晚在 AUTOCOMPLETE_REFRESH_SECONDS 後反映。
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import crud_async
+from .cache import response_cache
+from .config import settings
+from .database import DbSession
+from .resources import AUTOCOMPLETE_FIELDS
+from .search import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 大於所有字元的哨兵，前綴範圍為 [prefix, prefix + _MAX_CHAR)
+_MAX_CHAR = "\U0010ffff"
+
+
+class PrefixIndex:
+    """
+    單一欄位的前綴索引：
+    - keys 為正規化後相異值的排序陣列；totals 為各值的出現次數，forms 為各原始寫法的次數。
+    - values 記錄每筆資料列目前的值，更新時才能扣除舊值。
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, Optional[str]]]):
+        self.values: Dict[str, str] = {}
+        self.totals: Dict[str, int] = defaultdict(int)
+        self.forms: Dict[str, Counter] = defaultdict(Counter)
+        for id_, value in rows:
+            value = (value or "").strip()
+            key = normalize_text(value)
+            if key:
+                self.values[id_] = value
+                self.totals[key] += 1
+                self.forms[key][value] += 1
+        self.keys: List[str] = sorted(self.totals)
+
+    def _add(self, value: str) -> None:
+        key = normalize_text(value)
+        if key not in self.totals:
+            bisect.insort(self.keys, key)
+        self.totals[key] += 1
+        self.forms[key][value] += 1
+
+    def _remove(self, value: str) -> None:
+        key = normalize_text(value)
+        self.totals[key] -= 1
+        self.forms[key][value] -= 1
+        if self.forms[key][value] <= 0:
+            del self.forms[key][value]
+        if self.totals[key] <= 0:
+            del self.totals[key]
+            del self.forms[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def observe(self, id_: str, value: Optional[str]) -> None:
+        """
+        記錄一筆資料列寫入後的值（新增或更新）。
+        """
+        value = (value or "").strip()
+        if not normalize_text(value):
+            value = ""
+        previous = self.values.get(id_, "")
+        if previous == value:
+            return
+        if previous:
+            self._remove(previous)
+        if value:
+            self._add(value)
+            self.values[id_] = value
+        else:
+            self.values.pop(id_, None)
+
+    def suggest(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """
+        以 prefix 開頭的值（依出現次數由多到少，同次數依字序），回傳 (最常見的原始寫法, 次數)。
+        """
+        key = normalize_text(prefix)
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_left(self.keys, key + _MAX_CHAR, start)
+        best = heapq.nsmallest(limit, self.keys[start:end], key=lambda k: -self.totals[k])
+        return [(self.forms[k].most_common(1)[0][0], self.totals[k]) for k in best]
+
+    def stats(self) -> Dict[str, int]:
+        return {"rows": len(self.values), "distinct": len(self.keys)}
+
+
+class _Snapshot(NamedTuple):
+    index: PrefixIndex
+    generation: int
+    loaded_at: float
+
+
+class AutocompleteIndexes:
+    """
+    各欄位的 PrefixIndex，首次使用時載入，查詢前檢查世代號與存活時間，過期時重新載入；
+    同一欄位同時只會有一個請求重新載入，其他請求等待同一次結果。
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def _fresh(self, field: str) -> Optional[PrefixIndex]:
+        snapshot = self._snapshots.get(field)
+        if snapshot is None:
+            return None
+        if snapshot.generation != response_cache.generation(AUTOCOMPLETE_FIELDS[field].model.__tablename__):
+            return None
+        if time.monotonic() - snapshot.loaded_at > settings.AUTOCOMPLETE_REFRESH_SECONDS:
+            return None
+        return snapshot.index
+
+    async def get(self, db: DbSession, field: str) -> PrefixIndex:
+        index = self._fresh(field)
+        if index is not None:
+            return index
+        async with self._locks[field]:
+            index = self._fresh(field)
+            if index is not None:
+                return index
+            target = AUTOCOMPLETE_FIELDS[field]
+            # 先取世代號再讀資料：讀取期間若有其他 worker 寫入，之後會再重新載入
+            generation = response_cache.generation(target.model.__tablename__)
+            index = PrefixIndex(await crud_async.get_column_values(db, target.model, target.column))
+            self._snapshots[field] = _Snapshot(index, generation, time.monotonic())
+            return index
+
+    def observe(self, model, rows: Iterable) -> None:
+        """
+        本 worker 寫入後呼叫（rows 為寫入後的 ORM 物件），更新已載入的相關欄位；尚未載入的欄位載入時自然包含這些資料。
+        """
+        rows = list(rows)
+        for field, target in AUTOCOMPLETE_FIELDS.items():
+            snapshot = self._snapshots.get(field)
+            if target.model is not model or snapshot is None:
+                continue
+            for row in rows:
+                snapshot.index.observe(row.id, getattr(row, target.column))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {field: snapshot.index.stats() for field, snapshot in self._snapshots.items()}
+
+
+autocomplete_indexes = AutocompleteIndexes()
+
+
+async def warm_up(session_factory: Callable[[], DbSession]) -> None:
+    """
+    啟動時預先載入所有欄位；失敗時只記錄警告，第一次查詢時會再載入。
+    """
+    db = session_factory()
+    try:
+        for field in AUTOCOMPLETE_FIELDS:
+            await autocomplete_indexes.get(db, field)
+    except SQLAlchemyError:
+        logger.warning("Autocomplete warm-up failed; indexes will load on first use", exc_info=True)
+    finally:
+        db.close()
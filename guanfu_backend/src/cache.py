@@ -0,0 +1,299 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from .config import settings
+from .events import WORKER_ID
+
+# 可快取的資源前綴（與資料表名稱、router prefix 相同）
+CACHEABLE_NAMESPACES = {
+    "shelters", "reports", "volunteer_organizations", "accommodations",
+    "human_resources", "medical_stations", "mental_health_resources",
+    "restrooms", "shower_stations", "water_refill_stations",
+    "supplies", "supply_items",
+}
+
+# 資料表寫入時需要一併清除的快取命名空間（供應單回應內嵌了物資項目）
+TABLE_NAMESPACES: Dict[str, Tuple[str, ...]] = {
+    "supply_items": ("supply_items", "supplies"),
+}
+
+# 不經過快取的路徑：全量匯出為串流回應，且內容依 Accept-Encoding 而不同
+UNCACHED_SUFFIXES = ("/export",)
+
+# 超過此大小的回應不放入快取（例如大量匯出）
+MAX_CACHED_BODY_BYTES = 1024 * 1024
+
+
+class CacheBackend(ABC):
+    """
+    快取儲存後端介面：
+    - get/set 存取已序列化的回應位元組。
+    - incr 用於命名空間世代號（generation），清除快取只需遞增世代號，舊鍵自然過期。
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    行程內 LRU + TTL 快取：
+    - 超過 max_entries 時淘汰最久未使用的項目。
+    - 讀取時檢查到期時間，過期即刪除。
+    - 以 Lock 保護，供 threadpool 中的同步路由與事件迴圈同時使用。
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis 相容後端，傳入任何具備 get/set(ex=)/incr 的 client 即可
+    （redis-py、fakeredis 或其他相容實作），多個 worker 可共用同一份快取與世代號。
+    """
+
+    def __init__(self, client, prefix: str = "guanfu:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def get_counter(self, key: str) -> int:
+        value = self.client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """
+    GET 回應快取：
+    - 快取鍵 = 命名空間世代號 + 路徑 + 正規化（排序、去除空值）後的查詢參數。
+    - invalidate(table) 遞增對應命名空間的世代號，使該資源的所有列表/單筆回應失效。
+    - 記錄 hit/miss/invalidation 次數供 /system/cache 查詢。
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query_string: str) -> str:
+        return urlencode(sorted(parse_qsl(query_string, keep_blank_values=False)))
+
+    def key(self, namespace: str, path: str, query_string: str) -> str:
+        """
+        在查詢資料庫「之前」取得快取鍵；若處理期間有寫入使世代號遞增，
+        寫回的內容會落在舊世代而不會被後續請求讀到。
+        """
+        return f"{namespace}:{self.generation(namespace)}:{path}?{self.normalize_query(query_string)}"
+
+    def generation(self, namespace: str) -> int:
+        """
+        命名空間目前的世代號；其他行程內快取（例如地理索引）可據此判斷資料是否已變更。
+        """
+        return self.backend.get_counter(f"gen:{namespace}")
+
+    def get(self, key: str) -> Optional[Tuple[int, List[Tuple[bytes, bytes]], bytes]]:
+        raw = self.backend.get(key)
+        with self._stats_lock:
+            if raw is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if raw is None:
+            return None
+        head, body = raw.split(b"\n", 1)
+        meta = json.loads(head)
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["h"]]
+        return meta["s"], headers, body
+
+    def set(self, key: str, status: int, headers: Iterable[Tuple[bytes, bytes]], body: bytes) -> None:
+        meta = {"s": status, "h": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers]}
+        raw = json.dumps(meta).encode("utf-8") + b"\n" + body
+        self.backend.set(key, raw, self.ttl)
+
+    def invalidate(self, *tables: str) -> None:
+        namespaces = set()
+        for table in tables:
+            namespaces.update(TABLE_NAMESPACES.get(table, (table,)))
+        for namespace in namespaces:
+            self.backend.incr(f"gen:{namespace}")
+        with self._stats_lock:
+            self.invalidations += len(namespaces)
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+
+def invalidate_from_event(event: Dict) -> None:
+    """
+    其他 worker 的寫入事件（LISTEN/NOTIFY）到達時，清除本 worker 對應的快取。
+    """
+    if event.get("origin") != WORKER_ID and event.get("table"):
+        response_cache.invalidate(event["table"])
+
+
+def _build_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        # redis 為選用套件，僅在設定使用時才載入
+        import redis
+        return RedisCacheBackend(redis.Redis.from_url(settings.REDIS_URL))
+    return MemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_build_backend(), ttl=settings.CACHE_TTL_SECONDS)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    依 RFC 7232 比對 If-None-Match（弱比較，允許多個值或 *）。
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware：攔截資源的 GET 請求，命中時直接回傳快取內容（不觸及資料庫），
+    未命中時照常處理並在 200 回應時寫入快取。回應會附上 X-Cache: HIT/MISS。
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        namespace = path.strip("/").split("/", 1)[0]
+        if namespace not in CACHEABLE_NAMESPACES or path.rstrip("/").endswith(UNCACHED_SUFFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        key = self.cache.key(namespace, path, query_string)
+        cached = self.cache.get(key)
+        if cached is not None:
+            status, headers, body = cached
+            etag = dict(headers).get(b"etag")
+            if etag is not None and etag_matches(_header(scope, b"if-none-match"), etag.decode("latin-1")):
+                # 用戶端持有的版本與快取一致，直接回 304
+                await send({"type": "http.response.start", "status": 304,
+                            "headers": [(b"etag", etag), (b"x-cache", b"HIT")]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({"type": "http.response.start", "status": status,
+                        "headers": headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        captured = {"status": None, "headers": [], "chunks": [], "size": 0, "cacheable": True}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = list(message.get("headers", []))
+                captured["cacheable"] = message["status"] == 200
+                message = dict(message)
+                message["headers"] = captured["headers"] + [(b"x-cache", b"MISS")]
+            elif message["type"] == "http.response.body" and captured["cacheable"]:
+                chunk = message.get("body", b"")
+                captured["size"] += len(chunk)
+                if captured["size"] > MAX_CACHED_BODY_BYTES:
+                    captured["cacheable"] = False
+                    captured["chunks"] = []
+                else:
+                    captured["chunks"].append(chunk)
+                    if not message.get("more_body", False):
+                        self.cache.set(key, captured["status"], captured["headers"], b"".join(captured["chunks"]))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,3 +1,6 @@
+from typing import Optional
+
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -25,6 +28,71 @@ class Settings(BaseSettings):
     # PROD_SERVER_URL 可以有預設值，因為它不是敏感資訊
     PROD_SERVER_URL: str = "https://guangfu250923.pttapp.cc"
 
+    # 回應快取：memory（行程內 LRU+TTL）或 redis（需安裝 redis 套件並設定 REDIS_URL）
+    # memory 的快取內容與世代號只存在於單一行程，需搭配 CHANGE_STREAM_ENABLED 才能得知其他 worker 的寫入；
+    # 未設定 CACHE_ENABLED 時，只在 redis 或已啟用異動推播時開啟
+    CACHE_ENABLED: Optional[bool] = None
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: int = 30
+    CACHE_MAX_ENTRIES: int = 2048
+    REDIS_URL: Optional[str] = None
+
+    # /changes 增量同步的水位線保留秒數，避免遺漏同一秒內尚未提交的寫入
+    CHANGES_SAFETY_LAG_SECONDS: int = 2
+
+    # 即時異動推播（SSE / WebSocket），以 Postgres LISTEN/NOTIFY 在 worker 間傳遞事件
+    CHANGE_STREAM_ENABLED: bool = False
+    STREAM_MAX_SUBSCRIBERS: int = 1000
+    STREAM_QUEUE_SIZE: int = 100
+    STREAM_HEARTBEAT_SECONDS: int = 15
+
+    # 非同步資料庫模式（asyncpg + AsyncSession），需安裝 asyncpg；預設沿用同步 psycopg2
+    DB_ASYNC: bool = False
+    DB_ASYNC_POOL_SIZE: int = 20
+    DB_ASYNC_MAX_OVERFLOW: int = 20
+
+    # 全量匯出（/{resource}/export）每批讀取的筆數（yield_per）
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # 地理查詢（/nearby）的行程內索引：資料表寫入時依快取世代號重建；
+    # 不經過 API 的寫入（例如 importer）最晚在此秒數後反映
+    GEO_INDEX_TTL_SECONDS: int = 60
+
+    # 地圖圖釘（/map/pins）：zoom 小於等於 MAP_CLUSTER_MAX_ZOOM 時回傳叢集；
+    # 單次回應最多 MAP_MAX_PINS 個個別圖釘，超過時改回傳叢集；叢集最多涵蓋 MAP_MAX_TILES 個圖磚
+    MAP_CLUSTER_MAX_ZOOM: int = 14
+    MAP_MAX_PINS: int = 1000
+    MAP_MAX_TILES: int = 64
+    MAP_TILE_CACHE_SIZE: int = 4096
+
+    # 列表的 q= 搜尋：auto 在 PostgreSQL 上使用 search_text 欄位（pg_bigm / pg_trgm 索引），其他資料庫使用行程內倒排索引；
+    # 可強制設為 postgres 或 memory（例如資料庫尚未執行 migrations/006 時）。
+    # SEARCH_FUZZY_THRESHOLD 為錯字容忍的相似度門檻（比照 pg_trgm.word_similarity_threshold 預設值）
+    SEARCH_BACKEND: str = "auto"
+    SEARCH_FUZZY_THRESHOLD: float = 0.6
+    SEARCH_INDEX_TTL_SECONDS: int = 60
+
+    # 自動完成（/autocomplete）：本 worker 的寫入立即反映，資料表的快取世代號變更時重新載入；
+    # 不經過 API 的寫入（例如 importer）最晚在此秒數後反映
+    AUTOCOMPLETE_REFRESH_SECONDS: int = 300
+
+    @model_validator(mode="after")
+    def resolve_cache_enabled(self) -> "Settings":
+        """
+        決定是否啟用回應快取：
+        - 未設定時，只在快取可跨 worker 失效（redis 後端或已啟用異動推播）時啟用。
+        - 明確啟用 memory 快取卻未啟用異動推播時拒絕啟動，避免各 worker 回傳其他 worker 已更新前的舊資料。
+        """
+        shared = self.CACHE_BACKEND == "redis" or self.CHANGE_STREAM_ENABLED
+        if self.CACHE_ENABLED is None:
+            self.CACHE_ENABLED = shared
+        elif self.CACHE_ENABLED and not shared:
+            raise ValueError(
+                "CACHE_ENABLED with CACHE_BACKEND=memory requires CHANGE_STREAM_ENABLED "
+                "so writes on other workers invalidate this worker's cache; use CACHE_BACKEND=redis instead"
+            )
+        return self
+
 
 # 建立一個全域的 settings 實例供整個專案引用
 settings = Settings()
@@ -1,37 +1,280 @@
-from typing import List, Optional, Type, TypeVar
+from typing import List, Optional, Tuple, Type, TypeVar
 
 from fastapi import HTTPException
 from pydantic import BaseModel
-from sqlalchemy import exists, and_
+from sqlalchemy import case, exists, and_, or_, func, insert, literal, select, tuple_, update as sql_update
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
 from . import models
 from .schemas import SupplyCreate, SupplyItemDistribution
 from .pin_related import generate_pin
+from .pagination import keyset_columns, paginate
+from .cache import response_cache
+from . import events
 from .enum_serializer import *
 
 ModelType = TypeVar("ModelType", bound=models.Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# 條件式 UPDATE 沒有命中、但重新查詢時各項檢核都通過（期間資料已被其他請求修改）
+CONCURRENT_UPDATE_DETAIL = "The record was modified by another request; please retry."
 
-def get_by_id(db: Session, model: Type[ModelType], id: str) -> Optional[ModelType]:
-    return db.query(model).filter(model.id == id).first()
 
+def _committed(*tables: str) -> None:
+    """
+    交易提交後的共同處理：清除受影響資料表的回應快取。
+    """
+    response_cache.invalidate(*tables)
+
+
+def supply_fulfillment_values() -> dict:
+    """
+    由物資項目彙總供應單到貨進度的欄位值（以 supplies 為外層的相關子查詢，供 UPDATE supplies 使用）。
+    received_count 為 NULL 視為 0；沒有物資項目的供應單視為已全部到貨。
+    """
+    item = models.SupplyItem
+    received = func.coalesce(item.received_count, 0)
+
+    def aggregate(expression):
+        return select(expression).where(item.supply_id == models.Supply.id).scalar_subquery()
+
+    return {
+        "items_total": aggregate(func.count(item.id)),
+        "items_fulfilled": aggregate(func.count(item.id).filter(received >= item.total_number)),
+        "units_needed": aggregate(func.coalesce(func.sum(item.total_number), 0)),
+        "units_received": aggregate(func.coalesce(func.sum(received), 0)),
+        "is_fulfilled": ~exists().where(item.supply_id == models.Supply.id, received < item.total_number),
+    }
+
+
+def refresh_supply_fulfillment(db: Session, supply_ids, only_drifted: bool = False) -> List[str]:
+    """
+    重新計算供應單的到貨進度並更新 updated_at（不提交，由呼叫端的交易一併提交）：
+    - 物資項目寫入時於同一交易呼叫，讓內嵌物資項目的供應單 ETag 與未滿足篩選能反映項目變化。
+    - 先以 SELECT ... FOR UPDATE 鎖定供應單，再以另一條陳述式彙總：同一供應單的並行寫入依序計算，
+      後者的快照一定包含前者已提交的物資項目，不會以舊值覆蓋。
+    - only_drifted=True 時只更新與彙總結果不一致的供應單（修復工作使用）。
+    回傳實際更新的供應單 id。
+    """
+    supply_ids = sorted(set(supply_ids))
+    if not supply_ids:
+        return []
+    db.execute(
+        select(models.Supply.id).where(models.Supply.id.in_(supply_ids)).order_by(models.Supply.id).with_for_update()
+    )
+    values = supply_fulfillment_values()
+    stmt = sql_update(models.Supply).where(models.Supply.id.in_(supply_ids))
+    if only_drifted:
+        stmt = stmt.where(or_(*(getattr(models.Supply, name) != value for name, value in values.items())))
+    updated_ids = db.execute(
+        stmt.values(**values, updated_at=models.current_timestamp_int())
+        .returning(models.Supply.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    events.notify(db, models.Supply.__tablename__, "update", updated_ids)
+    return updated_ids
+
+
+def repair_supply_fulfillment(db: Session, batch_size: int = 500) -> int:
+    """
+    回填 / 修復所有供應單的到貨進度（依 id 分批，每批各自提交），回傳修正的筆數。
+    """
+    repaired = 0
+    last_id = None
+    while True:
+        query = select(models.Supply.id).order_by(models.Supply.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(models.Supply.id > last_id)
+        batch = db.execute(query).scalars().all()
+        if not batch:
+            break
+        updated_ids = refresh_supply_fulfillment(db, batch, only_drifted=True)
+        db.commit()
+        if updated_ids:
+            _committed(models.Supply.__tablename__)
+        repaired += len(updated_ids)
+        last_id = batch[-1]
+    return repaired
+
+
+def _affected_tables(model: Type[ModelType]) -> Tuple[str, ...]:
+    # 物資項目的寫入會一併更新所屬供應單
+    if model is models.SupplyItem:
+        return models.SupplyItem.__tablename__, models.Supply.__tablename__
+    return (model.__tablename__,)
+
+
+def get_by_id(db: Session, model: Type[ModelType], id: str, *options) -> Optional[ModelType]:
+    """
+    以 id 取得單筆資料；options 可帶入 joinedload 等載入策略，
+    讓回應需要的關聯在 session 內就載入（非同步模式下無法於序列化時延遲載入）。
+    """
+    return db.query(model).options(*options).filter(model.id == id).first()
+
+
+def get_by_ids(db: Session, model: Type[ModelType], ids) -> List[ModelType]:
+    """
+    以單一 IN 查詢取得多筆資料（批次更新前載入目標用），不存在的 id 不會出現在結果中。
+    """
+    return db.query(model).filter(model.id.in_(set(ids))).all()
+
+
+def get_row(db: Session, model: Type[ModelType], id: str, columns):
+    """
+    以 Core select() 只取出指定欄位的單筆資料列（稀疏欄位集 / 快速序列化用）。
+    """
+    return db.execute(select(*columns).where(model.id == id)).first()
+
+
+def get_points(db: Session, model: Type[ModelType], address_column: str) -> List:
+    """
+    取出據點的 (id, name, status, address, lat, lng)，供行程內地理索引建立使用（只讀取座標有效的資料列）。
+    """
+    stmt = select(
+        model.id, model.name, model.status, getattr(model, address_column).label("address"), model.lat, model.lng
+    ).where(model.lat.between(-90, 90), model.lng.between(-180, 180))
+    return db.execute(stmt).all()
 
-def get_multi(db: Session, model: Type[ModelType], skip: int = 0, limit: int = 100, **filters) -> List[Type[ModelType]]:
-    query = db.query(model)
+
+def _empty_page_total(skip: int, cursor: Optional[str], count_rows) -> int:
+    # 本頁沒有資料時拿不到附帶的總數；第一頁為空即代表總數為 0，其餘情況才補一次 count
+    if not cursor and skip == 0:
+        return 0
+    return count_rows()
+
+
+def get_page(
+        db: Session, model: Type[ModelType], skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+        include_total: bool = True, query=None, **filters
+) -> Tuple[List[ModelType], Optional[int]]:
+    """
+    以單一查詢同時取得分頁資料（ORM 物件）與總筆數：
+    - 總筆數以不相關子查詢 (SELECT count(*) ...) 附在每一列上，Postgres 只會計算一次，
+      且不受 cursor/offset 條件影響（仍是整個篩選結果的總數）。
+    - include_total=False 時完全不計算總數，回傳 None。
+    - 可傳入已組好條件的 query（例如供應單的未滿足篩選），filters 會再套用於其上。
+    """
+    query = db.query(model) if query is None else query.with_session(db)
     if filters:
         query = query.filter_by(**normalize_filters_dict(filters))  # Enum to value
-    return query.offset(skip).limit(limit).all()
+    if not include_total:
+        return paginate(query, model, skip=skip, limit=limit, cursor=cursor).all(), None
+
+    total_subquery = query.with_entities(func.count(model.id)).order_by(None).scalar_subquery()
+    rows = paginate(
+        query.add_columns(total_subquery.label("total")), model, skip=skip, limit=limit, cursor=cursor
+    ).all()
+    if rows:
+        return [row[0] for row in rows], rows[0][1]
+    return [], _empty_page_total(skip, cursor, lambda: query.order_by(None).count())
+
+
+def get_page_rows(
+        db: Session, model: Type[ModelType], columns, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+        include_total: bool = True, **filters
+) -> Tuple[List, Optional[int]]:
+    """
+    與 get_page 相同的篩選、分頁與總筆數（同一條查詢），但以 Core select() 只取出指定欄位的資料列
+    （不建立 ORM 物件），供 serialization.RowSerializer 直接轉為回應。
+    總筆數附在每列的最後一欄，RowSerializer 依欄位位置讀取，不受影響。
+    """
+    stmt = select(*columns)
+    if filters:
+        stmt = stmt.filter_by(**normalize_filters_dict(filters))  # Enum to value
+    if not include_total:
+        return db.execute(paginate(stmt, model, skip=skip, limit=limit, cursor=cursor)).all(), None
+
+    total_subquery = stmt.with_only_columns(func.count(model.id)).scalar_subquery()
+    rows = db.execute(
+        paginate(stmt.add_columns(total_subquery.label("total")), model, skip=skip, limit=limit, cursor=cursor)
+    ).all()
+    if rows:
+        return rows, rows[0][-1]
+    return [], _empty_page_total(skip, cursor, lambda: db.execute(select(total_subquery)).scalar())
+
+
+def get_changes(
+        db: Session, model: Type[ModelType], since: int, watermark: int, after: Optional[List] = None, limit: int = 500
+) -> List[ModelType]:
+    """
+    取得 since < updated_at <= watermark 的資料列（增量同步用），依 (updated_at, id) 排序：
+    - after 為前一次回應停止的 (updated_at, id)，用於同一水位線內的續傳。
+    - 由 (updated_at, id) 索引支援，成本與異動筆數成正比。
+    """
+    query = db.query(model).filter(model.updated_at > since, model.updated_at <= watermark)
+    if after:
+        query = query.filter(tuple_(model.updated_at, model.id) > tuple(after))
+    return query.order_by(model.updated_at, model.id).limit(limit).all()
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
 
+def search_ids(
+        db: Session, model: Type[ModelType], q: str, skip: int = 0, limit: int = 100, include_total: bool = True,
+        **filters
+) -> Tuple[List[str], Optional[int]]:
+    """
+    以資料表的 search_text 欄位搜尋（PostgreSQL 專用），回傳依相關度排序的一頁 id 與總筆數：
+    - q 已由 search.normalize_query 正規化，與 search_text 儲存的形式相同，直接以 LIKE 比對。
+    - 每個詞都是 search_text 的子字串（pg_bigm 索引，1～2 個中文字也可使用），
+      或整個查詢字串與 search_text 的 word_similarity 達門檻（pg_trgm 索引，容許錯字）。
+    - 依 word_similarity 排序，同分時依 keyset 欄位排序。
+    """
+    search_text = model.search_text
+    contains_all = and_(*(search_text.like(_like_pattern(term), escape="\\") for term in q.split()))
+    similar = literal(q).op("<%")(search_text)
 
-def count(db: Session, model: Type[ModelType], **filters) -> int:
-    query = db.query(model)
+    stmt = select(model.id).where(or_(contains_all, similar))
     if filters:
-        query = query.filter_by(**normalize_filters_dict(filters))  # Enum to value
-    return query.count()
+        stmt = stmt.filter_by(**normalize_filters_dict(filters))  # Enum to value
+    rank = func.word_similarity(q, search_text)
+    ids = db.execute(stmt.order_by(rank.desc(), *keyset_columns(model)).offset(skip).limit(limit)).scalars().all()
+    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar() if include_total else None
+    return list(ids), total
+
+
+def get_search_documents(db: Session, model: Type[ModelType], search_columns: Tuple[str, ...]) -> List:
+    """
+    取出 (id, 各搜尋欄位)，依 keyset 欄位排序，供行程內倒排索引建立使用。
+    """
+    stmt = select(model.id, *(getattr(model, name) for name in search_columns)).order_by(*keyset_columns(model))
+    return db.execute(stmt).all()
+
+
+def filter_ids(db: Session, model: Type[ModelType], ids: List[str], **filters) -> set:
+    """
+    回傳 ids 中符合 filters 的 id（行程內搜尋結果再套用列表篩選條件用）。
+    """
+    stmt = select(model.id).where(model.id.in_(set(ids))).filter_by(**normalize_filters_dict(filters))
+    return set(db.execute(stmt).scalars().all())
+
+
+def get_rows_by_ids(db: Session, model: Type[ModelType], columns, ids: List[str]) -> List:
+    """
+    以 Core select() 取出多筆資料列的指定欄位（不保證順序，不存在的 id 不會出現在結果中）。
+    """
+    return db.execute(select(*columns).where(model.id.in_(set(ids)))).all()
+
+
+def get_column_values(db: Session, model: Type[ModelType], column: str) -> List:
+    """
+    取出 (id, 欄位值)（略過空值），供自動完成索引建立使用。
+    """
+    value = getattr(model, column)
+    return db.execute(select(model.id, value).where(value.isnot(None))).all()
+
+
+def _insert_returning(db: Session, model: Type[ModelType], values: dict) -> ModelType:
+    """
+    以 INSERT ... RETURNING 建立單筆資料，回應直接由回傳的資料列組成，提交後不需再 refresh。
+    """
+    return db.execute(insert(model).values(**values).returning(model)).scalar_one()
 
 
 def create(db: Session, model: Type[ModelType], obj_in: CreateSchemaType) -> ModelType:
@@ -41,10 +284,12 @@ def create(db: Session, model: Type[ModelType], obj_in: CreateSchemaType) -> Mod
     - 在持久化前，統一將 Enum 轉為字串，避免 psycopg2 適配問題。
     """
     data = normalize_payload_dict(obj_in.model_dump())  # Enum to value
-    db_obj = model(**data)
-    db.add(db_obj)
+    db_obj = _insert_returning(db, model, data)
+    if model is models.SupplyItem:
+        refresh_supply_fulfillment(db, [db_obj.supply_id])
+    events.notify(db, model.__tablename__, "create", [db_obj.id])
     db.commit()
-    db.refresh(db_obj)
+    _committed(*_affected_tables(model))
     return db_obj
 
 
@@ -56,28 +301,157 @@ def create_with_input(db: Session, model: Type[ModelType], obj_in: CreateSchemaT
     """
     payload = normalize_payload_dict(obj_in.model_dump(mode="json"))
     extra = normalize_payload_dict(kwargs) if kwargs else {}
-    db_obj = model(**payload, **extra)
-    db.add(db_obj)
+    db_obj = _insert_returning(db, model, {**payload, **extra})
+    events.notify(db, model.__tablename__, "create", [db_obj.id])
     db.commit()
-    db.refresh(db_obj)
+    _committed(model.__tablename__)
     return db_obj
 
 
-def update(db: Session, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
+def bulk_create(db: Session, model: Type[ModelType], rows: List[dict]) -> List[str]:
+    """
+    以單一交易批次建立多筆資料：
+    - 使用多列 INSERT ... VALUES (...), (...) RETURNING id，不逐筆 flush / refresh。
+    - rows 需已正規化（Enum 轉字串）且鍵值一致；回傳的 id 依 rows 順序排列。
+    """
+    if not rows:
+        return []
+    # render_nulls：None 仍寫入 NULL（與單筆建立一致），所有列共用同一條 INSERT 陳述式
+    result = db.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        rows,
+        execution_options={"render_nulls": True},
+    )
+    ids = list(result.scalars())
+    events.notify(db, model.__tablename__, "create", ids)
+    db.commit()
+    _committed(model.__tablename__)
+    return ids
+
+
+def bulk_update(db: Session, model: Type[ModelType], rows: List[dict]) -> None:
+    """
+    以單一交易批次更新多筆資料：
+    - rows 為 {"id": ..., 欄位: 值} 的 dict（需已正規化），依主鍵執行 UPDATE。
+    - 相同欄位組合的資料列共用一條 UPDATE 陳述式以 executemany 送出，不逐筆載入 / refresh。
+    - 一併更新 updated_at，讓 ETag 與增量同步能反映異動。
+    """
+    if not rows:
+        return
+    now = models.current_timestamp_int()
+    db.execute(sql_update(model), [{**row, "updated_at": now} for row in rows])
+    events.notify(db, model.__tablename__, "update", [row["id"] for row in rows])
+    db.commit()
+    _committed(model.__tablename__)
+
+
+def _pin_condition(model: Type[ModelType], pin: Optional[str]):
+    """
+    PIN 檢核條件，與「資料列有 PIN 且與輸入不同即拒絕」相同語意；不帶 PIN 的資料表回傳 None。
+    物資項目沒有自己的 PIN，改以所屬供應單的 PIN 檢核。
+    """
+    if model is models.SupplyItem:
+        return model.supply_id.in_(select(models.Supply.id).where(_pin_condition(models.Supply, pin)))
+    if "valid_pin" not in model.__table__.c:
+        return None
+    return or_(model.valid_pin.is_(None), model.valid_pin == "", model.valid_pin == pin)
+
+
+def update_by_id(
+        db: Session, model: Type[ModelType], id: str, obj_in: UpdateSchemaType, *conditions, options=()
+) -> Optional[ModelType]:
     """
-    更新資料列：
+    以單一條件式 UPDATE ... RETURNING 更新資料列（不先 SELECT、提交後不 refresh）：
     - 只在 POST 做嚴格驗證；PUT/PATCH 可寬鬆（schema 以 Optional[str] 允許非標準值）。
     - 但仍需避免 Enum 直接進 DB，故在這裡統一轉字串。
+    - obj_in 的 valid_pin 只用於檢核，寫在 WHERE 中，不會寫回資料列。
+    - conditions 為額外的檢核條件（例如人數上限），同樣寫在 WHERE 中。
+    - 任一條件不成立（含資料不存在）時回傳 None，由呼叫端再查詢以回報原因。
+    - 有 updated_at 欄位的資料表一併更新（volunteer_organizations 只有 last_updated，由欄位的 onupdate 自動更新）。
     """
-    update_data = normalize_payload_dict(obj_in.model_dump(exclude_unset=True))
-    for field, value in update_data.items():
-        setattr(db_obj, field, value)
-    db.add(db_obj)
+    values = normalize_payload_dict(obj_in.model_dump(exclude_unset=True, exclude={"valid_pin"}))
+    if "updated_at" in model.__table__.c:
+        values["updated_at"] = models.current_timestamp_int()
+    where = [model.id == id, *conditions]
+    pin_condition = _pin_condition(model, getattr(obj_in, "valid_pin", None))
+    if pin_condition is not None:
+        where.append(pin_condition)
+    stmt = (
+        sql_update(model)
+        .where(*where)
+        .values(**values)
+        .returning(model)
+        .options(*options)
+        .execution_options(synchronize_session=False)
+    )
+    db_obj = db.execute(stmt).scalars().first()
+    if db_obj is None:
+        db.rollback()
+        return None
+    if model is models.SupplyItem:
+        refresh_supply_fulfillment(db, [db_obj.supply_id])
+    events.notify(db, model.__tablename__, "update", [db_obj.id])
     db.commit()
-    db.refresh(db_obj)
+    _committed(*_affected_tables(model))
     return db_obj
 
 
+# =====================
+# for human resource
+# =====================
+
+def headcount_conditions(obj_in) -> List:
+    """
+    更新人數時的 WHERE 條件：更新後 headcount_got <= headcount_need（未提供的一方取資料列現值）。
+    """
+    if obj_in.headcount_need is None and obj_in.headcount_got is None:
+        return []
+    model = models.HumanResource
+    headcount_need = literal(obj_in.headcount_need) if obj_in.headcount_need is not None else model.headcount_need
+    headcount_got = literal(obj_in.headcount_got) if obj_in.headcount_got is not None else model.headcount_got
+    return [headcount_got <= headcount_need]
+
+
+def adjust_headcount(db: Session, id: str, delta: int) -> Optional[models.HumanResource]:
+    """
+    以單一條件式 UPDATE ... RETURNING 增減 headcount_got（報名 delta > 0 / 取消 delta < 0）：
+    - 條件 0 <= headcount_got + delta <= headcount_need 寫在 WHERE 中，由資料庫在列鎖下重新檢查，
+      同時報名不會互相覆蓋，也不會超額；列鎖只持有到這一條陳述式的交易提交為止。
+    - 同一陳述式依新的人數設定 role_status（pending / partial / completed）與 is_completed。
+    - 已取消（cancelled）的需求不接受報名。
+    - 條件不成立（不存在、已額滿、人數不足扣除）時回傳 None。
+    """
+    model = models.HumanResource
+    new_got = model.headcount_got + delta
+    conditions = [model.id == id, new_got >= 0, new_got <= model.headcount_need]
+    if delta > 0:
+        conditions.append(model.status != HumanResourceStatusEnum.cancelled.value)
+    stmt = (
+        sql_update(model)
+        .where(*conditions)
+        .values(
+            headcount_got=new_got,
+            role_status=case(
+                (new_got >= model.headcount_need, HumanResourceRoleStatusEnum.completed.value),
+                (new_got > 0, HumanResourceRoleStatusEnum.partial.value),
+                else_=HumanResourceRoleStatusEnum.pending.value,
+            ),
+            is_completed=new_got >= model.headcount_need,
+            updated_at=models.current_timestamp_int(),
+        )
+        .returning(model)
+        .execution_options(synchronize_session=False)
+    )
+    db_resource = db.execute(stmt).scalars().first()
+    if db_resource is None:
+        db.rollback()
+        return None
+    events.notify(db, model.__tablename__, "update", [db_resource.id])
+    db.commit()
+    _committed(model.__tablename__)
+    return db_resource
+
+
 # =====================
 # for supply
 # =====================
@@ -93,9 +467,9 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
         # 1) 建立 Supply 主體
         supply_data_raw = obj_in.model_dump(exclude={"supplies"}, exclude_unset=True)
         supply_data = normalize_payload_dict(supply_data_raw)  # Enum to value
-        db_supply = models.Supply(**supply_data, valid_pin=generate_pin())
+        # supplies 先設為空集合，之後建立的物資項目經由關聯加入，回應時不需再載入
+        db_supply = models.Supply(**supply_data, valid_pin=generate_pin(), supplies=[])
         db.add(db_supply)
-        db.flush()  # 先拿到 db_supply.id 供 items 關聯
 
         # 2) 若有 supplies，批量建立
         items_in: List = getattr(obj_in, "supplies", []) or []
@@ -116,7 +490,7 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
                 raise HTTPException(status_code=400, detail=f"第 {idx} 個物資 received_count 不可超過 total_number")
 
             db_item = models.SupplyItem(
-                supply_id=db_supply.id,
+                supply=db_supply,
                 total_number=total_number,
                 tag=item_data.get("tag"),
                 name=item_data.get("name"),
@@ -125,14 +499,25 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
             )
             db_items.append(db_item)
 
-        if db_items:
-            db.add_all(db_items)
+        # 到貨進度直接由本次建立的物資項目計算，與 supply 同一條 INSERT 寫入
+        db_supply.items_total = len(db_items)
+        db_supply.items_fulfilled = sum(1 for item in db_items if item.received_count >= item.total_number)
+        db_supply.units_needed = sum(item.total_number for item in db_items)
+        db_supply.units_received = sum(item.received_count for item in db_items)
+        db_supply.is_fulfilled = db_supply.items_fulfilled == db_supply.items_total
+
+        # supply 與物資項目一次 flush（物資項目的 supply_id 由關聯帶入）
+        db.add_all(db_items)
+        db.flush()
+
+        events.notify(db, models.Supply.__tablename__, "create", [db_supply.id])
+        events.notify(db, models.SupplyItem.__tablename__, "create", [item.id for item in db_items])
 
         # 3) 提交交易
         db.commit()
+        _committed(models.Supply.__tablename__, models.SupplyItem.__tablename__)
 
-        # 4) 重新載入，帶出關聯
-        db.refresh(db_supply)
+        # 4) 關聯已在建立時設定，提交後不過期，直接回傳（不需再查詢）
         return db_supply
 
     except IntegrityError:
@@ -148,52 +533,46 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
 
 def distribute_items(db: Session, supply_id: str, items_to_distribute: List[SupplyItemDistribution]) -> Optional[List[models.SupplyItem]]:
     """
-    批次更新指定 supply_id 底下多筆 SupplyItem 的 received_count。
-    這是一個原子操作（transaction），若其中任何一筆更新失敗（例如 ID 無效或超出總量），
-    整個交易會被回滾以確保資料一致性。
+    批次增加指定 supply_id 底下多筆 SupplyItem 的 received_count。
+    - 每筆以單一條件式 UPDATE ... SET received_count = received_count + :n
+      WHERE id = :id AND received_count + :n <= total_number RETURNING 完成，
+      不需先 SELECT ... FOR UPDATE；同時有多個發放點更新同一供應單時，由資料庫在列鎖下重新檢查條件。
+    - 同一請求內重複的 id 會先合併數量。
+    - 全部在同一交易中：任何一筆 id 無效或超出總量即整批回滾並回傳 None。
     """
+    counts = {}
+    for item in items_to_distribute:
+        counts[str(item.id)] = counts.get(str(item.id), 0) + item.count
+    if not counts:
+        return []
+
+    received = func.coalesce(models.SupplyItem.received_count, 0)
+    now = models.current_timestamp_int()
     try:
-        item_ids_to_update = {item.id for item in items_to_distribute}
-        if not item_ids_to_update:
-            return []
-
-        db_items = (
-            db.query(models.SupplyItem)
-            .filter(
-                models.SupplyItem.supply_id == supply_id,
-                models.SupplyItem.id.in_(item_ids_to_update),
+        db_items = []
+        # 依 id 排序更新，並行的發放請求以相同順序取得列鎖，避免互相等待造成死結
+        for item_id, count in sorted(counts.items()):
+            stmt = (
+                sql_update(models.SupplyItem)
+                .where(
+                    models.SupplyItem.id == item_id,
+                    models.SupplyItem.supply_id == supply_id,
+                    received + count <= models.SupplyItem.total_number,
+                )
+                .values(received_count=received + count, updated_at=now)
+                .returning(models.SupplyItem)
+                .execution_options(synchronize_session=False)
             )
-            .with_for_update()
-            .all()
-        )
-
-        if len(db_items) != len(item_ids_to_update):
-            db.rollback()
-            return None
-
-        items_map = {str(item.id): item for item in db_items}
-
-        for item_update_request in items_to_distribute:
-            db_item = items_map.get(str(item_update_request.id))
-            if not db_item:
-                db.rollback()
-                return None
-
-            current_received = db_item.received_count or 0
-
-            if item_update_request.count is None or item_update_request.count < 0:
-                db.rollback()
-                return None
-
-            new_received_count = current_received + item_update_request.count
-
-            if new_received_count > db_item.total_number:
+            db_item = db.execute(stmt).scalars().first()
+            if db_item is None:
                 db.rollback()
                 return None
+            db_items.append(db_item)
 
-            db_item.received_count = new_received_count
-
+        refresh_supply_fulfillment(db, [supply_id])
+        events.notify(db, models.SupplyItem.__tablename__, "update", counts.keys())
         db.commit()
+        _committed(models.Supply.__tablename__, models.SupplyItem.__tablename__)
         return db_items
 
     except SQLAlchemyError:
@@ -201,11 +580,59 @@ def distribute_items(db: Session, supply_id: str, items_to_distribute: List[Supp
         return None
 
 
-def get_full_supply(db: Session, query) -> models.Supply:
-    not_fulfilled_exists = exists().where(
-        and_(
-            models.SupplyItem.supply_id == models.Supply.id,
-            models.SupplyItem.received_count < models.SupplyItem.total_number
-        )
+def supply_item_count_conditions(obj_in) -> List:
+    """
+    更新數量時的 WHERE 條件：
+    - received_count 已等於 total_number 的項目鎖定，不可再更新數量。
+    - 更新後 received_count <= total_number（未提供的一方取資料列現值）。
+    """
+    if obj_in.total_number is None and obj_in.received_count is None:
+        return []
+    model = models.SupplyItem
+    total_number = literal(obj_in.total_number) if obj_in.total_number is not None else model.total_number
+    received_count = (
+        literal(obj_in.received_count) if obj_in.received_count is not None
+        else func.coalesce(model.received_count, 0)
     )
-    return query.filter(not_fulfilled_exists)
+    return [
+        or_(model.received_count.is_(None), model.received_count != model.total_number),
+        received_count <= total_number,
+    ]
+
+
+def embed_supply_items(db: Session, supplies: List[models.Supply], max_items_per_supply: Optional[int] = None) -> None:
+    """
+    為已分頁的供應單批次載入物資項目，取代 joinedload + offset/limit：
+    - 父資料先分頁，子資料再以一次 supply_id IN (...) 查詢取出，不會因 JOIN 重複父欄位，也不需以子查詢包裝分頁。
+    - 項目依 (created_at, id) 排序；max_items_per_supply 指定時以 row_number() 在資料庫端截斷每張供應單的項目數。
+    - 以 set_committed_value 設定關聯：不視為異動，序列化時也不會再觸發延遲載入（非同步模式可用）。
+    """
+    if not supplies:
+        return
+    item = models.SupplyItem
+    supply_ids = [supply.id for supply in supplies]
+    order = (item.created_at, item.id)
+    if max_items_per_supply is None:
+        stmt = select(item).where(item.supply_id.in_(supply_ids))
+    else:
+        ranked = (
+            select(item, func.row_number().over(partition_by=item.supply_id, order_by=order).label("rank"))
+            .where(item.supply_id.in_(supply_ids))
+            .subquery()
+        )
+        item = aliased(models.SupplyItem, ranked)
+        order = (item.created_at, item.id)
+        stmt = select(item).where(ranked.c.rank <= max_items_per_supply)
+
+    items_by_supply = {supply_id: [] for supply_id in supply_ids}
+    for db_item in db.execute(stmt.order_by(item.supply_id, *order)).scalars():
+        items_by_supply[db_item.supply_id].append(db_item)
+    for supply in supplies:
+        set_committed_value(supply, "supplies", items_by_supply[supply.id])
+
+
+def get_full_supply(db: Session, query) -> models.Supply:
+    """
+    只保留尚未全部到貨的供應單：以維護好的 is_fulfilled 欄位篩選（由部分索引支援），不再逐筆檢查物資項目。
+    """
+    return query.filter(models.Supply.is_fulfilled.is_(False))
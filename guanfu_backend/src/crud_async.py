@@ -0,0 +1,40 @@
+"""
+crud 的非同步版本，供 async 路由使用：
+- 每個函式都是對應同步實作的薄包裝，透過 database.run_db 執行。
+- DB_ASYNC=True 時在 AsyncSession.run_sync 中執行（asyncpg），否則交給 threadpool。
+- 查詢與驗證邏輯只維護在 crud.py 一處。
+"""
+from functools import wraps
+
+from . import crud
+from .database import run_db
+
+
+def _to_async(fn):
+    @wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        return await run_db(db, fn, *args, **kwargs)
+    return wrapper
+
+
+get_by_id = _to_async(crud.get_by_id)
+get_by_ids = _to_async(crud.get_by_ids)
+get_row = _to_async(crud.get_row)
+get_points = _to_async(crud.get_points)
+get_page = _to_async(crud.get_page)
+get_page_rows = _to_async(crud.get_page_rows)
+get_changes = _to_async(crud.get_changes)
+search_ids = _to_async(crud.search_ids)
+get_search_documents = _to_async(crud.get_search_documents)
+filter_ids = _to_async(crud.filter_ids)
+get_rows_by_ids = _to_async(crud.get_rows_by_ids)
+get_column_values = _to_async(crud.get_column_values)
+create = _to_async(crud.create)
+create_with_input = _to_async(crud.create_with_input)
+bulk_create = _to_async(crud.bulk_create)
+bulk_update = _to_async(crud.bulk_update)
+update_by_id = _to_async(crud.update_by_id)
+adjust_headcount = _to_async(crud.adjust_headcount)
+create_supply_with_items = _to_async(crud.create_supply_with_items)
+distribute_items = _to_async(crud.distribute_items)
+embed_supply_items = _to_async(crud.embed_supply_items)
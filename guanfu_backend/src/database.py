@@ -1,6 +1,9 @@
-from typing import Generator
+from typing import Any, AsyncGenerator, Callable, Generator, TypeVar, Union
+
 from sqlalchemy import create_engine, URL
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from starlette.concurrency import run_in_threadpool
 
 from .config import settings
 
@@ -49,13 +52,51 @@ else:
             pool_pre_ping=True,
         )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 提交後不讓物件過期：寫入以 RETURNING 取得的資料即為回應內容，不需在提交後再 SELECT 一次
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
+# 非同步模式：同一個連線目標改用 asyncpg driver（Cloud SQL 的 unix socket 以 host 參數沿用）
+# 同步 engine 仍保留給 LISTEN 連線與離線腳本使用
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(
+        engine.url.set(drivername="postgresql+asyncpg"),
+        pool_pre_ping=True,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+    )
+    # 提交後不讓物件過期：回應序列化發生在 session 之外，無法再以同步方式延遲載入
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
-def get_db() -> Generator[Session, None, None]:
+def get_sync_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# 路由使用的 session 依賴，依 DB_ASYNC 切換；型別標註用 DbSession
+get_db = get_async_db if settings.DB_ASYNC else get_sync_db
+DbSession = Union[Session, AsyncSession]
+
+T = TypeVar("T")
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    以目前的 session 執行同步的 crud 函式 fn(db, *args, **kwargs)：
+    - 非同步模式：透過 AsyncSession.run_sync 在事件迴圈上執行，SQL 由 asyncpg 非同步等待，不佔用執行緒。
+    - 同步模式：交給 threadpool 執行，避免阻塞事件迴圈。
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
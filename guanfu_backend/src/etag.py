@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from .cache import ResponseCache, etag_matches
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    由任意可序列化的值產生 strong ETag（含雙引號）。
+    """
+    raw = json.dumps(parts, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return '"' + hashlib.sha1(raw).hexdigest() + '"'
+
+
+def page_etag(model, rows: Sequence[Any], total: Optional[int], query_string: str) -> str:
+    """
+    列表的 ETag，由本頁各列的 (id, row_version)、總筆數與正規化後的查詢參數決定：
+    - 直接使用分頁查詢取回的資料列計算，不需另外查詢；本頁任一列被修改、列的組成或總數改變時都會不同。
+    - 只由資料庫的值決定，各 worker 對同一份資料回傳相同的 ETag。
+    """
+    versions = [[row.id, row.row_version] for row in rows]
+    return make_etag(model.__tablename__, total, versions, ResponseCache.normalize_query(query_string))
+
+
+def resource_etag(db_obj, fields: Optional[Tuple[str, ...]] = None) -> str:
+    """
+    單筆資源的 ETag，由 id 與 row_version 決定；db_obj 可為 ORM 物件或 Core 資料列。
+    指定 fields（稀疏欄位集）時一併納入，不同欄位組合的回應不共用 ETag。
+    """
+    return row_etag(type(db_obj), db_obj, fields)
+
+
+def row_etag(model, row, fields: Optional[Tuple[str, ...]] = None) -> str:
+    table = model.__tablename__
+    if fields is None:
+        return make_etag(table, row.id, row.row_version)
+    return make_etag(table, row.id, row.row_version, list(fields))
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    設定回應的 ETag；若用戶端快取仍有效則回傳 304 回應，否則回傳 None 讓路由繼續處理。
+    """
+    response.headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import current_timestamp_int
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "guanfu_changes"
+
+# NOTIFY payload 上限為 8000 bytes，ids 過多時拆成多則事件
+_MAX_IDS_PER_EVENT = 100
+
+# 每個 worker 的識別碼，讓收到的事件可判斷是否來自自己
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def notify(db: Session, table: str, op: str, ids: Iterable[str]) -> None:
+    """
+    在目前交易中發出 pg_notify；Postgres 只會在 COMMIT 後送出，回滾則不送。
+    未啟用即時異動推播（CHANGE_STREAM_ENABLED）時不做任何事。
+    """
+    if not settings.CHANGE_STREAM_ENABLED:
+        return
+    ids = [str(i) for i in ids]
+    for start in range(0, len(ids), _MAX_IDS_PER_EVENT):
+        payload = json.dumps({
+            "table": table,
+            "op": op,
+            "ids": ids[start:start + _MAX_IDS_PER_EVENT],
+            "ts": current_timestamp_int(),
+            "origin": WORKER_ID,
+        }, separators=(",", ":"))
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+
+class Subscription:
+    """
+    單一訂閱者（一條 SSE / WebSocket 連線）：
+    - queue 有上限，消費太慢時標記 overflowed 並由廣播器移除，用戶端應重新同步。
+    """
+
+    def __init__(self, tables: Optional[Set[str]], max_queue: int):
+        self.tables = tables
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def wants(self, event: Dict) -> bool:
+        return self.tables is None or event.get("table") in self.tables
+
+
+class Broadcaster:
+    """
+    行程內的事件扇出：一個 LISTEN 連線收到的事件分送給所有訂閱者與本地處理函式。
+    只在事件迴圈內操作，不需要額外的鎖。
+    """
+
+    def __init__(self, max_subscribers: int, max_queue: int):
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self.subscribers: Set[Subscription] = set()
+        self.handlers: List[Callable[[Dict], None]] = []
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, tables: Optional[Set[str]] = None) -> Optional[Subscription]:
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(tables, self.max_queue)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def add_handler(self, handler: Callable[[Dict], None]) -> None:
+        """
+        註冊本地處理函式（例如跨 worker 清除回應快取），每個事件都會呼叫。
+        """
+        self.handlers.append(handler)
+
+    def publish(self, event: Dict) -> None:
+        self.published += 1
+        for handler in self.handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Change event handler failed")
+        for subscription in list(self.subscribers):
+            if not subscription.wants(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": len(self.subscribers), "published": self.published, "dropped": self.dropped}
+
+
+broadcaster = Broadcaster(
+    max_subscribers=settings.STREAM_MAX_SUBSCRIBERS,
+    max_queue=settings.STREAM_QUEUE_SIZE,
+)
+
+
+class ChangeListener:
+    """
+    每個 worker 一條 LISTEN 連線：
+    - 以 loop.add_reader 監看 socket，不佔用執行緒也不佔用連線池名額（連線自池中 detach）。
+    - 連線中斷時以退避間隔自動重連。
+    """
+
+    def __init__(self, engine, broadcaster: Broadcaster, reconnect_delay: float = 1.0):
+        self.engine = engine
+        self.broadcaster = broadcaster
+        self.reconnect_delay = reconnect_delay
+        self._connection = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = False
+        self._connect()
+
+    def _connect(self) -> None:
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        raw = self.engine.raw_connection()
+        raw.detach()
+        connection = raw.dbapi_connection
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self._connection = connection
+        self._loop.add_reader(connection.fileno(), self._on_readable)
+        logger.info("Listening for change events on channel %s", CHANNEL)
+
+    def _on_readable(self) -> None:
+        try:
+            self._connection.poll()
+        except Exception:
+            logger.exception("Change listener connection lost, reconnecting")
+            self._drop_connection()
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+        while self._connection.notifies:
+            notification = self._connection.notifies.pop(0)
+            try:
+                event = json.loads(notification.payload)
+            except ValueError:
+                continue
+            self.broadcaster.publish(event)
+
+    async def _reconnect(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stopped:
+            await asyncio.sleep(delay)
+            try:
+                self._connect()
+                return
+            except Exception:
+                logger.exception("Change listener reconnect failed")
+                delay = min(delay * 2, 30.0)
+
+    def _drop_connection(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._loop.remove_reader(self._connection.fileno())
+        except (ValueError, OSError):
+            pass
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+    def stop(self) -> None:
+        self._stopped = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._drop_connection()
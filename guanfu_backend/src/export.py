@@ -0,0 +1,170 @@
+"""
+全量匯出（NDJSON / CSV 串流）：
+- 以 yield_per 分批讀取（PostgreSQL 上為 server-side cursor），每批轉換後立即寫出，記憶體用量與資料量無關。
+- 依 (updated_at, id) 排序一次讀完，不做 offset 分頁，也不計算總筆數。
+- 用戶端的 Accept-Encoding 含 gzip 時以 gzip 串流壓縮（Content-Encoding: gzip）。
+"""
+import csv
+import enum
+import io
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from .config import settings
+from .database import DbSession
+from .enum_serializer import normalize_filters_dict
+from .pagination import keyset_columns
+from .serialization import RowSerializer
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+EXPORT_FORMAT_DESCRIPTION = "匯出格式：ndjson（每行一筆 JSON）或 csv（陣列 / 物件欄位以 JSON 字串表示）"
+EXPORT_FIELDS_DESCRIPTION = "只匯出指定欄位（以逗號分隔）；未提供時匯出全部欄位"
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson; charset=utf-8",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+async def iter_partitions(db: DbSession, stmt, batch_size: Optional[int] = None) -> AsyncIterator[Sequence[Any]]:
+    """
+    以 yield_per 逐批取出查詢結果：
+    - 同步 session：每次取一批都交給 threadpool，不阻塞事件迴圈。
+    - 非同步 session：以 AsyncSession.stream 逐批等待。
+    """
+    stmt = stmt.execution_options(yield_per=batch_size or settings.EXPORT_BATCH_SIZE)
+    if isinstance(db, Session):
+        result = await run_in_threadpool(db.execute, stmt)
+        partitions = result.partitions()
+        try:
+            while True:
+                partition = await run_in_threadpool(next, partitions, None)
+                if partition is None:
+                    return
+                yield partition
+        finally:
+            await run_in_threadpool(result.close)
+    else:
+        result = await db.stream(stmt)
+        try:
+            async for partition in result.partitions():
+                yield partition
+        finally:
+            await result.close()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (str, int, float)):
+        return value
+    text = orjson.dumps(value, option=_ORJSON_OPTIONS).decode("utf-8")
+    # 日期等純量輸出不含引號，list / dict 則保留為 JSON 字串（可直接以 importer 匯回）
+    return text[1:-1] if text.startswith('"') else text
+
+
+def _encoder(fmt: ExportFormat, field_names: List[str]) -> Callable[[List[Dict[str, Any]]], bytes]:
+    if fmt is ExportFormat.ndjson:
+        def encode(rows: List[Dict[str, Any]]) -> bytes:
+            return b"".join(orjson.dumps(row, option=_ORJSON_OPTIONS) + b"\n" for row in rows)
+        return encode
+
+    def encode(rows: List[Dict[str, Any]]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_csv_value(row.get(name)) for name in field_names] for row in rows)
+        return buffer.getvalue().encode("utf-8")
+    return encode
+
+
+def _csv_header(field_names: List[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(field_names)
+    # 加上 BOM，Excel 才能正確辨識中文；importer 以 utf-8-sig 讀取
+    return "\ufeff".encode("utf-8") + buffer.getvalue().encode("utf-8")
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() != "gzip":
+            continue
+        params = params.strip()
+        try:
+            return not params.startswith("q=") or float(params[2:]) > 0
+        except ValueError:
+            return True
+    return False
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31：gzip 格式
+    async for chunk in chunks:
+        # 每批 flush 一次，用戶端可以邊收邊解壓
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(
+        request: Request, name: str, fmt: ExportFormat, field_names: List[str],
+        batches: AsyncIterator[List[Dict[str, Any]]],
+) -> StreamingResponse:
+    """
+    將逐批產生的 dict（與 API 回應相同的欄位與格式）寫成 NDJSON / CSV 串流回應。
+    """
+    encode = _encoder(fmt, field_names)
+
+    async def body() -> AsyncIterator[bytes]:
+        if fmt is ExportFormat.csv:
+            yield _csv_header(field_names)
+        async for rows in batches:
+            yield encode(rows)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{fmt.value}"',
+        "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no",
+        "Vary": "Accept-Encoding",
+    }
+    content = body()
+    if _accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        content = _gzip(content)
+    return StreamingResponse(content, media_type=_MEDIA_TYPES[fmt], headers=headers)
+
+
+def export_rows(
+        request: Request, db: DbSession, name: str, serializer: RowSerializer, fmt: ExportFormat, **filters
+) -> StreamingResponse:
+    """
+    一般資源的匯出：以 Core select() 只取 serializer 需要的欄位，套用與列表相同的篩選條件。
+    """
+    model = serializer.model
+    stmt = select(*serializer.columns)
+    if filters:
+        stmt = stmt.filter_by(**normalize_filters_dict(filters))  # Enum to value
+    stmt = stmt.order_by(*keyset_columns(model))
+
+    async def batches() -> AsyncIterator[List[Dict[str, Any]]]:
+        async for partition in iter_partitions(db, stmt):
+            yield [serializer.to_dict(row) for row in partition]
+
+    return export_response(request, name, fmt, serializer.field_names, batches())
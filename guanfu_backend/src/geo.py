@@ -0,0 +1,247 @@
+"""
+行程內地理索引（供 /nearby 與 /map/pins 使用）：
+- 各據點資料表的座標載入為固定大小經緯度網格（類似 geohash 分桶），查詢時只檢查半徑範圍涵蓋的格子，再以 haversine 計算距離。
+- 以回應快取的命名空間世代號判斷資料是否變更：本 worker 或其他 worker（經 LISTEN/NOTIFY 或共用 Redis）寫入後，
+  下一次查詢時重建該資料表的索引；另以 GEO_INDEX_TTL_SECONDS 涵蓋不經過 API 的寫入。
+- 據點數量在數千筆以內，整表重建只需一次查詢（讀取 lat / lng 數值欄位，不解析 JSONB），不需要 PostGIS。
+- 地圖叢集以 Web Mercator 圖磚為單位計算並快取，快取項目綁定建立時的索引，索引重建後自動失效。
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import crud_async
+from .cache import response_cache
+from .config import settings
+from .database import DbSession
+from .resources import POINT_FACILITIES
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_M / 180
+
+# 網格大小（度）：約 1.1 公里見方，光復鄉一帶的據點每格只有少數幾筆
+CELL_DEGREES = 0.01
+
+
+class GeoPoint(NamedTuple):
+    type: str
+    id: str
+    name: str
+    status: str
+    address: Optional[str]
+    lat: float
+    lng: float
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEGREES), math.floor(lng / CELL_DEGREES)
+
+
+class GridIndex:
+    """
+    單一資料表的網格索引（建立後不再修改，重建時整個替換）。
+    """
+
+    def __init__(self, points: List[GeoPoint]):
+        self.points = points
+        self.cells: Dict[Tuple[int, int], List[GeoPoint]] = defaultdict(list)
+        for point in points:
+            self.cells[_cell(point.lat, point.lng)].append(point)
+
+    def in_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> Iterator[GeoPoint]:
+        low_lat, low_lng = _cell(min_lat, min_lng)
+        high_lat, high_lng = _cell(max_lat, max_lng)
+        if (high_lat - low_lat + 1) * (high_lng - low_lng + 1) > len(self.cells):
+            # 範圍涵蓋的格子比有資料的格子還多時，直接檢查每一格
+            candidates = (point for cell in self.cells.values() for point in cell)
+        else:
+            candidates = (
+                point
+                for cell_lat in range(low_lat, high_lat + 1)
+                for cell_lng in range(low_lng, high_lng + 1)
+                for point in self.cells.get((cell_lat, cell_lng), ())
+            )
+        for point in candidates:
+            if min_lat <= point.lat <= max_lat and min_lng <= point.lng <= max_lng:
+                yield point
+
+    def within(self, lat: float, lng: float, radius_m: float) -> Iterator[Tuple[float, GeoPoint]]:
+        """
+        產生距離 (lat, lng) radius_m 公尺內的據點與距離（未排序）。
+        """
+        d_lat = radius_m / METERS_PER_DEGREE_LAT
+        d_lng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        for point in self.in_bbox(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng):
+            distance = haversine_m(lat, lng, point.lat, point.lng)
+            if distance <= radius_m:
+                yield distance, point
+
+
+class _Snapshot(NamedTuple):
+    index: GridIndex
+    generation: int
+    loaded_at: float
+
+
+class FacilityIndex:
+    """
+    各據點資料表的 GridIndex 快取，查詢前檢查世代號與存活時間，過期時重新載入。
+    同一資料表同時只會有一個請求重建，其他請求等待同一次結果。
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def _fresh(self, table: str) -> Optional[GridIndex]:
+        snapshot = self._snapshots.get(table)
+        if snapshot is None:
+            return None
+        if snapshot.generation != response_cache.generation(table):
+            return None
+        if time.monotonic() - snapshot.loaded_at > settings.GEO_INDEX_TTL_SECONDS:
+            return None
+        return snapshot.index
+
+    async def get(self, db: DbSession, table: str) -> GridIndex:
+        index = self._fresh(table)
+        if index is not None:
+            return index
+        async with self._locks[table]:
+            index = self._fresh(table)
+            if index is not None:
+                return index
+            # 先取世代號再讀資料：讀取期間若有寫入，下一次查詢會再重建
+            generation = response_cache.generation(table)
+            facility = POINT_FACILITIES[table]
+            rows = await crud_async.get_points(db, facility.model, facility.address_column)
+            index = GridIndex([GeoPoint(table, *row) for row in rows])
+            self._snapshots[table] = _Snapshot(index, generation, time.monotonic())
+            return index
+
+    def stats(self) -> Dict[str, int]:
+        return {table: len(snapshot.index.points) for table, snapshot in self._snapshots.items()}
+
+
+facility_index = FacilityIndex()
+
+
+# 叢集格子為圖磚再細分 2^CLUSTER_GRID_BITS 等分（8x8），即 zoom + 3 的圖磚；256px 圖磚上約 32px 一格
+CLUSTER_GRID_BITS = 3
+
+# Web Mercator 可表示的緯度範圍
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_of(lat: float, lng: float, zoom: int) -> Tuple[int, int]:
+    """
+    (lat, lng) 所在的 Web Mercator 圖磚座標 (x, y)。
+    """
+    n = 1 << zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lng + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return min(n - 1, max(0, int(x))), min(n - 1, max(0, int(y)))
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """
+    圖磚的 (min_lat, min_lng, max_lat, max_lng)。
+    """
+    n = 1 << zoom
+
+    def lat_of(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return lat_of(y + 1), x / n * 360.0 - 180.0, lat_of(y), (x + 1) / n * 360.0 - 180.0
+
+
+class Cluster:
+    """
+    一個叢集格子的彙總：筆數、座標總和（計算重心）與其中一筆據點（只有一筆時直接以據點呈現）。
+    """
+    __slots__ = ("count", "sum_lat", "sum_lng", "types", "point")
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        self.types: Dict[str, int] = defaultdict(int)
+        self.point: Optional[GeoPoint] = None
+
+    def add(self, point: GeoPoint) -> None:
+        self.count += 1
+        self.sum_lat += point.lat
+        self.sum_lng += point.lng
+        self.types[point.type] += 1
+        self.point = point
+
+    def merge(self, other: "Cluster") -> None:
+        self.count += other.count
+        self.sum_lat += other.sum_lat
+        self.sum_lng += other.sum_lng
+        for name, count in other.types.items():
+            self.types[name] += count
+        self.point = other.point
+
+
+TileClusters = Dict[Tuple[int, int], Cluster]
+
+
+class TileClusterCache:
+    """
+    各資料表、各圖磚的叢集彙總快取（LRU）：
+    - 鍵為 (資料表, 狀態篩選, zoom, x, y)；不同 types 組合共用各資料表的彙總，回應時再合併。
+    - 項目記錄建立時使用的 GridIndex，索引因寫入而重建後即不再使用（等同於寫入時失效）。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[GridIndex, TileClusters]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, index: GridIndex, table: str, statuses: FrozenSet[str], zoom: int, x: int, y: int) -> TileClusters:
+        key = (table, statuses, zoom, x, y)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is index:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        clusters = self._build(index, statuses, zoom, x, y)
+        self._entries[key] = (index, clusters)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return clusters
+
+    @staticmethod
+    def _build(index: GridIndex, statuses: FrozenSet[str], zoom: int, x: int, y: int) -> TileClusters:
+        clusters: TileClusters = {}
+        cell_zoom = zoom + CLUSTER_GRID_BITS
+        for point in index.in_bbox(*tile_bounds(zoom, x, y)):
+            if point.status not in statuses or tile_of(point.lat, point.lng, zoom) != (x, y):
+                continue  # 落在相鄰圖磚邊界上的據點只算在它所屬的圖磚
+            cell = tile_of(point.lat, point.lng, cell_zoom)
+            cluster = clusters.get(cell)
+            if cluster is None:
+                cluster = clusters[cell] = Cluster()
+            cluster.add(point)
+        return clusters
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+tile_cache = TileClusterCache(max_entries=settings.MAP_TILE_CACHE_SIZE)
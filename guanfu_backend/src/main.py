@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.requests import Request
 from starlette.responses import JSONResponse
@@ -6,12 +9,17 @@ from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
 from psycopg2 import errors
 
+from .autocomplete import warm_up
+from .cache import ResponseCacheMiddleware, invalidate_from_event
 from .config import settings
+from .database import SessionLocal, engine
+from .events import ChangeListener, broadcaster
+from .validation import simplify_errors
 from .routers import (
     shelters, reports, volunteer_organizations, accommodations,
     human_resources, medical_stations, mental_health_resources,
     restrooms, shower_stations, water_refill_stations,
-    supplies, supply_items
+    supplies, supply_items, changes, stream, system, nearby, map, autocomplete
 )
 
 # --- 根據環境動態設定 Swagger UI 的伺服器 URL ---
@@ -21,8 +29,31 @@ servers = [
 if settings.ENVIRONMENT == "prod":
     servers.insert(0, {"url": settings.PROD_SERVER_URL, "description": "線上服務 (Production)"})
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    啟用即時異動推播時，每個 worker 建立一條 LISTEN 連線：
+    - 收到的事件分送給 /stream 訂閱者。
+    - 其他 worker 的寫入會一併清除本 worker 的回應快取。
+    另於背景預先載入自動完成索引，不延後啟動。
+    """
+    warm_up_task = asyncio.create_task(warm_up(SessionLocal))
+    listener = None
+    if settings.CHANGE_STREAM_ENABLED:
+        if settings.CACHE_ENABLED:
+            broadcaster.add_handler(invalidate_from_event)
+        listener = ChangeListener(engine, broadcaster)
+        listener.start()
+    yield
+    warm_up_task.cancel()
+    if listener is not None:
+        listener.stop()
+
+
 # --- 建立 FastAPI 應用實例 ---
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_TITLE,
     version="v1.1.0",
     description="光復主站api",
@@ -34,6 +65,11 @@ app = FastAPI(
 )
 
 
+# --- 回應快取：資源的 GET 請求命中時不經過資料庫 ---
+if settings.CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware)
+
+
 # ===================================================================
 # 全域異常處理器 (Global Exception Handlers)
 # ===================================================================
@@ -44,20 +80,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     自定義 Pydantic 驗證錯誤的處理器，
     將其格式化為更易讀的 {field: [error_message]} 格式，類似 Django REST Framework。
     """
-    simplified_errors = {}
-    for error in exc.errors():
-        # error['loc'] 是一個元組，例如 ('body', 'status')，我們通常取最後一個作為欄位名
-        field_name = str(error["loc"][-1]) if error["loc"] else "general"
-        error_message = error["msg"]
-
-        # 將錯誤訊息整理成列表
-        if field_name not in simplified_errors:
-            simplified_errors[field_name] = []
-        simplified_errors[field_name].append(error_message)
-
     return JSONResponse(
         status_code=HTTP_422_UNPROCESSABLE_ENTITY,
-        content=simplified_errors,
+        content=simplify_errors(exc.errors()),
     )
 
 
@@ -110,3 +135,9 @@ app.include_router(shower_stations.router)
 app.include_router(water_refill_stations.router)
 app.include_router(supplies.router)
 app.include_router(supply_items.router)
+app.include_router(changes.router)
+app.include_router(nearby.router)
+app.include_router(map.router)
+app.include_router(autocomplete.router)
+app.include_router(stream.router)
+app.include_router(system.router)
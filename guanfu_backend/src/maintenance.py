@@ -0,0 +1,41 @@
+"""
+維運工作（手動或排程執行）：
+
+    python -m src.maintenance repair-supply-fulfillment [--batch-size 500]
+
+- repair-supply-fulfillment：依物資項目重新計算所有供應單的到貨進度，只修正不一致的資料列。
+  供初次部署的回填，或在資料曾被程式以外的方式修改後執行。
+"""
+import argparse
+import logging
+
+from . import crud
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def repair_supply_fulfillment(batch_size: int = 500) -> int:
+    db = SessionLocal()
+    try:
+        repaired = crud.repair_supply_fulfillment(db, batch_size=batch_size)
+    finally:
+        db.close()
+    logger.info("Repaired fulfillment state of %d supplies", repaired)
+    return repaired
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    repair = subparsers.add_parser("repair-supply-fulfillment", help="回填 / 修復供應單到貨進度")
+    repair.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "repair-supply-fulfillment":
+        repair_supply_fulfillment(batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
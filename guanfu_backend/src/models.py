@@ -1,11 +1,15 @@
 import uuid
 import time
+from typing import Tuple
+
 from sqlalchemy import (
-    Column, String, DateTime, Integer, Boolean, Text, BigInteger, ForeignKey
+    Column, String, DateTime, Integer, Boolean, Text, BigInteger, ForeignKey, Index, text, Float, Computed
 )
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
+from sqlalchemy.sql.functions import FunctionElement
 from .database import Base
 
 
@@ -19,14 +23,73 @@ def current_timestamp_int():
     return int(time.time())
 
 
+def row_version_column() -> Column:
+    """
+    資料列版本（API 不回傳）：新增時為 1，之後每次 UPDATE 在同一陳述式中加 1（含條件式 UPDATE 與批次更新），
+    供 ETag 判斷資料是否變更；updated_at 只精確到秒，無法區分同一秒內的多次寫入。
+    """
+    return Column(BigInteger, nullable=False, default=1, server_default=text("1"), onupdate=text("row_version + 1"))
+
+
+def coordinate_column(key: str) -> Column:
+    """
+    由 coordinates JSONB 的 lat / lng 產生的數值欄位（PostgreSQL generated column，唯讀；非數值時為 NULL），
+    供範圍查詢使用 (lat, lng) 索引。API 仍只讀寫 coordinates。
+    """
+    return Column(Float, Computed(
+        f"CASE WHEN jsonb_typeof(coordinates -> '{key}') = 'number' "
+        f"THEN CAST(coordinates ->> '{key}' AS double precision) END",
+        persisted=True,
+    ))
+
+
+class normalized_text(FunctionElement):
+    """
+    多個文字欄位以換行串接後轉為 NFKC 並轉小寫（與 search.normalize_text 對查詢字串的處理相同），
+    NULL 視為空字串；換行不會出現在查詢詞中，因此不會跨欄位命中。
+    """
+    type = Text()
+    inherit_cache = True
+
+
+@compiles(normalized_text)
+def _compile_normalized_text(element, compiler, **kw):
+    joined = " || chr(10) || ".join(f"coalesce({compiler.process(clause, **kw)}, '')" for clause in element.clauses)
+    return f"lower(normalize({joined}, NFKC))"
+
+
+def search_text_column(*columns: str) -> Column:
+    """
+    q= 搜尋比對的正規化文字（PostgreSQL generated column，唯讀；API 不回傳），
+    API、importer 的 COPY 或直接以 SQL 寫入時皆自動同步。
+    """
+    return Column(Text, Computed(normalized_text(*(literal_column(name) for name in columns)), persisted=True))
+
+
+def search_indexes(table: str) -> Tuple[Index, Index]:
+    """
+    search_text 的 GIN 索引：
+    - pg_bigm（gin_bigm_ops）以 2 字元為單位，供 LIKE 子字串比對使用，1～2 個中文字的查詢詞也能使用索引。
+    - pg_trgm（gin_trgm_ops）供錯字容忍的 word_similarity 比對使用。
+    """
+    return (
+        Index(f"ix_{table}_search_text_bigm", "search_text", postgresql_using="gin",
+              postgresql_ops={"search_text": "gin_bigm_ops"}),
+        Index(f"ix_{table}_search_text_trgm", "search_text", postgresql_using="gin",
+              postgresql_ops={"search_text": "gin_trgm_ops"}),
+    )
+
+
 # ===================================================================
 # 資料表模型定義
 # ===================================================================
 
 class VolunteerOrganization(Base):
     __tablename__ = "volunteer_organizations"
+    __table_args__ = (*search_indexes("volunteer_organizations"),)
     id = Column(String, primary_key=True, default=generate_uuid_str)
     last_updated = Column(DateTime, default=func.now(), onupdate=func.now())
+    row_version = row_version_column()
     registration_status = Column(String)
     organization_nature = Column(String)
     organization_name = Column(String, nullable=False)
@@ -37,13 +100,20 @@ class VolunteerOrganization(Base):
     meeting_info = Column(Text)
     notes = Column(Text)
     image_url = Column(String)
+    search_text = search_text_column("organization_name")
 
 
 class Shelter(Base):
     __tablename__ = "shelters"
+    __table_args__ = (
+        Index("ix_shelters_updated_at_id", "updated_at", "id"),
+        Index("ix_shelters_lat_lng", "lat", "lng"),
+        *search_indexes("shelters"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     name = Column(String, nullable=False)
     location = Column(String, nullable=False)
     phone = Column(String, nullable=False)
@@ -56,14 +126,22 @@ class Shelter(Base):
     contact_person = Column(String)
     notes = Column(Text)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     opening_hours = Column(String)
+    search_text = search_text_column("name", "location")
 
 
 class MedicalStation(Base):
     __tablename__ = "medical_stations"
+    __table_args__ = (
+        Index("ix_medical_stations_updated_at_id", "updated_at", "id"),
+        Index("ix_medical_stations_lat_lng", "lat", "lng"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     station_type = Column(String, nullable=False)
     name = Column(String, nullable=False)
     status = Column(String, nullable=False)
@@ -77,6 +155,8 @@ class MedicalStation(Base):
     medical_staff = Column(Integer)
     daily_capacity = Column(Integer)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     affiliated_organization = Column(String)
     notes = Column(Text)
     link = Column(String)
@@ -84,9 +164,14 @@ class MedicalStation(Base):
 
 class MentalHealthResource(Base):
     __tablename__ = "mental_health_resources"
+    __table_args__ = (
+        Index("ix_mental_health_resources_updated_at_id", "updated_at", "id"),
+        Index("ix_mental_health_resources_lat_lng", "lat", "lng"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     duration_type = Column(String, nullable=False)
     name = Column(String, nullable=False)
     service_format = Column(String, nullable=False)
@@ -101,6 +186,8 @@ class MentalHealthResource(Base):
     languages = Column(JSONB)
     location = Column(String)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     capacity = Column(Integer)
     waiting_time = Column(String)
     notes = Column(Text)
@@ -108,9 +195,15 @@ class MentalHealthResource(Base):
 
 class Accommodation(Base):
     __tablename__ = "accommodations"
+    __table_args__ = (
+        Index("ix_accommodations_updated_at_id", "updated_at", "id"),
+        Index("ix_accommodations_lat_lng", "lat", "lng"),
+        *search_indexes("accommodations"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     township = Column(String, nullable=False)
     name = Column(String, nullable=False)
     has_vacancy = Column(String, nullable=False)
@@ -122,19 +215,27 @@ class Accommodation(Base):
     restrictions = Column(String)
     room_info = Column(String)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     info_source = Column(String)
     notes = Column(Text)
     capacity = Column(Integer)
     registration_method = Column(String)
     facilities = Column(JSONB)
     distance_to_disaster_area = Column(String)
+    search_text = search_text_column("name", "address")
 
 
 class ShowerStation(Base):
     __tablename__ = "shower_stations"
+    __table_args__ = (
+        Index("ix_shower_stations_updated_at_id", "updated_at", "id"),
+        Index("ix_shower_stations_lat_lng", "lat", "lng"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     name = Column(String, nullable=False)
     address = Column(String, nullable=False)
     facility_type = Column(String, nullable=False)
@@ -144,6 +245,8 @@ class ShowerStation(Base):
     status = Column(String, nullable=False)
     requires_appointment = Column(Boolean, nullable=False)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     phone = Column(String)
     gender_schedule = Column(JSONB)
     capacity = Column(Integer)
@@ -157,9 +260,14 @@ class ShowerStation(Base):
 
 class WaterRefillStation(Base):
     __tablename__ = "water_refill_stations"
+    __table_args__ = (
+        Index("ix_water_refill_stations_updated_at_id", "updated_at", "id"),
+        Index("ix_water_refill_stations_lat_lng", "lat", "lng"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     name = Column(String, nullable=False)
     address = Column(String, nullable=False)
     water_type = Column(String, nullable=False)
@@ -168,6 +276,8 @@ class WaterRefillStation(Base):
     status = Column(String, nullable=False)
     accessibility = Column(Boolean, nullable=False)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     phone = Column(String)
     container_required = Column(String)
     daily_capacity = Column(Integer)
@@ -180,9 +290,14 @@ class WaterRefillStation(Base):
 
 class Restroom(Base):
     __tablename__ = "restrooms"
+    __table_args__ = (
+        Index("ix_restrooms_updated_at_id", "updated_at", "id"),
+        Index("ix_restrooms_lat_lng", "lat", "lng"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     name = Column(String, nullable=False)
     address = Column(String, nullable=False)
     facility_type = Column(String, nullable=False)
@@ -192,6 +307,8 @@ class Restroom(Base):
     has_lighting = Column(Boolean, nullable=False)
     status = Column(String, nullable=False)
     coordinates = Column(JSONB)
+    lat = coordinate_column("lat")
+    lng = coordinate_column("lng")
     phone = Column(String)
     male_units = Column(Integer)
     female_units = Column(Integer)
@@ -207,9 +324,14 @@ class Restroom(Base):
 
 class HumanResource(Base):
     __tablename__ = "human_resources"
+    __table_args__ = (
+        Index("ix_human_resources_updated_at_id", "updated_at", "id"),
+        *search_indexes("human_resources"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     org = Column(String, nullable=False)
     address = Column(String, nullable=False)
     phone = Column(String, nullable=False)
@@ -234,13 +356,21 @@ class HumanResource(Base):
     assignment_notes = Column(Text)
     pii_date = Column(BigInteger, nullable=False, default=current_timestamp_int)
     valid_pin = Column(String)
+    search_text = search_text_column("org", "address", "role_name")
 
 
 class Supply(Base):
     __tablename__ = "supplies"
+    __table_args__ = (
+        Index("ix_supplies_updated_at_id", "updated_at", "id"),
+        # 只索引尚未全部到貨的供應單：預設清單（show_fulfilled=false）以此索引依分頁鍵掃描
+        Index("ix_supplies_open_updated_at_id", "updated_at", "id", postgresql_where=text("NOT is_fulfilled")),
+        *search_indexes("supplies"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     name = Column(String)
     address = Column(String)
     phone = Column(String)
@@ -248,25 +378,42 @@ class Supply(Base):
     supplies = relationship("SupplyItem", back_populates="supply", cascade="all, delete-orphan")
     pii_date = Column(BigInteger, nullable=False, default=current_timestamp_int)
     valid_pin = Column(String)
+    # 到貨進度：由物資項目彙總，於每次物資項目寫入的同一交易中更新（見 crud.refresh_supply_fulfillment）
+    items_total = Column(Integer, nullable=False, default=0)
+    items_fulfilled = Column(Integer, nullable=False, default=0)
+    units_needed = Column(BigInteger, nullable=False, default=0)
+    units_received = Column(BigInteger, nullable=False, default=0)
+    is_fulfilled = Column(Boolean, nullable=False, default=True)
+    search_text = search_text_column("name", "address")
 
 
 class SupplyItem(Base):
     __tablename__ = "supply_items"
+    __table_args__ = (
+        Index("ix_supply_items_updated_at_id", "updated_at", "id"),
+        *search_indexes("supply_items"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid_str)
     supply_id = Column(String, ForeignKey("supplies.id"), nullable=False)
+    created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
+    updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     total_number = Column(Integer, nullable=False)
     tag = Column(String, nullable=False)
     name = Column(String)
     received_count = Column(Integer)
     unit = Column(String)
+    search_text = search_text_column("name")
     supply = relationship("Supply", back_populates="supplies")
 
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (Index("ix_reports_updated_at_id", "updated_at", "id"),)
     id = Column(String, primary_key=True, default=generate_uuid_str)
     created_at = Column(BigInteger, nullable=False, default=current_timestamp_int)
     updated_at = Column(BigInteger, nullable=False, default=current_timestamp_int, onupdate=current_timestamp_int)
+    row_version = row_version_column()
     location_id = Column(String, nullable=False)
     name = Column(String, nullable=False)
     location_type = Column(String, nullable=False)
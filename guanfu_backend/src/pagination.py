@@ -0,0 +1,82 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def keyset_columns(model) -> Tuple:
+    """
+    取得 keyset 分頁使用的排序欄位：
+    - 有 updated_at 的資料表以 (updated_at, id) 排序。
+    - 沒有 updated_at 的資料表（例如 VolunteerOrganization）僅以 id 排序。
+    """
+    updated_at = getattr(model, "updated_at", None)
+    if updated_at is not None:
+        return updated_at, model.id
+    return (model.id,)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    將排序鍵值編碼為不透明的 cursor 字串（URL-safe base64 JSON）。
+    """
+    raw = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+# cursor 中的整數須在 BIGINT 範圍內，超出時資料庫比較會出錯
+_INT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def cursor_value_matches(value: Any, expected: type) -> bool:
+    """
+    cursor 中的值是否為預期型別：bool 不視為 int，整數須在 BIGINT 範圍內。
+    """
+    if expected is int:
+        return type(value) is int and _INT_RANGE[0] <= value <= _INT_RANGE[1]
+    return isinstance(value, expected) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    解析 cursor 字串，並依 types 逐一檢查各值的型別；格式或型別不符時回傳 400，
+    錯誤的值不會進入查詢條件。
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not all(cursor_value_matches(value, expected) for value, expected in zip(values, types)):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
+
+def paginate(query, model, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """
+    套用排序與分頁：
+    - 一律以 keyset_columns 排序，避免資料在分頁間重複或遺漏。
+    - 提供 cursor 時以 (updated_at, id) > cursor 取代 offset，深頁查詢成本固定。
+    - 未提供 cursor 時維持原本的 offset/limit 行為（向下相容）。
+    """
+    keys = keyset_columns(model)
+    query = query.order_by(*keys)
+    if cursor:
+        values = decode_cursor(cursor, [column.type.python_type for column in keys])
+        return query.filter(tuple_(*keys) > tuple(values)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+
+def next_cursor(model, items: Sequence[Any], limit: int) -> Optional[str]:
+    """
+    依本頁最後一筆資料產生下一頁 cursor；本頁未滿 limit 代表已無下一頁。
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column in keyset_columns(model)])
@@ -0,0 +1,83 @@
+from typing import Dict, FrozenSet, NamedTuple, Tuple, Type
+
+from pydantic import BaseModel
+
+from . import models, schemas
+
+
+class Resource(NamedTuple):
+    """
+    資源登錄：對應 API 路徑名稱、ORM 模型與對外回應 schema。
+    """
+    model: Type[models.Base]
+    schema: Type[BaseModel]
+
+
+# 具備 updated_at 的資源（volunteer_organizations 只有 last_updated，不列入）
+RESOURCES: Dict[str, Resource] = {
+    "shelters": Resource(models.Shelter, schemas.Shelter),
+    "medical_stations": Resource(models.MedicalStation, schemas.MedicalStation),
+    "mental_health_resources": Resource(models.MentalHealthResource, schemas.MentalHealthResource),
+    "accommodations": Resource(models.Accommodation, schemas.Accommodation),
+    "shower_stations": Resource(models.ShowerStation, schemas.ShowerStation),
+    "water_refill_stations": Resource(models.WaterRefillStation, schemas.WaterRefillStation),
+    "restrooms": Resource(models.Restroom, schemas.Restroom),
+    "human_resources": Resource(models.HumanResource, schemas.HumanResource),
+    "supplies": Resource(models.Supply, schemas.SupplySummary),
+    "supply_items": Resource(models.SupplyItem, schemas.SupplyItem),
+    "reports": Resource(models.Report, schemas.Report),
+}
+
+
+class PointFacility(NamedTuple):
+    """
+    具有 coordinates 的據點類型（供 /nearby 等地理查詢）：
+    - address_column: 回應中作為地址顯示的欄位。
+    - active_statuses: 視為「營運中」的狀態，未指定 status 篩選時只回傳這些。
+    """
+    model: Type[models.Base]
+    address_column: str
+    active_statuses: FrozenSet[str]
+
+
+POINT_FACILITIES: Dict[str, PointFacility] = {
+    "shelters": PointFacility(models.Shelter, "location", frozenset({"open"})),
+    "medical_stations": PointFacility(models.MedicalStation, "detailed_address", frozenset({"active"})),
+    "mental_health_resources": PointFacility(models.MentalHealthResource, "location", frozenset({"active"})),
+    "accommodations": PointFacility(models.Accommodation, "address", frozenset({"active"})),
+    "shower_stations": PointFacility(models.ShowerStation, "address", frozenset({"active"})),
+    "water_refill_stations": PointFacility(models.WaterRefillStation, "address", frozenset({"active"})),
+    "restrooms": PointFacility(models.Restroom, "address", frozenset({"active"})),
+}
+
+
+class SearchTarget(NamedTuple):
+    """
+    支援 q= 搜尋的資源與比對的文字欄位（須與模型 search_text_column 的欄位相同；行程內索引使用）。
+    """
+    model: Type[models.Base]
+    columns: Tuple[str, ...]
+
+
+SEARCHABLE: Dict[str, SearchTarget] = {
+    "human_resources": SearchTarget(models.HumanResource, ("org", "address", "role_name")),
+    "supplies": SearchTarget(models.Supply, ("name", "address")),
+    "supply_items": SearchTarget(models.SupplyItem, ("name",)),
+    "shelters": SearchTarget(models.Shelter, ("name", "location")),
+    "accommodations": SearchTarget(models.Accommodation, ("name", "address")),
+    "volunteer_organizations": SearchTarget(models.VolunteerOrganization, ("organization_name",)),
+}
+
+
+class AutocompleteField(NamedTuple):
+    """
+    提供 /autocomplete 輸入建議的欄位。
+    """
+    model: Type[models.Base]
+    column: str
+
+
+AUTOCOMPLETE_FIELDS: Dict[str, AutocompleteField] = {
+    "supply_item.name": AutocompleteField(models.SupplyItem, "name"),
+    "supply_item.unit": AutocompleteField(models.SupplyItem, "unit"),
+}
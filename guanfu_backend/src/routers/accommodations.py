@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..search import SEARCH_QUERY_DESCRIPTION, normalize_query, search_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..enum_serializer import AccommodationVacancyEnum, AccommodationStatusEnum
 
 router = APIRouter(
@@ -11,15 +14,23 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,has_vacancy,coordinates")
+
 
 @router.get("/", response_model=schemas.AccommodationCollection, summary="取得庇護所清單")
-def list_accommodations(
+async def list_accommodations(
+        request: Request,
+        response: Response,
         status: Optional[AccommodationStatusEnum] = Query(None),
         township: Optional[str] = Query(None),
         has_vacancy: Optional[AccommodationVacancyEnum] = Query(None),
+        q: Optional[str] = Query(None, max_length=100, description=SEARCH_QUERY_DESCRIPTION),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得住宿資源清單 (分頁)
@@ -29,40 +40,87 @@ def list_accommodations(
         "township": township,
         "has_vacancy": has_vacancy,
     }
-    accommodations = crud.get_multi(db, models.Accommodation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Accommodation, **filters)
-    return {"member": accommodations, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.Accommodation, schemas.Accommodation, parse_fields(fields, models.Accommodation, schemas.Accommodation))
+    query = normalize_query(q)
+    if query is not None:
+        accommodations, total = await search_rows(
+            db, "accommodations", serializer.columns, query, skip=offset, limit=limit, cursor=cursor,
+            include_total=include_total, **filters
+        )
+        return serializer.collection(accommodations, total, limit, offset, keyset=False)
+    accommodations, total = await crud_async.get_page_rows(
+        db, models.Accommodation, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.Accommodation, accommodations, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(accommodations, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出住宿資源資料（NDJSON / CSV）")
+async def export_accommodations(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[AccommodationStatusEnum] = Query(None),
+        township: Optional[str] = Query(None),
+        has_vacancy: Optional[AccommodationVacancyEnum] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部住宿資源資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {
+        "status": status,
+        "township": township,
+        "has_vacancy": has_vacancy,
+    }
+    serializer = row_serializer(models.Accommodation, schemas.Accommodation, parse_fields(fields, models.Accommodation, schemas.Accommodation))
+    return export_rows(request, db, "accommodations", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.Accommodation, status_code=201, summary="建立庇護所")
-def create_accommodation(
-        accommodation_in: schemas.AccommodationCreate, db: Session = Depends(get_db)
+async def create_accommodation(
+        accommodation_in: schemas.AccommodationCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立住宿資源
     """
-    return crud.create(db, models.Accommodation, obj_in=accommodation_in)
+    return await crud_async.create(db, models.Accommodation, obj_in=accommodation_in)
 
 
 @router.get("/{id}", response_model=schemas.Accommodation, summary="取得特定庇護所")
-def get_accommodation(id: str, db: Session = Depends(get_db)):
+async def get_accommodation(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一住宿資源
     """
-    db_accommodation = crud.get_by_id(db, models.Accommodation, id)
+    serializer = row_serializer(models.Accommodation, schemas.Accommodation, parse_fields(fields, models.Accommodation, schemas.Accommodation))
+    db_accommodation = await crud_async.get_row(db, models.Accommodation, id, serializer.columns)
     if db_accommodation is None:
         raise HTTPException(status_code=404, detail="Accommodation not found")
-    return db_accommodation
+    etag = row_etag(models.Accommodation, db_accommodation, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_accommodation, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.Accommodation, summary="更新特定庇護所資料")
-def patch_accommodation(
-        id: str, accommodation_in: schemas.AccommodationPatch, db: Session = Depends(get_db)
+async def patch_accommodation(
+        id: str, accommodation_in: schemas.AccommodationPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新住宿資源 (部分欄位)
     """
-    db_accommodation = crud.get_by_id(db, models.Accommodation, id)
+    db_accommodation = await crud_async.update_by_id(db, models.Accommodation, id, accommodation_in)
     if db_accommodation is None:
         raise HTTPException(status_code=404, detail="Accommodation not found")
-    return crud.update(db, db_obj=db_accommodation, obj_in=accommodation_in)
+    return db_accommodation
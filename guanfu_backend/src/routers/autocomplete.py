@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from .. import schemas
+from ..autocomplete import autocomplete_indexes
+from ..database import DbSession, get_db
+from ..resources import AUTOCOMPLETE_FIELDS
+
+router = APIRouter(
+    prefix="/autocomplete",
+    tags=["輸入建議（Autocomplete）"],
+)
+
+
+@router.get("", response_model=schemas.AutocompleteCollection, summary="取得輸入建議")
+async def autocomplete(
+        field: str = Query(..., description=f"欄位：{', '.join(AUTOCOMPLETE_FIELDS)}"),
+        prefix: str = Query(..., min_length=1, max_length=50, description="已輸入的開頭文字"),
+        limit: int = Query(10, ge=1, le=50),
+        db: DbSession = Depends(get_db)
+):
+    """
+    依已輸入的開頭文字列出既有的值，讓填寫表單時沿用相同寫法（例如物資名稱「礦泉水」）
+
+    - 依目前資料中的使用次數排序，忽略全形 / 半形與大小寫差異，回傳最常見的寫法。
+    - 由行程內索引查詢，不讀取資料表；本 worker 的寫入立即反映。
+    """
+    if field not in AUTOCOMPLETE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown field: {field}")
+    index = await autocomplete_indexes.get(db, field)
+    return {
+        "field": field,
+        "prefix": prefix,
+        "member": [{"value": value, "count": count} for value, count in index.suggest(prefix, limit)],
+    }
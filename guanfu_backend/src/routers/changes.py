@@ -0,0 +1,94 @@
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from .. import crud_async, schemas
+from ..config import settings
+from ..database import DbSession, get_db
+from ..models import current_timestamp_int
+from ..pagination import cursor_value_matches, decode_cursor, encode_cursor
+from ..resources import RESOURCES
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["增量同步（Changes）"],
+)
+
+_last_watermark = 0
+_watermark_lock = threading.Lock()
+
+
+def _server_watermark() -> int:
+    """
+    伺服器水位線：目前時間減去保留秒數，且在本行程內只增不減。
+    """
+    global _last_watermark
+    with _watermark_lock:
+        candidate = current_timestamp_int() - settings.CHANGES_SAFETY_LAG_SECONDS
+        _last_watermark = max(_last_watermark, candidate)
+        return _last_watermark
+
+
+def _valid_position(position) -> bool:
+    """
+    cursor 中各資源的續傳位置：null，或上一次停止的 [updated_at, id]。
+    """
+    return position is None or (
+        isinstance(position, list) and len(position) == 2
+        and cursor_value_matches(position[0], int) and cursor_value_matches(position[1], str)
+    )
+
+
+@router.get("/", response_model=schemas.ChangeFeed, summary="取得增量異動資料")
+async def list_changes(
+        since: int = Query(0, ge=0, description="上次同步回應中的 watermark（Unix timestamp），首次同步帶 0"),
+        types: Optional[str] = Query(None, description="以逗號分隔的資源類型，例如 shelters,supplies；預設全部"),
+        limit: int = Query(500, ge=1, le=2000, description="每種資源單次最多回傳筆數"),
+        cursor: Optional[str] = Query(None, description="has_more 為 true 時帶入上次回應的 cursor 繼續取得"),
+        db: DbSession = Depends(get_db)
+):
+    """
+    取得 since 之後新增或修改的資料（跨所有資源，一次回應）
+
+    - 回傳 since < updated_at <= watermark 的資料列；下次同步以 watermark 作為 since。
+    - 若某資源超過 limit 筆，has_more 為 true，請以相同 since / types 帶入 cursor 續取，
+      續取期間 watermark 固定不變，直到 has_more 為 false。
+    """
+    if types:
+        names = [name.strip() for name in types.split(",") if name.strip()]
+        unknown = [name for name in names if name not in RESOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(unknown)}")
+    else:
+        names = list(RESOURCES)
+
+    if cursor:
+        watermark, positions = decode_cursor(cursor, (int, dict))
+        if watermark < 0 or not set(positions) <= set(names) or not all(map(_valid_position, positions.values())):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+    else:
+        watermark = _server_watermark()
+        positions = {name: None for name in names}
+
+    changes = {name: [] for name in names}
+    next_positions = {}
+    for name, after in positions.items():
+        resource = RESOURCES[name]
+        rows = await crud_async.get_changes(db, resource.model, since, watermark, after=after, limit=limit + 1)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_positions[name] = [rows[-1].updated_at, rows[-1].id]
+        changes[name] = [
+            {**resource.schema.model_validate(row).model_dump(mode="json"), "updated_at": row.updated_at}
+            for row in rows
+        ]
+
+    has_more = bool(next_positions)
+    return {
+        "since": since,
+        "watermark": max(watermark, since),
+        "has_more": has_more,
+        "cursor": encode_cursor([watermark, next_positions]) if has_more else None,
+        "changes": changes,
+    }
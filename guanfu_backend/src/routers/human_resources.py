@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import ValidationError
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
-from ..enum_serializer import HumanResourceRoleStatusEnum, HumanResourceRoleTypeEnum, HumanResourceStatusEnum
+from .. import crud_async, models, schemas
+from ..crud import CONCURRENT_UPDATE_DETAIL, headcount_conditions
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..search import SEARCH_QUERY_DESCRIPTION, normalize_query, search_rows
+from ..serialization import fields_description, parse_fields, row_serializer
+from ..enum_serializer import (
+    HumanResourceRoleStatusEnum, HumanResourceRoleTypeEnum, HumanResourceStatusEnum, normalize_payload_dict
+)
 from ..pin_related import generate_pin
+from ..validation import simplify_errors
 
 router = APIRouter(
     prefix="/human_resources",
@@ -12,15 +20,38 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,org,role_name,headcount_need,headcount_got")
+
+
+def _headcount_error(resource_in: schemas.HumanResourcePatch, db_resource: models.HumanResource) -> Optional[str]:
+    """
+    更新時的人數檢核（單筆與批次更新共用），通過時回傳 None。
+    """
+    if resource_in.headcount_need is None and resource_in.headcount_got is None:
+        return None
+    if resource_in.headcount_need == resource_in.headcount_got:
+        return "headcount_need and headcount_got are locked because their values are equal; updates are not allowed."
+    headcount_need = resource_in.headcount_need if resource_in.headcount_need is not None else db_resource.headcount_need
+    headcount_got = resource_in.headcount_got if resource_in.headcount_got is not None else db_resource.headcount_got
+    if headcount_got > headcount_need:
+        return "headcount_got must be less than or equal to headcount_need."
+    return None
+
 
 @router.get("/", response_model=schemas.HumanResourceCollection, summary="取得人力需求清單")
-def list_human_resources(
+async def list_human_resources(
+        request: Request,
+        response: Response,
         status: Optional[HumanResourceStatusEnum] = Query(None),
         role_status: Optional[HumanResourceRoleStatusEnum] = Query(None),
         role_type: Optional[HumanResourceRoleTypeEnum] = Query(None),
+        q: Optional[str] = Query(None, max_length=100, description=SEARCH_QUERY_DESCRIPTION),
         limit: int = Query(20, ge=1, le=200),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得人力需求清單 (分頁)
@@ -30,52 +61,235 @@ def list_human_resources(
         "role_status": role_status,
         "role_type": role_type,
     }
-    resources = crud.get_multi(db, models.HumanResource, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.HumanResource, **filters)
-    return {"member": resources, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.HumanResource, schemas.HumanResource, parse_fields(fields, models.HumanResource, schemas.HumanResource))
+    query = normalize_query(q)
+    if query is not None:
+        resources, total = await search_rows(
+            db, "human_resources", serializer.columns, query, skip=offset, limit=limit, cursor=cursor,
+            include_total=include_total, **filters
+        )
+        return serializer.collection(resources, total, limit, offset, keyset=False)
+    resources, total = await crud_async.get_page_rows(
+        db, models.HumanResource, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.HumanResource, resources, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(resources, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出人力需求資料（NDJSON / CSV）")
+async def export_human_resources(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[HumanResourceStatusEnum] = Query(None),
+        role_status: Optional[HumanResourceRoleStatusEnum] = Query(None),
+        role_type: Optional[HumanResourceRoleTypeEnum] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部人力需求資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {
+        "status": status,
+        "role_status": role_status,
+        "role_type": role_type,
+    }
+    serializer = row_serializer(models.HumanResource, schemas.HumanResource, parse_fields(fields, models.HumanResource, schemas.HumanResource))
+    return export_rows(request, db, "human_resources", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.HumanResourceWithPin, status_code=201, summary="建立人力需求")
-def create_human_resource(
-        resource_in: schemas.HumanResourceCreate, db: Session = Depends(get_db)
+async def create_human_resource(
+        resource_in: schemas.HumanResourceCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立人力需求/角色
     """
     if resource_in.headcount_got > resource_in.headcount_need:
         raise HTTPException(status_code=400, detail="headcount_got must be less than or equal to headcount_need.")
-    return crud.create_with_input(db, models.HumanResource, obj_in=resource_in, valid_pin=generate_pin())
+    return await crud_async.create_with_input(db, models.HumanResource, obj_in=resource_in, valid_pin=generate_pin())
+
+
+@router.post("/bulk", response_model=schemas.BulkResult, response_model_exclude_none=True, summary="批次建立人力需求")
+async def bulk_create_human_resources(
+        payload: schemas.HumanResourceBulkCreate,
+        all_or_nothing: bool = Query(False, description="任何一筆驗證失敗即整批不建立"),
+        db: DbSession = Depends(get_db)
+):
+    """
+    批次建立人力需求/角色（供匯入腳本使用）
+
+    - 每筆資料以與單筆建立相同的規則驗證，錯誤依 index 逐筆回報，不影響其他筆。
+    - 通過驗證的資料各自產生 PIN，並以單一交易、多列 INSERT ... RETURNING 一次寫入。
+    - all_or_nothing=true 時若有任何錯誤回傳 400，不建立任何資料。
+    """
+    results = []
+    rows = []
+    for index, item in enumerate(payload.items):
+        try:
+            resource_in = schemas.HumanResourceCreate.model_validate(item)
+        except ValidationError as exc:
+            results.append(schemas.BulkItemResult(index=index, status="error", errors=simplify_errors(exc.errors())))
+            continue
+        if resource_in.headcount_got > resource_in.headcount_need:
+            results.append(schemas.BulkItemResult(index=index, status="error", errors={
+                "headcount_got": ["headcount_got must be less than or equal to headcount_need."]
+            }))
+            continue
+        valid_pin = generate_pin()
+        rows.append(normalize_payload_dict({**resource_in.model_dump(mode="json"), "valid_pin": valid_pin}))
+        results.append(schemas.BulkItemResult(index=index, status="created", valid_pin=valid_pin))
+
+    failed = [result for result in results if result.status == "error"]
+    if failed and all_or_nothing:
+        raise HTTPException(status_code=400, detail=[result.model_dump(exclude_none=True) for result in failed])
+
+    ids = iter(await crud_async.bulk_create(db, models.HumanResource, rows))
+    for result in results:
+        if result.status == "created":
+            result.id = next(ids)
+    return {"succeeded": len(rows), "failed": len(failed), "results": results}
+
+
+@router.patch("/bulk", response_model=schemas.BulkResult, response_model_exclude_none=True, summary="批次更新人力需求")
+async def bulk_patch_human_resources(
+        payload: schemas.HumanResourceBulkPatch,
+        all_or_nothing: bool = Query(False, description="任何一筆檢核失敗即整批不更新"),
+        db: DbSession = Depends(get_db)
+):
+    """
+    批次更新人力需求/角色（供修正腳本使用）
+
+    - 每筆為 {id, valid_pin, ...欲更新欄位}，以一次 IN 查詢載入所有目標。
+    - PIN 與人數檢核與單筆更新相同，於記憶體中逐筆進行，錯誤依 index 回報。
+    - 通過檢核的資料於單一交易中以批次 UPDATE 寫入。
+    - all_or_nothing=true 時若有任何錯誤回傳 400，不更新任何資料。
+    """
+    results = []
+    parsed = []
+    for index, item in enumerate(payload.items):
+        try:
+            parsed.append((index, schemas.HumanResourceBulkPatchItem.model_validate(item)))
+        except ValidationError as exc:
+            results.append(schemas.BulkItemResult(index=index, status="error", errors=simplify_errors(exc.errors())))
+
+    db_resources = await crud_async.get_by_ids(db, models.HumanResource, [item.id for _, item in parsed])
+    resources_map = {str(resource.id): resource for resource in db_resources}
+
+    rows = []
+    seen = set()
+    for index, item in parsed:
+        db_resource = resources_map.get(item.id)
+        if db_resource is None:
+            errors = {"id": ["Human Resource not found"]}
+        elif item.id in seen:
+            errors = {"id": ["Duplicate id in this batch."]}
+        elif db_resource.valid_pin and db_resource.valid_pin != item.valid_pin:
+            errors = {"valid_pin": ["The PIN you entered is incorrect."]}
+        else:
+            message = _headcount_error(item, db_resource)
+            errors = {"headcount_got": [message]} if message else None
+        if errors:
+            results.append(schemas.BulkItemResult(index=index, status="error", id=item.id, errors=errors))
+            continue
+        seen.add(item.id)
+        changes = normalize_payload_dict(item.model_dump(mode="json", exclude_unset=True, exclude={"id", "valid_pin"}))
+        rows.append({"id": db_resource.id, **changes})
+        results.append(schemas.BulkItemResult(index=index, status="updated", id=item.id))
+
+    results.sort(key=lambda result: result.index)
+    failed = [result for result in results if result.status == "error"]
+    if failed and all_or_nothing:
+        raise HTTPException(status_code=400, detail=[result.model_dump(exclude_none=True) for result in failed])
+
+    await crud_async.bulk_update(db, models.HumanResource, rows)
+    return {"succeeded": len(rows), "failed": len(failed), "results": results}
+
+
+async def _adjust_headcount(db: DbSession, id: str, delta: int, conflict_detail: str) -> models.HumanResource:
+    db_resource = await crud_async.adjust_headcount(db, id, delta)
+    if db_resource is not None:
+        return db_resource
+    # 條件式 UPDATE 沒有命中時才再查一次，區分「不存在」與「人數條件不符」
+    if await crud_async.get_by_id(db, models.HumanResource, id) is None:
+        raise HTTPException(status_code=404, detail="Human Resource not found")
+    raise HTTPException(status_code=400, detail=conflict_detail)
+
+
+@router.post("/{id}/signup", response_model=schemas.HumanResource, summary="報名人力需求")
+async def signup_human_resource(
+        id: str, signup_in: Optional[schemas.HumanResourceSignup] = None, db: DbSession = Depends(get_db)
+):
+    """
+    報名人力需求/角色（headcount_got 原子累加，預設 1 人）
+
+    - 不超過 headcount_need；額滿時同時將 role_status 設為 completed、is_completed 設為 true。
+    - 多人同時報名不會互相覆蓋。
+    """
+    count = signup_in.count if signup_in else 1
+    return await _adjust_headcount(
+        db, id, count, "This role is full, cancelled, or does not have enough remaining headcount."
+    )
+
+
+@router.post("/{id}/withdraw", response_model=schemas.HumanResource, summary="取消報名人力需求")
+async def withdraw_human_resource(
+        id: str, signup_in: Optional[schemas.HumanResourceSignup] = None, db: DbSession = Depends(get_db)
+):
+    """
+    取消報名人力需求/角色（headcount_got 原子扣減，預設 1 人，不低於 0）
+    """
+    count = signup_in.count if signup_in else 1
+    return await _adjust_headcount(db, id, -count, "headcount_got cannot go below zero.")
 
 
 @router.get("/{id}", response_model=schemas.HumanResource, summary="取得特定人力需求")
-def get_human_resource(id: str, db: Session = Depends(get_db)):
+async def get_human_resource(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一人力需求/角色
     """
-    db_resource = crud.get_by_id(db, models.HumanResource, id)
+    serializer = row_serializer(models.HumanResource, schemas.HumanResource, parse_fields(fields, models.HumanResource, schemas.HumanResource))
+    db_resource = await crud_async.get_row(db, models.HumanResource, id, serializer.columns)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Human Resource not found")
-    return db_resource
+    etag = row_etag(models.HumanResource, db_resource, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_resource, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.HumanResource, summary="更新特定人力需求")
-def patch_human_resource(
-        id: str, resource_in: schemas.HumanResourcePatch, db: Session = Depends(get_db)
+async def patch_human_resource(
+        id: str, resource_in: schemas.HumanResourcePatch, db: DbSession = Depends(get_db)
 ):
     """
     更新人力需求/角色 (部分欄位)
     """
-    db_resource = crud.get_by_id(db, models.HumanResource, id)
+    # validate num（只依輸入即可判斷的部分先檢查，其餘條件寫在 UPDATE 的 WHERE 中）
+    if resource_in.headcount_need is not None and resource_in.headcount_need == resource_in.headcount_got:
+        raise HTTPException(status_code=400, detail="headcount_need and headcount_got are locked because their values are equal; updates are not allowed.")
+    db_resource = await crud_async.update_by_id(
+        db, models.HumanResource, id, resource_in, *headcount_conditions(resource_in)
+    )
+    if db_resource is not None:
+        return db_resource
+
+    # 條件式 UPDATE 沒有命中：再查一次以回報原因
+    db_resource = await crud_async.get_by_id(db, models.HumanResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Human Resource not found")
     if db_resource.valid_pin and db_resource.valid_pin != resource_in.valid_pin:
         raise HTTPException(status_code=400, detail="The PIN you entered is incorrect.")
-    # validate num
-    if resource_in.headcount_need is not None or resource_in.headcount_got is not None:
-        if resource_in.headcount_need == resource_in.headcount_got:
-            raise HTTPException(status_code=400, detail="headcount_need and headcount_got are locked because their values are equal; updates are not allowed.")
-        headcount_need = resource_in.headcount_need if resource_in.headcount_need is not None else db_resource.headcount_need
-        headcount_got = resource_in.headcount_got if resource_in.headcount_got is not None else db_resource.headcount_got
-        if headcount_got > headcount_need:
-            raise HTTPException(status_code=400, detail="headcount_got must be less than or equal to headcount_need.")
-    return crud.update(db, db_obj=db_resource, obj_in=resource_in)
+    message = _headcount_error(resource_in, db_resource)
+    raise HTTPException(status_code=400, detail=message or CONCURRENT_UPDATE_DETAIL)
@@ -0,0 +1,136 @@
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from .. import schemas
+from ..config import settings
+from ..database import DbSession, get_db
+from ..geo import CLUSTER_GRID_BITS, Cluster, GeoPoint, facility_index, tile_bounds, tile_cache, tile_of
+from ..resources import POINT_FACILITIES
+
+router = APIRouter(
+    prefix="/map",
+    tags=["地圖（Map）"],
+)
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lng, max_lat, max_lng)
+
+
+def _parse_bbox(bbox: str) -> BBox:
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat.")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat.")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _parse_types(types: Optional[str]) -> List[str]:
+    if not types:
+        return list(POINT_FACILITIES)
+    names = [name.strip() for name in types.split(",") if name.strip()]
+    unknown = [name for name in names if name not in POINT_FACILITIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(unknown)}")
+    return names
+
+
+def _pin(point: GeoPoint) -> Dict:
+    return {
+        "kind": "pin",
+        "coordinates": {"lat": point.lat, "lng": point.lng},
+        "type": point.type,
+        "id": point.id,
+        "name": point.name,
+        "status": point.status,
+    }
+
+
+def _tile_range(bbox: BBox, zoom: int) -> Tuple[int, int, int, int]:
+    min_lat, min_lng, max_lat, max_lng = bbox
+    x0, y0 = tile_of(max_lat, min_lng, zoom)
+    x1, y1 = tile_of(min_lat, max_lng, zoom)
+    return x0, y0, x1, y1
+
+
+def _clusters(indexes: Dict, statuses: Dict[str, FrozenSet[str]], bbox: BBox, zoom: int) -> List[Dict]:
+    """
+    合併各資料表在 bbox 涵蓋圖磚中的叢集，只保留格子與 bbox 相交者；只有一筆的格子直接以圖釘呈現。
+    """
+    x0, y0, x1, y1 = _tile_range(bbox, zoom)
+    merged: Dict[Tuple[int, int], Cluster] = {}
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            for name, index in indexes.items():
+                for cell, cluster in tile_cache.get(index, name, statuses[name], zoom, x, y).items():
+                    target = merged.get(cell)
+                    if target is None:
+                        target = merged[cell] = Cluster()
+                    target.merge(cluster)
+
+    min_lat, min_lng, max_lat, max_lng = bbox
+    features = []
+    for (cell_x, cell_y), cluster in merged.items():
+        cell_min_lat, cell_min_lng, cell_max_lat, cell_max_lng = tile_bounds(zoom + CLUSTER_GRID_BITS, cell_x, cell_y)
+        if cell_max_lat < min_lat or cell_min_lat > max_lat or cell_max_lng < min_lng or cell_min_lng > max_lng:
+            continue
+        if cluster.count == 1:
+            features.append(_pin(cluster.point))
+            continue
+        features.append({
+            "kind": "cluster",
+            "coordinates": {"lat": cluster.sum_lat / cluster.count, "lng": cluster.sum_lng / cluster.count},
+            "count": cluster.count,
+            "types": dict(cluster.types),
+            "bbox": [cell_min_lng, cell_min_lat, cell_max_lng, cell_max_lat],
+        })
+    return features
+
+
+@router.get("/pins", response_model=schemas.MapPinCollection, response_model_exclude_none=True, summary="取得地圖範圍內的據點圖釘")
+async def list_map_pins(
+        bbox: str = Query(..., description="地圖可視範圍 min_lng,min_lat,max_lng,max_lat"),
+        zoom: int = Query(..., ge=0, le=22, description="地圖縮放層級（Web Mercator）"),
+        types: Optional[str] = Query(None, description="以逗號分隔的據點類型，例如 shelters,restrooms；預設全部"),
+        status: Optional[str] = Query(None, description="以逗號分隔的狀態；預設只回傳營運中的據點（庇護所為 open，其他為 active）"),
+        db: DbSession = Depends(get_db)
+):
+    """
+    只回傳可視範圍內的據點，縮小時在伺服器端合併為叢集
+
+    - zoom 小於等於 MAP_CLUSTER_MAX_ZOOM 時，依圖磚再細分 8x8 格合併為叢集（count、各類型筆數、重心座標）；
+      只有一筆的格子直接回傳圖釘。
+    - 放大後回傳個別圖釘；範圍內超過 MAP_MAX_PINS 筆時仍改回傳叢集，回應大小有上限。
+    - 叢集以圖磚為單位快取，任何據點寫入後自動失效。
+    """
+    area = _parse_bbox(bbox)
+    names = _parse_types(types)
+    requested = frozenset(value.strip() for value in status.split(",") if value.strip()) if status else None
+    statuses = {name: requested if requested is not None else POINT_FACILITIES[name].active_statuses for name in names}
+    indexes = {name: await facility_index.get(db, name) for name in names}
+
+    if zoom > settings.MAP_CLUSTER_MAX_ZOOM:
+        pins = [
+            point
+            for name, index in indexes.items()
+            for point in index.in_bbox(*area)
+            if point.status in statuses[name]
+        ]
+        if len(pins) <= settings.MAP_MAX_PINS:
+            return {"zoom": zoom, "clustered": False, "totalItems": len(pins), "member": [_pin(point) for point in pins]}
+
+    # 叢集層級不超過實際 zoom；範圍涵蓋的圖磚太多時（例如過大的 bbox）改用較粗的層級
+    cluster_zoom = zoom
+    while cluster_zoom > 0:
+        x0, y0, x1, y1 = _tile_range(area, cluster_zoom)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= settings.MAP_MAX_TILES:
+            break
+        cluster_zoom -= 1
+    features = _clusters(indexes, statuses, area, cluster_zoom)
+    return {
+        "zoom": cluster_zoom,
+        "clustered": True,
+        "totalItems": sum(feature.get("count", 1) for feature in features),
+        "member": features,
+    }
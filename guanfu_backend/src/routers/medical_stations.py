@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..enum_serializer import MedicalStationTypeEnum, MedicalStationStatusEnum
 
 router = APIRouter(
@@ -11,53 +13,95 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,coordinates")
+
 
 @router.get("/", response_model=schemas.MedicalStationCollection, summary="取得醫療站清單")
-def list_medical_stations(
+async def list_medical_stations(
+        request: Request,
+        response: Response,
         status: Optional[MedicalStationStatusEnum] = Query(None),
         station_type: Optional[MedicalStationTypeEnum] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得醫療站清單 (分頁)
     """
     filters = {"status": status, "station_type": station_type}
-    stations = crud.get_multi(db, models.MedicalStation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.MedicalStation, **filters)
-    return {"member": stations, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.MedicalStation, schemas.MedicalStation, parse_fields(fields, models.MedicalStation, schemas.MedicalStation))
+    stations, total = await crud_async.get_page_rows(
+        db, models.MedicalStation, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.MedicalStation, stations, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(stations, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出醫療站資料（NDJSON / CSV）")
+async def export_medical_stations(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[MedicalStationStatusEnum] = Query(None),
+        station_type: Optional[MedicalStationTypeEnum] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部醫療站資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {"status": status, "station_type": station_type}
+    serializer = row_serializer(models.MedicalStation, schemas.MedicalStation, parse_fields(fields, models.MedicalStation, schemas.MedicalStation))
+    return export_rows(request, db, "medical_stations", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.MedicalStation, status_code=201, summary="建立醫療站")
-def create_medical_station(
-        station_in: schemas.MedicalStationCreate, db: Session = Depends(get_db)
+async def create_medical_station(
+        station_in: schemas.MedicalStationCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立醫療站
     """
-    return crud.create(db, models.MedicalStation, obj_in=station_in)
+    return await crud_async.create(db, models.MedicalStation, obj_in=station_in)
 
 
 @router.get("/{id}", response_model=schemas.MedicalStation, summary="取得特定醫療站")
-def get_medical_station(id: str, db: Session = Depends(get_db)):
+async def get_medical_station(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一醫療站
     """
-    db_station = crud.get_by_id(db, models.MedicalStation, id)
+    serializer = row_serializer(models.MedicalStation, schemas.MedicalStation, parse_fields(fields, models.MedicalStation, schemas.MedicalStation))
+    db_station = await crud_async.get_row(db, models.MedicalStation, id, serializer.columns)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Medical Station not found")
-    return db_station
+    etag = row_etag(models.MedicalStation, db_station, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_station, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.MedicalStation, summary="更新特定醫療站")
-def patch_medical_station(
-        id: str, station_in: schemas.MedicalStationPatch, db: Session = Depends(get_db)
+async def patch_medical_station(
+        id: str, station_in: schemas.MedicalStationPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新醫療站 (部分欄位)
     """
-    db_station = crud.get_by_id(db, models.MedicalStation, id)
+    db_station = await crud_async.update_by_id(db, models.MedicalStation, id, station_in)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Medical Station not found")
-    return crud.update(db, db_obj=db_station, obj_in=station_in)
+    return db_station
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..enum_serializer import MentalHealthDurationEnum, MentalHealthFormatEnum, MentalHealthResourceStatusEnum
 
 router = APIRouter(
@@ -11,15 +13,22 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,coordinates")
+
 
 @router.get("/", response_model=schemas.MentalHealthResourceCollection, summary="取得心理健康資源清單")
-def list_mental_health_resources(
+async def list_mental_health_resources(
+        request: Request,
+        response: Response,
         status: Optional[MentalHealthResourceStatusEnum] = Query(None),
         duration_type: Optional[MentalHealthDurationEnum] = Query(None),
         service_format: Optional[MentalHealthFormatEnum] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得心理健康資源清單 (分頁)
@@ -29,40 +38,80 @@ def list_mental_health_resources(
         "duration_type": duration_type,
         "service_format": service_format,
     }
-    resources = crud.get_multi(db, models.MentalHealthResource, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.MentalHealthResource, **filters)
-    return {"member": resources, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.MentalHealthResource, schemas.MentalHealthResource, parse_fields(fields, models.MentalHealthResource, schemas.MentalHealthResource))
+    resources, total = await crud_async.get_page_rows(
+        db, models.MentalHealthResource, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.MentalHealthResource, resources, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(resources, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出心理健康資源資料（NDJSON / CSV）")
+async def export_mental_health_resources(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[MentalHealthResourceStatusEnum] = Query(None),
+        duration_type: Optional[MentalHealthDurationEnum] = Query(None),
+        service_format: Optional[MentalHealthFormatEnum] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部心理健康資源資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {
+        "status": status,
+        "duration_type": duration_type,
+        "service_format": service_format,
+    }
+    serializer = row_serializer(models.MentalHealthResource, schemas.MentalHealthResource, parse_fields(fields, models.MentalHealthResource, schemas.MentalHealthResource))
+    return export_rows(request, db, "mental_health_resources", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.MentalHealthResource, status_code=201, summary="建立心理健康資源")
-def create_mental_health_resource(
-        resource_in: schemas.MentalHealthResourceCreate, db: Session = Depends(get_db)
+async def create_mental_health_resource(
+        resource_in: schemas.MentalHealthResourceCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立心理健康資源
     """
-    return crud.create(db, models.MentalHealthResource, obj_in=resource_in)
+    return await crud_async.create(db, models.MentalHealthResource, obj_in=resource_in)
 
 
 @router.get("/{id}", response_model=schemas.MentalHealthResource, summary="取得特定心理健康資源")
-def get_mental_health_resource(id: str, db: Session = Depends(get_db)):
+async def get_mental_health_resource(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一心理健康資源
     """
-    db_resource = crud.get_by_id(db, models.MentalHealthResource, id)
+    serializer = row_serializer(models.MentalHealthResource, schemas.MentalHealthResource, parse_fields(fields, models.MentalHealthResource, schemas.MentalHealthResource))
+    db_resource = await crud_async.get_row(db, models.MentalHealthResource, id, serializer.columns)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Mental Health Resource not found")
-    return db_resource
+    etag = row_etag(models.MentalHealthResource, db_resource, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_resource, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.MentalHealthResource, summary="更新特定心理健康資源")
-def patch_mental_health_resource(
-        id: str, resource_in: schemas.MentalHealthResourcePatch, db: Session = Depends(get_db)
+async def patch_mental_health_resource(
+        id: str, resource_in: schemas.MentalHealthResourcePatch, db: DbSession = Depends(get_db)
 ):
     """
     更新心理健康資源 (部分欄位)
     """
-    db_resource = crud.get_by_id(db, models.MentalHealthResource, id)
+    db_resource = await crud_async.update_by_id(db, models.MentalHealthResource, id, resource_in)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Mental Health Resource not found")
-    return crud.update(db, db_obj=db_resource, obj_in=resource_in)
+    return db_resource
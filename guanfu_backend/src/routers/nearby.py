@@ -0,0 +1,64 @@
+import heapq
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from .. import schemas
+from ..database import DbSession, get_db
+from ..geo import facility_index
+from ..resources import POINT_FACILITIES
+
+router = APIRouter(
+    prefix="/nearby",
+    tags=["地理查詢（Nearby）"],
+)
+
+
+@router.get("/", response_model=schemas.NearbyCollection, summary="查詢附近的據點")
+async def list_nearby(
+        lat: float = Query(..., ge=-90, le=90, description="目前位置緯度"),
+        lng: float = Query(..., ge=-180, le=180, description="目前位置經度"),
+        radius: float = Query(3000, gt=0, le=50000, description="搜尋半徑（公尺）"),
+        types: Optional[str] = Query(None, description="以逗號分隔的據點類型，例如 water_refill_stations,restrooms；預設全部"),
+        status: Optional[str] = Query(None, description="以逗號分隔的狀態；預設只回傳營運中的據點（庇護所為 open，其他為 active）"),
+        limit: int = Query(20, ge=1, le=200),
+        db: DbSession = Depends(get_db)
+):
+    """
+    依距離由近到遠列出半徑內的庇護所、醫療站、心理健康資源、住宿、洗澡點、飲水站與廁所
+
+    - 距離以 haversine 計算（公尺），totalItems 為半徑內符合條件的總數。
+    - 由行程內網格索引查詢，不逐筆讀取資料表；資料寫入後下一次查詢即反映。
+    """
+    if types:
+        names = [name.strip() for name in types.split(",") if name.strip()]
+        unknown = [name for name in names if name not in POINT_FACILITIES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(unknown)}")
+    else:
+        names = list(POINT_FACILITIES)
+    statuses = {value.strip() for value in status.split(",") if value.strip()} if status else None
+
+    matches = []
+    for name in names:
+        allowed = statuses if statuses is not None else POINT_FACILITIES[name].active_statuses
+        index = await facility_index.get(db, name)
+        matches.extend(match for match in index.within(lat, lng, radius) if match[1].status in allowed)
+
+    nearest = heapq.nsmallest(limit, matches, key=lambda match: match[0])
+    return {
+        "totalItems": len(matches),
+        "limit": limit,
+        "member": [
+            {
+                "type": point.type,
+                "id": point.id,
+                "name": point.name,
+                "status": point.status,
+                "address": point.address,
+                "coordinates": {"lat": point.lat, "lng": point.lng},
+                "distance_m": round(distance, 1),
+            }
+            for distance, point in nearest
+        ],
+    }
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 
 router = APIRouter(
     prefix="/reports",
@@ -10,52 +12,93 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,reason")
+
 
 @router.get("/", response_model=schemas.ReportCollection, summary="取得回報事件清單")
-def list_reports(
+async def list_reports(
+        request: Request,
+        response: Response,
         status: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得回報事件清單 (分頁)
     """
     filters = {"status": status}
-    reports = crud.get_multi(db, models.Report, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Report, **filters)
-    return {"member": reports, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.Report, schemas.Report, parse_fields(fields, models.Report, schemas.Report))
+    reports, total = await crud_async.get_page_rows(
+        db, models.Report, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.Report, reports, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(reports, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出回報事件資料（NDJSON / CSV）")
+async def export_reports(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[bool] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部回報事件資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {"status": status}
+    serializer = row_serializer(models.Report, schemas.Report, parse_fields(fields, models.Report, schemas.Report))
+    return export_rows(request, db, "reports", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.Report, status_code=201, summary="建立回報事件")
-def create_report(
-        report_in: schemas.ReportCreate, db: Session = Depends(get_db)
+async def create_report(
+        report_in: schemas.ReportCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立回報事件
     """
-    return crud.create(db, models.Report, obj_in=report_in)
+    return await crud_async.create(db, models.Report, obj_in=report_in)
 
 
 @router.get("/{id}", response_model=schemas.Report, summary="取得特定回報事件")
-def get_report(id: str, db: Session = Depends(get_db)):
+async def get_report(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一回報事件
     """
-    db_report = crud.get_by_id(db, models.Report, id)
+    serializer = row_serializer(models.Report, schemas.Report, parse_fields(fields, models.Report, schemas.Report))
+    db_report = await crud_async.get_row(db, models.Report, id, serializer.columns)
     if db_report is None:
         raise HTTPException(status_code=404, detail="Report not found")
-    return db_report
+    etag = row_etag(models.Report, db_report, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_report, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.Report, summary="更新特定回報事件")
-def patch_report(
-        id: str, report_in: schemas.ReportPatch, db: Session = Depends(get_db)
+async def patch_report(
+        id: str, report_in: schemas.ReportPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新回報事件 (部分欄位)
     """
-    db_report = crud.get_by_id(db, models.Report, id)
+    db_report = await crud_async.update_by_id(db, models.Report, id, report_in)
     if db_report is None:
         raise HTTPException(status_code=404, detail="Report not found")
-    return crud.update(db, db_obj=db_report, obj_in=report_in)
+    return db_report
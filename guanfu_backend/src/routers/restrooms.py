@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..enum_serializer import RestroomFacilityTypeEnum, RestroomStatusEnum
 
 router = APIRouter(
@@ -11,9 +13,13 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,coordinates")
+
 
 @router.get("/", response_model=schemas.RestroomCollection, summary="取得廁所點清單")
-def list_restrooms(
+async def list_restrooms(
+        request: Request,
+        response: Response,
         status: Optional[RestroomStatusEnum] = Query(None),
         facility_type: Optional[RestroomFacilityTypeEnum] = Query(None),
         is_free: Optional[bool] = Query(None),
@@ -21,7 +27,10 @@ def list_restrooms(
         has_lighting: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得廁所點清單 (分頁)
@@ -33,40 +42,84 @@ def list_restrooms(
         "has_water": has_water,
         "has_lighting": has_lighting,
     }
-    restrooms = crud.get_multi(db, models.Restroom, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Restroom, **filters)
-    return {"member": restrooms, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.Restroom, schemas.Restroom, parse_fields(fields, models.Restroom, schemas.Restroom))
+    restrooms, total = await crud_async.get_page_rows(
+        db, models.Restroom, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.Restroom, restrooms, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(restrooms, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出廁所點資料（NDJSON / CSV）")
+async def export_restrooms(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[RestroomStatusEnum] = Query(None),
+        facility_type: Optional[RestroomFacilityTypeEnum] = Query(None),
+        is_free: Optional[bool] = Query(None),
+        has_water: Optional[bool] = Query(None),
+        has_lighting: Optional[bool] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部廁所點資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {
+        "status": status,
+        "facility_type": facility_type,
+        "is_free": is_free,
+        "has_water": has_water,
+        "has_lighting": has_lighting,
+    }
+    serializer = row_serializer(models.Restroom, schemas.Restroom, parse_fields(fields, models.Restroom, schemas.Restroom))
+    return export_rows(request, db, "restrooms", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.Restroom, status_code=201, summary="建立廁所點")
-def create_restroom(
-        restroom_in: schemas.RestroomCreate, db: Session = Depends(get_db)
+async def create_restroom(
+        restroom_in: schemas.RestroomCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立廁所點
     """
-    return crud.create(db, models.Restroom, obj_in=restroom_in)
+    return await crud_async.create(db, models.Restroom, obj_in=restroom_in)
 
 
 @router.get("/{id}", response_model=schemas.Restroom, summary="取得特定廁所點")
-def get_restroom(id: str, db: Session = Depends(get_db)):
+async def get_restroom(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一廁所點
     """
-    db_restroom = crud.get_by_id(db, models.Restroom, id)
+    serializer = row_serializer(models.Restroom, schemas.Restroom, parse_fields(fields, models.Restroom, schemas.Restroom))
+    db_restroom = await crud_async.get_row(db, models.Restroom, id, serializer.columns)
     if db_restroom is None:
         raise HTTPException(status_code=404, detail="Restroom not found")
-    return db_restroom
+    etag = row_etag(models.Restroom, db_restroom, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_restroom, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.Restroom, summary="更新特定廁所點")
-def patch_restroom(
-        id: str, restroom_in: schemas.RestroomPatch, db: Session = Depends(get_db)
+async def patch_restroom(
+        id: str, restroom_in: schemas.RestroomPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新廁所點 (部分欄位)
     """
-    db_restroom = crud.get_by_id(db, models.Restroom, id)
+    db_restroom = await crud_async.update_by_id(db, models.Restroom, id, restroom_in)
     if db_restroom is None:
         raise HTTPException(status_code=404, detail="Restroom not found")
-    return crud.update(db, db_obj=db_restroom, obj_in=restroom_in)
+    return db_restroom
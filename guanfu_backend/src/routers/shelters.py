@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..search import SEARCH_QUERY_DESCRIPTION, normalize_query, search_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..schemas import ShelterStatusEnum
 router = APIRouter(
     prefix="/shelters",
@@ -10,52 +13,101 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,coordinates")
+
 
 @router.get("/", response_model=schemas.ShelterCollection, summary="取得庇護所清單")
-def list_shelters(
+async def list_shelters(
+        request: Request,
+        response: Response,
         status: Optional[ShelterStatusEnum] = Query(None),
+        q: Optional[str] = Query(None, max_length=100, description=SEARCH_QUERY_DESCRIPTION),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得庇護所清單 (分頁)
     """
     filters = {"status": status}
-    shelters = crud.get_multi(db, models.Shelter, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Shelter, **filters)
-    return {"member": shelters, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.Shelter, schemas.Shelter, parse_fields(fields, models.Shelter, schemas.Shelter))
+    query = normalize_query(q)
+    if query is not None:
+        shelters, total = await search_rows(
+            db, "shelters", serializer.columns, query, skip=offset, limit=limit, cursor=cursor,
+            include_total=include_total, **filters
+        )
+        return serializer.collection(shelters, total, limit, offset, keyset=False)
+    shelters, total = await crud_async.get_page_rows(
+        db, models.Shelter, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.Shelter, shelters, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(shelters, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出庇護所資料（NDJSON / CSV）")
+async def export_shelters(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[ShelterStatusEnum] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部庇護所資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {"status": status}
+    serializer = row_serializer(models.Shelter, schemas.Shelter, parse_fields(fields, models.Shelter, schemas.Shelter))
+    return export_rows(request, db, "shelters", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.Shelter, status_code=201, summary="建立庇護所")
-def create_shelter(
-        shelter_in: schemas.ShelterCreate, db: Session = Depends(get_db)
+async def create_shelter(
+        shelter_in: schemas.ShelterCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立庇護所
     """
-    return crud.create(db, models.Shelter, obj_in=shelter_in)
+    return await crud_async.create(db, models.Shelter, obj_in=shelter_in)
 
 
 @router.get("/{id}", response_model=schemas.Shelter, summary="取得特定庇護所")
-def get_shelter(id: str, db: Session = Depends(get_db)):
+async def get_shelter(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一庇護所
     """
-    db_shelter = crud.get_by_id(db, models.Shelter, id)
+    serializer = row_serializer(models.Shelter, schemas.Shelter, parse_fields(fields, models.Shelter, schemas.Shelter))
+    db_shelter = await crud_async.get_row(db, models.Shelter, id, serializer.columns)
     if db_shelter is None:
         raise HTTPException(status_code=404, detail="Shelter not found")
-    return db_shelter
+    etag = row_etag(models.Shelter, db_shelter, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_shelter, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.Shelter, summary="更新特定庇護所")
-def patch_shelter(
-        id: str, shelter_in: schemas.ShelterPatch, db: Session = Depends(get_db)
+async def patch_shelter(
+        id: str, shelter_in: schemas.ShelterPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新庇護所 (部分欄位)
     """
-    db_shelter = crud.get_by_id(db, models.Shelter, id)
+    db_shelter = await crud_async.update_by_id(db, models.Shelter, id, shelter_in)
     if db_shelter is None:
         raise HTTPException(status_code=404, detail="Shelter not found")
-    return crud.update(db, db_obj=db_shelter, obj_in=shelter_in)
+    return db_shelter
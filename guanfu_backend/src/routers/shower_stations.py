@@ -1,10 +1,12 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..enum_serializer import ShowerFacilityTypeEnum, ShowerStationStatusEnum
 
 router = APIRouter(
@@ -13,16 +15,23 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,coordinates")
+
 
 @router.get("/", response_model=schemas.ShowerStationCollection, summary="取得洗澡點清單")
-def list_shower_stations(
+async def list_shower_stations(
+        request: Request,
+        response: Response,
         status: Optional[ShowerStationStatusEnum] = Query(None),
         facility_type: Optional[ShowerFacilityTypeEnum] = Query(None),
         is_free: Optional[bool] = Query(None),
         requires_appointment: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得洗澡點清單 (分頁)
@@ -33,40 +42,82 @@ def list_shower_stations(
         "is_free": is_free,
         "requires_appointment": requires_appointment,
     }
-    stations = crud.get_multi(db, models.ShowerStation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.ShowerStation, **filters)
-    return {"member": stations, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.ShowerStation, schemas.ShowerStation, parse_fields(fields, models.ShowerStation, schemas.ShowerStation))
+    stations, total = await crud_async.get_page_rows(
+        db, models.ShowerStation, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.ShowerStation, stations, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(stations, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出洗澡點資料（NDJSON / CSV）")
+async def export_shower_stations(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[ShowerStationStatusEnum] = Query(None),
+        facility_type: Optional[ShowerFacilityTypeEnum] = Query(None),
+        is_free: Optional[bool] = Query(None),
+        requires_appointment: Optional[bool] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部洗澡點資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {
+        "status": status,
+        "facility_type": facility_type,
+        "is_free": is_free,
+        "requires_appointment": requires_appointment,
+    }
+    serializer = row_serializer(models.ShowerStation, schemas.ShowerStation, parse_fields(fields, models.ShowerStation, schemas.ShowerStation))
+    return export_rows(request, db, "shower_stations", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.ShowerStation, status_code=201, summary="建立洗澡點")
-def create_shower_station(
-        station_in: schemas.ShowerStationCreate, db: Session = Depends(get_db)
+async def create_shower_station(
+        station_in: schemas.ShowerStationCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立洗澡點
     """
-    return crud.create(db, models.ShowerStation, obj_in=station_in)
+    return await crud_async.create(db, models.ShowerStation, obj_in=station_in)
 
 
 @router.get("/{id}", response_model=schemas.ShowerStation, summary="取得特定洗澡點")
-def get_shower_station(id: str, db: Session = Depends(get_db)):
+async def get_shower_station(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一洗澡點
     """
-    db_station = crud.get_by_id(db, models.ShowerStation, id)
+    serializer = row_serializer(models.ShowerStation, schemas.ShowerStation, parse_fields(fields, models.ShowerStation, schemas.ShowerStation))
+    db_station = await crud_async.get_row(db, models.ShowerStation, id, serializer.columns)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Shower Station not found")
-    return db_station
+    etag = row_etag(models.ShowerStation, db_station, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_station, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.ShowerStation, summary="更新特定洗澡點")
-def patch_shower_station(
-        id: str, station_in: schemas.ShowerStationPatch, db: Session = Depends(get_db)
+async def patch_shower_station(
+        id: str, station_in: schemas.ShowerStationPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新洗澡點 (部分欄位)
     """
-    db_station = crud.get_by_id(db, models.ShowerStation, id)
+    db_station = await crud_async.update_by_id(db, models.ShowerStation, id, station_in)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Shower Station not found")
-    return crud.update(db, db_obj=db_station, obj_in=station_in)
+    return db_station
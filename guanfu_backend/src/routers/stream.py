@@ -0,0 +1,108 @@
+import asyncio
+import json
+from typing import Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from ..config import settings
+from ..events import broadcaster
+from ..resources import RESOURCES
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["即時異動（Stream）"],
+)
+
+
+def _parse_types(types: Optional[str]) -> Optional[Set[str]]:
+    if not types:
+        return None
+    names = {name.strip() for name in types.split(",") if name.strip()}
+    unknown = names - set(RESOURCES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(sorted(unknown))}")
+    return names
+
+
+def _ensure_enabled() -> None:
+    if not settings.CHANGE_STREAM_ENABLED:
+        raise HTTPException(status_code=503, detail="Change stream is disabled.")
+
+
+@router.get("/events", summary="訂閱即時異動（Server-Sent Events）")
+async def stream_events(
+        request: Request,
+        types: Optional[str] = Query(None, description="以逗號分隔的資源類型，例如 supplies,human_resources；預設全部"),
+):
+    """
+    以 SSE 推送寫入事件（table / op / ids / ts），收到後再以 id 取得最新資料
+
+    - 每隔一段時間送出註解行作為心跳。
+    - 若用戶端消費過慢，會收到 overflow 事件並結束連線，請重新同步後再訂閱。
+    """
+    _ensure_enabled()
+    tables = _parse_types(types)
+    subscription = broadcaster.subscribe(tables)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many subscribers.")
+
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: change\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if subscription.overflowed:
+                yield "event: overflow\ndata: {}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket, types: Optional[str] = None):
+    """
+    以 WebSocket 推送寫入事件，訊息格式與 SSE 的 data 相同
+    """
+    if not settings.CHANGE_STREAM_ENABLED:
+        await websocket.close(code=1013)
+        return
+    try:
+        tables = _parse_types(types)
+    except HTTPException as exc:
+        await websocket.close(code=1008, reason=exc.detail)
+        return
+    subscription = broadcaster.subscribe(tables)
+    if subscription is None:
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    try:
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_json({"type": "change", **event})
+        if subscription.overflowed:
+            await websocket.send_json({"type": "overflow"})
+            await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.unsubscribe(subscription)
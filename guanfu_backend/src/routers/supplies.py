@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from typing import Optional
-from .. import crud, models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Query as OrmQuery, joinedload, load_only, selectinload
+from typing import List, Optional, Tuple
+from .. import crud_async, models, schemas
+from ..autocomplete import autocomplete_indexes
 from ..crud import get_full_supply
-from ..database import get_db
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, resource_etag
+from ..export import EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_response, iter_partitions
+from ..pagination import keyset_columns, next_cursor
+from ..search import SEARCH_QUERY_DESCRIPTION, normalize_query, search_ids
+from ..serialization import FastJSONResponse, fields_description, parse_fields, partial_schema
 
 router = APIRouter(
     prefix="/supplies",
@@ -11,61 +18,206 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,address,supplies")
+
+
+def _embeds_items(selected: Optional[Tuple[str, ...]]) -> bool:
+    return selected is None or "supplies" in selected
+
+
+def _load_options(selected: Optional[Tuple[str, ...]], items_loader=None) -> List:
+    """
+    依稀疏欄位集組出載入選項：只 SELECT 需要的欄位（另含分頁鍵與 ETag 使用的 row_version）；
+    指定 items_loader 且需要 supplies 時一併載入物資項目（單筆查詢使用）。
+    """
+    options = []
+    if selected is not None:
+        columns = {getattr(models.Supply, name) for name in selected if name != "supplies"}
+        columns.update(keyset_columns(models.Supply))
+        columns.add(models.Supply.row_version)
+        options.append(load_only(*columns))
+    if items_loader is not None and _embeds_items(selected):
+        options.append(items_loader(models.Supply.supplies))
+    return options
+
+
+def _collection(
+        supplies: List[models.Supply], selected: Optional[Tuple[str, ...]], total: Optional[int], limit: int,
+        offset: int, cursor: Optional[str], headers: Optional[dict] = None,
+):
+    if selected is None:
+        return {"member": supplies, "totalItems": total, "limit": limit, "offset": offset, "next_cursor": cursor}
+    schema = partial_schema(schemas.Supply, selected)
+    return FastJSONResponse({
+        "totalItems": total,
+        "limit": limit,
+        "offset": offset,
+        "member": [schema.model_validate(supply).model_dump(mode="json") for supply in supplies],
+        "next_cursor": cursor,
+    }, headers=headers)
+
 
 @router.get("/", response_model=schemas.SupplyCollection, summary="取得供應單清單")
-def list_supplies(
-        embed: Optional[str] = Query(None, enum=["all"]),
+async def list_supplies(
+        request: Request,
+        response: Response,
+        embed: Optional[str] = Query(None, enum=["all"], description="相容保留：物資項目一律以分頁後的批次查詢內嵌"),
+        max_items_per_supply: Optional[int] = Query(None, ge=1, description="每張供應單最多內嵌的物資項目數（依建立時間排序）；未提供時內嵌全部"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
         show_fulfilled: bool = Query(False, description="是否顯示已全部到貨的供應單"),
-        db: Session = Depends(get_db)
+        q: Optional[str] = Query(None, max_length=100, description=SEARCH_QUERY_DESCRIPTION),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
-    query = db.query(models.Supply)
-    if embed == "all":
-        query = query.options(joinedload(models.Supply.supplies))
+    selected = parse_fields(fields, models.Supply, schemas.Supply, relationships=("supplies",))
+    search = normalize_query(q)
+    if search is not None:
+        # 依相關度排序的搜尋結果：取得一頁 id 後再載入供應單，不使用 ETag 與 next_cursor
+        ids, total = await search_ids(
+            db, "supplies", search, skip=offset, limit=limit, cursor=cursor, include_total=include_total,
+            is_fulfilled=None if show_fulfilled else False,
+        )
+        by_id = {supply.id: supply for supply in await crud_async.get_by_ids(db, models.Supply, ids)} if ids else {}
+        supplies = [by_id[id_] for id_ in ids if id_ in by_id]
+        if _embeds_items(selected):
+            await crud_async.embed_supply_items(db, supplies, max_items_per_supply)
+        return _collection(supplies, selected, total, limit, offset, None)
+
+    # 尚未綁定 session 的查詢，由 crud 在執行時綁定（同步 / 非同步模式共用）
+    # 只查供應單本身；物資項目在分頁後以一次 IN 查詢批次載入（不以 JOIN 搭配 offset/limit）
+    query = OrmQuery(models.Supply).options(*_load_options(selected))
 
     # 排除「所有項目均已滿」的供應單
     if not show_fulfilled:
         query = get_full_supply(db, query)
 
-    total = query.count()
-    supplies = query.offset(offset).limit(limit).all()
-    return {"member": supplies, "totalItems": total, "limit": limit, "offset": offset}
+    # 物資項目的寫入會在同一交易中更新所屬供應單（row_version 隨之改變），ETag 只需依供應單計算
+    supplies, total = await crud_async.get_page(
+        db, models.Supply, skip=offset, limit=limit, cursor=cursor, include_total=include_total, query=query
+    )
+    etag = page_etag(models.Supply, supplies, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    if _embeds_items(selected):
+        await crud_async.embed_supply_items(db, supplies, max_items_per_supply)
+    return _collection(
+        supplies, selected, total, limit, offset, next_cursor(models.Supply, supplies, limit), headers={"ETag": etag}
+    )
+
+
+@router.get("/export", summary="匯出供應單資料（含物資項目，NDJSON / CSV）")
+async def export_supplies(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        show_fulfilled: bool = Query(False, description="是否包含已全部到貨的供應單"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部供應單資料（串流輸出，不分頁、不計總數）
+
+    - 供應單分批讀取，每批的物資項目以一次 supply_id IN (...) 查詢內嵌，格式與列表的 member 相同。
+    - CSV 中的 supplies 欄位為物資項目陣列的 JSON 字串。
+    """
+    selected = parse_fields(fields, models.Supply, schemas.Supply, relationships=("supplies",))
+    stmt = select(models.Supply).options(*_load_options(selected)).order_by(*keyset_columns(models.Supply))
+    if not show_fulfilled:
+        stmt = get_full_supply(db, stmt)
+    schema = schemas.Supply if selected is None else partial_schema(schemas.Supply, selected)
+
+    async def batches():
+        async for partition in iter_partitions(db, stmt):
+            supplies = [row[0] for row in partition]
+            if _embeds_items(selected):
+                await crud_async.embed_supply_items(db, supplies)
+            yield [schema.model_validate(supply).model_dump(mode="json") for supply in supplies]
+
+    return export_response(request, "supplies", format, list(schema.model_fields), batches())
 
 
 @router.post("/", response_model=schemas.SupplyWithPin, status_code=201, summary="建立供應單")
-def create_supply(
-        supply_in: schemas.SupplyCreate, db: Session = Depends(get_db)
+async def create_supply(
+        supply_in: schemas.SupplyCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立供應單 (注意：同時建立 supply_items 的邏輯需在 crud 中客製化)
     """
     # This requires custom logic in crud.py to handle the nested `supplies` object
-    return crud.create_supply_with_items(db, obj_in=supply_in)
+    db_supply = await crud_async.create_supply_with_items(db, obj_in=supply_in)
+    autocomplete_indexes.observe(models.SupplyItem, db_supply.supplies)
+    return db_supply
 
 
 # 在 patch_supply 禁止更新已全部到貨的供應單
 @router.patch("/{id}", response_model=schemas.Supply, status_code=200, summary="更新供應單")
-def patch_supply(
-        id: str, supply_in: schemas.SupplyPatch, db: Session = Depends(get_db)
+async def patch_supply(
+        id: str, supply_in: schemas.SupplyPatch, db: DbSession = Depends(get_db)
 ):
-    db_supply = crud.get_by_id(db, models.Supply, id)
+    # PIN 檢核寫在 UPDATE 的 WHERE 中
+    db_supply = await crud_async.update_by_id(
+        db, models.Supply, id, supply_in, options=[selectinload(models.Supply.supplies)]
+    )
+    if db_supply is not None:
+        return db_supply
+
+    if await crud_async.get_by_id(db, models.Supply, id) is None:
+        raise HTTPException(status_code=404, detail="Supply not found")
+    raise HTTPException(status_code=400, detail="The PIN you entered is incorrect.")
+
+
+@router.post("/{id}/distribute", response_model=List[schemas.SupplyItem], summary="發放供應單物資")
+async def distribute_supply(
+        id: str, distribution_in: schemas.SupplyDistribution, db: DbSession = Depends(get_db)
+):
+    """
+    批次登記物資到貨 / 發放數量（received_count 累加）
+
+    - 每個項目以條件式 UPDATE 原子累加，超過 total_number 的項目會使整批失敗。
+    - 全部在同一交易中完成，回傳更新後的物資項目。
+    """
+    db_supply = await crud_async.get_by_id(db, models.Supply, id)
     if db_supply is None:
         raise HTTPException(status_code=404, detail="Supply not found")
 
     # PIN 檢核
-    if db_supply.valid_pin and db_supply.valid_pin != supply_in.valid_pin:
+    if db_supply.valid_pin and db_supply.valid_pin != distribution_in.valid_pin:
         raise HTTPException(status_code=400, detail="The PIN you entered is incorrect.")
 
-    return crud.update(db, db_obj=db_supply, obj_in=supply_in)
+    db_items = await crud_async.distribute_items(db, id, distribution_in.items)
+    if db_items is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Distribution failed: an item does not belong to this supply or the count exceeds total_number.",
+        )
+    return db_items
 
 
 @router.get("/{id}", response_model=schemas.Supply, summary="取得特定供應單")
-def get_supply(id: str, db: Session = Depends(get_db)):
+async def get_supply(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一供應單 (包含其所有物資項目)
     """
-    db_supply = db.query(models.Supply).options(joinedload(models.Supply.supplies)).filter(models.Supply.id == id).first()
+    selected = parse_fields(fields, models.Supply, schemas.Supply, relationships=("supplies",))
+    db_supply = await crud_async.get_by_id(db, models.Supply, id, *_load_options(selected, joinedload))
     if db_supply is None:
         raise HTTPException(status_code=404, detail="Supply not found")
-    return db_supply
+    etag = resource_etag(db_supply, selected)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    if selected is None:
+        return db_supply
+    return FastJSONResponse(
+        partial_schema(schemas.Supply, selected).model_validate(db_supply).model_dump(mode="json"),
+        headers={"ETag": etag},
+    )
@@ -1,10 +1,16 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import joinedload
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..autocomplete import autocomplete_indexes
+from ..crud import CONCURRENT_UPDATE_DETAIL, supply_item_count_conditions
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..search import SEARCH_QUERY_DESCRIPTION, normalize_query, search_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 from ..enum_serializer import SupplyItemTypeEnum
 
 router = APIRouter(
@@ -13,33 +19,72 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,total_number,received_count")
+
 
 @router.get("/", response_model=schemas.SupplyItemCollection, summary="取得特定供應單物資項目清單")
-def list_supply_items(
+async def list_supply_items(
+        request: Request,
+        response: Response,
         supply_id: Optional[str] = Query(None),
         tag: Optional[SupplyItemTypeEnum] = Query(None),
+        q: Optional[str] = Query(None, max_length=100, description=SEARCH_QUERY_DESCRIPTION),
         limit: int = Query(100, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得物資項目清單 (分頁)
     """
     filters = {"supply_id": supply_id, "tag": tag.value if tag else None, }
-    items = crud.get_multi(db, models.SupplyItem, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.SupplyItem, **filters)
-    return {"member": items, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.SupplyItem, schemas.SupplyItem, parse_fields(fields, models.SupplyItem, schemas.SupplyItem))
+    query = normalize_query(q)
+    if query is not None:
+        items, total = await search_rows(
+            db, "supply_items", serializer.columns, query, skip=offset, limit=limit, cursor=cursor,
+            include_total=include_total, **filters
+        )
+        return serializer.collection(items, total, limit, offset, keyset=False)
+    items, total = await crud_async.get_page_rows(
+        db, models.SupplyItem, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.SupplyItem, items, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(items, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出物資項目資料（NDJSON / CSV）")
+async def export_supply_items(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        supply_id: Optional[str] = Query(None),
+        tag: Optional[SupplyItemTypeEnum] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部物資項目資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {"supply_id": supply_id, "tag": tag.value if tag else None, }
+    serializer = row_serializer(models.SupplyItem, schemas.SupplyItem, parse_fields(fields, models.SupplyItem, schemas.SupplyItem))
+    return export_rows(request, db, "supply_items", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.SupplyItem, status_code=201, summary="建立特定供應單物資項目")
-def create_supply_item(
-        item_in: schemas.SupplyItemCreateWithPin, db: Session = Depends(get_db)
+async def create_supply_item(
+        item_in: schemas.SupplyItemCreateWithPin, db: DbSession = Depends(get_db)
 ):
     """
     建立物資項目
     """
     # Check if parent supply_id exists
-    parent_supply = crud.get_by_id(db, models.Supply, id=item_in.supply_id)
+    parent_supply = await crud_async.get_by_id(db, models.Supply, id=item_in.supply_id)
     if not parent_supply:
         raise HTTPException(status_code=400, detail=f"supplies with id {item_in.supply_id} does not exist.")
     if parent_supply.valid_pin and parent_supply.valid_pin != item_in.valid_pin:
@@ -49,18 +94,28 @@ def create_supply_item(
     # remove unused columns
     supply_item = item_in.model_dump()
     del supply_item["valid_pin"]
-    return crud.create(db, models.SupplyItem, obj_in=schemas.SupplyItemCreate(**supply_item))
+    db_supply_item = await crud_async.create(db, models.SupplyItem, obj_in=schemas.SupplyItemCreate(**supply_item))
+    autocomplete_indexes.observe(models.SupplyItem, [db_supply_item])
+    return db_supply_item
 
 
 @router.patch("/{id}", response_model=schemas.SupplyItem, status_code=200, summary="更新特定供應單物資項目")
-def patch_supply_item(
-        id: str, item_in: schemas.SupplyItemPatch, db: Session = Depends(get_db)
+async def patch_supply_item(
+        id: str, item_in: schemas.SupplyItemPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新物資項目
     """
-    # Check if parent supply_id exists
-    db_supply_item = crud.get_by_id(db, models.SupplyItem, id=id)
+    # PIN 與數量條件寫在 UPDATE 的 WHERE 中，一次完成
+    db_supply_item = await crud_async.update_by_id(
+        db, models.SupplyItem, id, item_in, *supply_item_count_conditions(item_in)
+    )
+    if db_supply_item is not None:
+        autocomplete_indexes.observe(models.SupplyItem, [db_supply_item])
+        return db_supply_item
+
+    # 條件式 UPDATE 沒有命中：再查一次以回報原因
+    db_supply_item = await crud_async.get_by_id(db, models.SupplyItem, id, joinedload(models.SupplyItem.supply))
     if not db_supply_item:
         raise HTTPException(status_code=404, detail="Supply Item not found.")
     if db_supply_item.supply.valid_pin and db_supply_item.supply.valid_pin != item_in.valid_pin:
@@ -70,18 +125,29 @@ def patch_supply_item(
         if db_supply_item.total_number == db_supply_item.received_count:
             raise HTTPException(status_code=400, detail="Received_count and total_number are locked because their values are equal; updates are not allowed.")
         total_number = item_in.total_number if item_in.total_number is not None else db_supply_item.total_number
-        received_count = item_in.received_count if item_in.received_count is not None else db_supply_item.received_count
+        received_count = item_in.received_count if item_in.received_count is not None else db_supply_item.received_count or 0
         if received_count > total_number:
             raise HTTPException(status_code=400, detail="Received_count must be less than or equal to total_number.")
-    return crud.update(db, db_obj=db_supply_item, obj_in=item_in)
+    raise HTTPException(status_code=400, detail=CONCURRENT_UPDATE_DETAIL)
 
 
 @router.get("/{id}", response_model=schemas.SupplyItem, summary="取得特定物資項目")
-def get_supply_item(id: str, db: Session = Depends(get_db)):
+async def get_supply_item(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一物資項目
     """
-    db_item = crud.get_by_id(db, models.SupplyItem, id)
+    serializer = row_serializer(models.SupplyItem, schemas.SupplyItem, parse_fields(fields, models.SupplyItem, schemas.SupplyItem))
+    db_item = await crud_async.get_row(db, models.SupplyItem, id, serializer.columns)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Supply Item not found")
-    return db_item
+    etag = row_etag(models.SupplyItem, db_item, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_item, headers={"ETag": etag})
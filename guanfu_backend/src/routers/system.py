@@ -0,0 +1,52 @@
+from fastapi import APIRouter
+
+from ..autocomplete import autocomplete_indexes
+from ..cache import response_cache
+from ..events import broadcaster
+from ..geo import facility_index, tile_cache
+from ..search import search_indexes
+
+router = APIRouter(
+    prefix="/system",
+    tags=["系統（System）"],
+)
+
+
+@router.get("/cache", summary="取得回應快取統計")
+def get_cache_stats():
+    """
+    取得回應快取的命中 / 未命中 / 失效次數（本 worker 統計）
+    """
+    return response_cache.stats()
+
+
+@router.get("/stream", summary="取得即時異動推播統計")
+def get_stream_stats():
+    """
+    取得本 worker 的訂閱者數量、已推送與因消費過慢而中斷的訂閱數
+    """
+    return broadcaster.stats()
+
+
+@router.get("/geo", summary="取得地理索引統計")
+def get_geo_stats():
+    """
+    取得本 worker 地理索引中各據點類型的筆數（尚未查詢過的類型不會列出）與地圖叢集圖磚快取統計
+    """
+    return {"points": facility_index.stats(), "tiles": tile_cache.stats()}
+
+
+@router.get("/search", summary="取得行程內搜尋索引統計")
+def get_search_stats():
+    """
+    取得本 worker 行程內搜尋索引中各資料表的筆數（僅 SEARCH_BACKEND 為 memory 或非 PostgreSQL 時使用；尚未查詢過的資料表不會列出）
+    """
+    return search_indexes.stats()
+
+
+@router.get("/autocomplete", summary="取得自動完成索引統計")
+def get_autocomplete_stats():
+    """
+    取得本 worker 自動完成索引中各欄位的資料列數與相異值數（尚未載入的欄位不會列出）
+    """
+    return autocomplete_indexes.stats()
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from .. import crud, models, schemas
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..search import SEARCH_QUERY_DESCRIPTION, normalize_query, search_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 
 router = APIRouter(
     prefix="/volunteer_organizations",
@@ -10,50 +15,97 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,organization_name,contact_info")
+
 
 @router.get("/", response_model=schemas.VolunteerOrgCollection, summary="取得志工招募單位清單")
-def list_volunteer_orgs(
+async def list_volunteer_orgs(
+        request: Request,
+        response: Response,
+        q: Optional[str] = Query(None, max_length=100, description=SEARCH_QUERY_DESCRIPTION),
         limit: int = Query(20, ge=1, le=200),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得志工招募單位清單 (分頁)
     """
-    orgs = crud.get_multi(db, models.VolunteerOrganization, skip=offset, limit=limit)
-    total = crud.count(db, models.VolunteerOrganization)
-    return {"member": orgs, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.VolunteerOrganization, schemas.VolunteerOrganization, parse_fields(fields, models.VolunteerOrganization, schemas.VolunteerOrganization))
+    query = normalize_query(q)
+    if query is not None:
+        orgs, total = await search_rows(
+            db, "volunteer_organizations", serializer.columns, query, skip=offset, limit=limit, cursor=cursor,
+            include_total=include_total
+        )
+        return serializer.collection(orgs, total, limit, offset, keyset=False)
+    orgs, total = await crud_async.get_page_rows(
+        db, models.VolunteerOrganization, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total
+    )
+    etag = page_etag(models.VolunteerOrganization, orgs, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(orgs, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出志工招募單位資料（NDJSON / CSV）")
+async def export_volunteer_organizations(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部志工招募單位資料（串流輸出，不分頁、不計總數）
+    """
+    serializer = row_serializer(models.VolunteerOrganization, schemas.VolunteerOrganization, parse_fields(fields, models.VolunteerOrganization, schemas.VolunteerOrganization))
+    return export_rows(request, db, "volunteer_organizations", serializer, format)
 
 
 @router.post("/", response_model=schemas.VolunteerOrganization, status_code=201, summary="建立志工招募單位")
-def create_volunteer_org(
-        org_in: schemas.VolunteerOrgCreate, db: Session = Depends(get_db)
+async def create_volunteer_org(
+        org_in: schemas.VolunteerOrgCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立志工招募單位
     """
-    return crud.create(db, models.VolunteerOrganization, obj_in=org_in)
+    return await crud_async.create(db, models.VolunteerOrganization, obj_in=org_in)
 
 
 @router.get("/{id}", response_model=schemas.VolunteerOrganization, summary="取得特定志工招募單位")
-def get_volunteer_org(id: str, db: Session = Depends(get_db)):
+async def get_volunteer_org(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一志工招募單位
     """
-    db_org = crud.get_by_id(db, models.VolunteerOrganization, id)
+    serializer = row_serializer(models.VolunteerOrganization, schemas.VolunteerOrganization, parse_fields(fields, models.VolunteerOrganization, schemas.VolunteerOrganization))
+    db_org = await crud_async.get_row(db, models.VolunteerOrganization, id, serializer.columns)
     if db_org is None:
         raise HTTPException(status_code=404, detail="Volunteer Organization not found")
-    return db_org
+    etag = row_etag(models.VolunteerOrganization, db_org, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_org, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.VolunteerOrganization, summary="更新特定志工招募單位")
-def patch_volunteer_org(
-        id: str, org_in: schemas.VolunteerOrgPatch, db: Session = Depends(get_db)
+async def patch_volunteer_org(
+        id: str, org_in: schemas.VolunteerOrgPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新志工招募單位 (部分欄位)
     """
-    db_org = crud.get_by_id(db, models.VolunteerOrganization, id)
+    db_org = await crud_async.update_by_id(db, models.VolunteerOrganization, id, org_in)
     if db_org is None:
         raise HTTPException(status_code=404, detail="Volunteer Organization not found")
-    return crud.update(db, db_obj=db_org, obj_in=org_in)
+    return db_org
@@ -1,10 +1,12 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud_async, models, schemas
+from ..database import DbSession, get_db
+from ..etag import not_modified, page_etag, row_etag
+from ..export import EXPORT_FIELDS_DESCRIPTION, EXPORT_FORMAT_DESCRIPTION, ExportFormat, export_rows
+from ..serialization import fields_description, parse_fields, row_serializer
 
 router = APIRouter(
     prefix="/water_refill_stations",
@@ -12,16 +14,23 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+FIELDS_DESCRIPTION = fields_description("id,name,status,coordinates")
+
 
 @router.get("/", response_model=schemas.WaterRefillStationCollection, summary="取得飲用水補給站清單")
-def list_water_refill_stations(
+async def list_water_refill_stations(
+        request: Request,
+        response: Response,
         status: Optional[str] = Query(None),
         water_type: Optional[str] = Query(None),
         is_free: Optional[bool] = Query(None),
         accessibility: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="分頁游標（取自上一頁回應的 next_cursor），提供時忽略 offset"),
+        include_total: bool = Query(True, description="是否計算總筆數 totalItems；設為 false 可省略計數以降低負載"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
 ):
     """
     取得飲用水補給站清單 (分頁)
@@ -32,40 +41,82 @@ def list_water_refill_stations(
         "is_free": is_free,
         "accessibility": accessibility,
     }
-    stations = crud.get_multi(db, models.WaterRefillStation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.WaterRefillStation, **filters)
-    return {"member": stations, "totalItems": total, "limit": limit, "offset": offset}
+    serializer = row_serializer(models.WaterRefillStation, schemas.WaterRefillStation, parse_fields(fields, models.WaterRefillStation, schemas.WaterRefillStation))
+    stations, total = await crud_async.get_page_rows(
+        db, models.WaterRefillStation, serializer.columns, skip=offset, limit=limit, cursor=cursor,
+        include_total=include_total, **filters
+    )
+    etag = page_etag(models.WaterRefillStation, stations, total, request.url.query)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.collection(stations, total, limit, offset, headers={"ETag": etag})
+
+
+@router.get("/export", summary="匯出飲用水補給站資料（NDJSON / CSV）")
+async def export_water_refill_stations(
+        request: Request,
+        format: ExportFormat = Query(ExportFormat.ndjson, description=EXPORT_FORMAT_DESCRIPTION),
+        status: Optional[str] = Query(None),
+        water_type: Optional[str] = Query(None),
+        is_free: Optional[bool] = Query(None),
+        accessibility: Optional[bool] = Query(None),
+        fields: Optional[str] = Query(None, description=EXPORT_FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
+    """
+    匯出符合條件的全部飲用水補給站資料（串流輸出，不分頁、不計總數）
+    """
+    filters = {
+        "status": status,
+        "water_type": water_type,
+        "is_free": is_free,
+        "accessibility": accessibility,
+    }
+    serializer = row_serializer(models.WaterRefillStation, schemas.WaterRefillStation, parse_fields(fields, models.WaterRefillStation, schemas.WaterRefillStation))
+    return export_rows(request, db, "water_refill_stations", serializer, format, **filters)
 
 
 @router.post("/", response_model=schemas.WaterRefillStation, status_code=201, summary="建立飲用水補給站")
-def create_water_refill_station(
-        station_in: schemas.WaterRefillStationCreate, db: Session = Depends(get_db)
+async def create_water_refill_station(
+        station_in: schemas.WaterRefillStationCreate, db: DbSession = Depends(get_db)
 ):
     """
     建立飲用水補給站
     """
-    return crud.create(db, models.WaterRefillStation, obj_in=station_in)
+    return await crud_async.create(db, models.WaterRefillStation, obj_in=station_in)
 
 
 @router.get("/{id}", response_model=schemas.WaterRefillStation, summary="取得特定飲用水補給站")
-def get_water_refill_station(id: str, db: Session = Depends(get_db)):
+async def get_water_refill_station(
+        id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        db: DbSession = Depends(get_db)
+):
     """
     取得單一飲用水補給站
     """
-    db_station = crud.get_by_id(db, models.WaterRefillStation, id)
+    serializer = row_serializer(models.WaterRefillStation, schemas.WaterRefillStation, parse_fields(fields, models.WaterRefillStation, schemas.WaterRefillStation))
+    db_station = await crud_async.get_row(db, models.WaterRefillStation, id, serializer.columns)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Water Refill Station not found")
-    return db_station
+    etag = row_etag(models.WaterRefillStation, db_station, serializer.fields)
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return serializer.resource(db_station, headers={"ETag": etag})
 
 
 @router.patch("/{id}", response_model=schemas.WaterRefillStation, summary="更新特定飲用水補給站")
-def patch_water_refill_station(
-        id: str, station_in: schemas.WaterRefillStationPatch, db: Session = Depends(get_db)
+async def patch_water_refill_station(
+        id: str, station_in: schemas.WaterRefillStationPatch, db: DbSession = Depends(get_db)
 ):
     """
     更新飲用水補給站 (部分欄位)
     """
-    db_station = crud.get_by_id(db, models.WaterRefillStation, id)
+    db_station = await crud_async.update_by_id(db, models.WaterRefillStation, id, station_in)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Water Refill Station not found")
-    return crud.update(db, db_obj=db_station, obj_in=station_in)
+    return db_station
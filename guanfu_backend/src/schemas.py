@@ -1,5 +1,5 @@
-from pydantic import BaseModel, constr, Field, NonNegativeInt
-from typing import List, Optional, Annotated, Any
+from pydantic import BaseModel, constr, Field, NonNegativeInt, PositiveInt
+from typing import List, Optional, Annotated, Any, Dict
 import datetime
 from .enum_serializer import *
 
@@ -16,11 +16,30 @@ class Coordinates(BaseModel):
     lng: float
 
 
+# 批次端點單次最多處理的筆數
+BULK_MAX_ITEMS = 5000
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # created / updated / error
+    id: Optional[str] = None
+    valid_pin: Optional[str] = None
+    errors: Optional[Dict[str, List[str]]] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
 class CollectionBase(BaseModel):
-    totalItems: int
+    totalItems: Optional[int] = None
     limit: int
     offset: int
     member: List[Any]
+    next_cursor: Optional[str] = None
 
 
 # ===================================================================
@@ -565,6 +584,24 @@ class HumanResourceCollection(CollectionBase):
     member: List[HumanResource]
 
 
+class HumanResourceBulkCreate(BaseModel):
+    # 逐筆以 HumanResourceCreate 驗證，單筆錯誤不影響整批
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class HumanResourceBulkPatchItem(HumanResourcePatch):
+    id: str
+
+
+class HumanResourceBulkPatch(BaseModel):
+    # 每筆為 {id, valid_pin, ...欲更新欄位}，逐筆以 HumanResourceBulkPatchItem 驗證
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class HumanResourceSignup(BaseModel):
+    count: PositiveInt = 1
+
+
 # ===================================================================
 # 物資項目 (Supply Items) & 物資單 (Supplies)
 # ===================================================================
@@ -579,6 +616,7 @@ class SupplyItemBase(BaseModel):
 
 class SupplyItemCreateWithPin(SupplyItemBase):
     supply_id: str
+    valid_pin: Optional[str] = None
 
 
 class SupplyItemCreate(SupplyItemBase):
@@ -624,13 +662,29 @@ class SupplyPatch(BaseModel):
     valid_pin: Optional[str] = None
 
 
-class Supply(SupplyBase, BaseColumn):
+class SupplyFulfillment(BaseModel):
+    """到貨進度（由物資項目彙總）"""
+    items_total: int = 0
+    items_fulfilled: int = 0
+    units_needed: int = 0
+    units_received: int = 0
+    is_fulfilled: bool = True
+
+
+class Supply(SupplyFulfillment, SupplyBase, BaseColumn):
     supplies: List[SupplyItem] = []
 
     class Config:
         from_attributes = True
 
 
+class SupplySummary(SupplyFulfillment, SupplyBase, BaseColumn):
+    """不含物資項目的供應單（增量同步時物資項目另列於 supply_items）"""
+
+    class Config:
+        from_attributes = True
+
+
 class SupplyWithPin(Supply):
     valid_pin: Optional[str] = None
 
@@ -644,7 +698,12 @@ SixDigitPin = Annotated[str, constr(pattern=r'^\d{6}$')]
 
 class SupplyItemDistribution(BaseModel):
     id: str
-    valid_pin: SixDigitPin
+    count: PositiveInt
+
+
+class SupplyDistribution(BaseModel):
+    valid_pin: Optional[SixDigitPin] = None
+    items: List[SupplyItemDistribution] = Field(..., min_length=1)
 
 
 # ===================================================================
@@ -680,3 +739,67 @@ class Report(ReportBase, BaseColumn):
 
 class ReportCollection(CollectionBase):
     member: List[Report]
+
+
+# ===================================================================
+# 增量同步 (Changes)
+# ===================================================================
+
+class ChangeFeed(BaseModel):
+    since: int
+    watermark: int
+    has_more: bool
+    cursor: Optional[str] = None
+    changes: Dict[str, List[Dict[str, Any]]]
+
+
+# ===================================================================
+# 地理查詢 (Nearby)
+# ===================================================================
+
+class NearbyFacility(BaseModel):
+    type: str
+    id: str
+    name: str
+    status: str
+    address: Optional[str] = None
+    coordinates: Coordinates
+    distance_m: float
+
+
+class NearbyCollection(BaseModel):
+    totalItems: int
+    limit: int
+    member: List[NearbyFacility]
+
+
+class MapFeature(BaseModel):
+    kind: str  # pin / cluster
+    coordinates: Coordinates  # 叢集為重心座標
+    count: int = 1
+    # 圖釘
+    type: Optional[str] = None
+    id: Optional[str] = None
+    name: Optional[str] = None
+    status: Optional[str] = None
+    # 叢集：各類型筆數與格子範圍 [min_lng, min_lat, max_lng, max_lat]（可用於放大到該範圍）
+    types: Optional[Dict[str, int]] = None
+    bbox: Optional[List[float]] = None
+
+
+class MapPinCollection(BaseModel):
+    zoom: int
+    clustered: bool
+    totalItems: int
+    member: List[MapFeature]
+
+
+class AutocompleteSuggestion(BaseModel):
+    value: str
+    count: int  # 目前資料中使用此寫法（忽略全形 / 半形與大小寫）的筆數
+
+
+class AutocompleteCollection(BaseModel):
+    field: str
+    prefix: str
+    member: List[AutocompleteSuggestion]
@@ -0,0 +1,179 @@
+"""
+列表端點的名稱 / 地址搜尋（q= 參數）：
+- PostgreSQL：比對各資料表的 search_text 欄位（搜尋欄位正規化後的 generated column），
+  子字串以 pg_bigm 索引（1～2 個中文字的詞也能使用索引），錯字容忍（word_similarity）以 pg_trgm 索引，依相似度排序。
+  資料庫端的正規化（normalize NFKC + lower）與 normalize_text 相同，需 UTF-8 編碼與 UTF-8 locale。
+- 其他資料庫（本機 SQLite 等）或 SEARCH_BACKEND=memory：行程內以單字與字元 bigram 建立倒排索引，
+  以回應快取的世代號判斷資料變更後重建（與地理索引相同）。
+- 比對規則一致：查詢中每個詞（以空白分隔）都出現在某個欄位中即符合；否則相似度達 SEARCH_FUZZY_THRESHOLD 也列入，排在後面。
+- 搜尋結果依相關度排序，只能以 offset 分頁（不提供 next_cursor）。
+"""
+import asyncio
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from . import crud_async
+from .cache import response_cache
+from .config import settings
+from .database import DbSession
+from .resources import SEARCHABLE
+
+SEARCH_QUERY_DESCRIPTION = "搜尋名稱 / 地址（部分字詞即可，多個詞以空白分隔，容許少量錯字）；提供時依相關度排序並以 offset 分頁"
+
+
+def normalize_text(text: str) -> str:
+    """
+    全形轉半形（NFKC）、英文轉小寫，並將連續空白合併為一個空白。
+    與資料庫 search_text 欄位的 lower(normalize(..., NFKC)) 相同（以 lower 而非 casefold，兩端結果才一致）。
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def normalize_query(q: Optional[str]) -> Optional[str]:
+    if q is None:
+        return None
+    return normalize_text(q) or None
+
+
+def _document_grams(text: str) -> Set[str]:
+    grams = {char for char in text if not char.isspace()}
+    grams.update(pair for pair in (text[i:i + 2] for i in range(len(text) - 1)) if not any(c.isspace() for c in pair))
+    return grams
+
+
+def _query_grams(term: str) -> Set[str]:
+    if len(term) == 1:
+        return {term}
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+class InvertedIndex:
+    """
+    單一資料表的倒排索引（建立後不再修改，重建時整個替換）：gram → 資料列位置。
+    """
+
+    def __init__(self, rows: List[Tuple[Any, ...]]):
+        self.ids: List[str] = []
+        self.texts: List[Tuple[str, ...]] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for position, (id_, *values) in enumerate(rows):
+            texts = tuple(normalize_text(value) for value in values if value)
+            self.ids.append(id_)
+            self.texts.append(texts)
+            for gram in set().union(*(_document_grams(text) for text in texts)):
+                self.postings[gram].append(position)
+
+    def search(self, q: str) -> List[str]:
+        """
+        回傳符合的 id：完整包含所有詞者在前，其後為相似度達門檻者，同分時依資料表的 keyset 順序。
+        """
+        terms = q.split()
+        grams = set().union(*(_query_grams(term) for term in terms))
+        hits: Counter = Counter()
+        for gram in grams:
+            hits.update(self.postings.get(gram, ()))
+        threshold = settings.SEARCH_FUZZY_THRESHOLD * len(grams)
+        ranked = []
+        for position, count in hits.items():
+            if count < threshold:
+                continue
+            texts = self.texts[position]
+            contains_all = count == len(grams) and all(any(term in text for text in texts) for term in terms)
+            ranked.append((not contains_all, -count, position))
+        ranked.sort()
+        return [self.ids[position] for _, _, position in ranked]
+
+
+class _Snapshot(NamedTuple):
+    index: InvertedIndex
+    generation: int
+    loaded_at: float
+
+
+class SearchIndexes:
+    """
+    各資料表的 InvertedIndex 快取，查詢前檢查世代號與存活時間，過期時重新載入。
+    同一資料表同時只會有一個請求重建，其他請求等待同一次結果。
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def _fresh(self, table: str) -> Optional[InvertedIndex]:
+        snapshot = self._snapshots.get(table)
+        if snapshot is None:
+            return None
+        if snapshot.generation != response_cache.generation(table):
+            return None
+        if time.monotonic() - snapshot.loaded_at > settings.SEARCH_INDEX_TTL_SECONDS:
+            return None
+        return snapshot.index
+
+    async def get(self, db: DbSession, table: str) -> InvertedIndex:
+        index = self._fresh(table)
+        if index is not None:
+            return index
+        async with self._locks[table]:
+            index = self._fresh(table)
+            if index is not None:
+                return index
+            # 先取世代號再讀資料：讀取期間若有寫入，下一次查詢會再重建
+            generation = response_cache.generation(table)
+            target = SEARCHABLE[table]
+            index = InvertedIndex(await crud_async.get_search_documents(db, target.model, target.columns))
+            self._snapshots[table] = _Snapshot(index, generation, time.monotonic())
+            return index
+
+    def stats(self) -> Dict[str, int]:
+        return {table: len(snapshot.index.ids) for table, snapshot in self._snapshots.items()}
+
+
+search_indexes = SearchIndexes()
+
+
+def _uses_postgres(db: DbSession) -> bool:
+    if settings.SEARCH_BACKEND != "auto":
+        return settings.SEARCH_BACKEND == "postgres"
+    return db.get_bind().dialect.name == "postgresql"
+
+
+async def search_ids(
+        db: DbSession, table: str, q: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+        include_total: bool = True, **filters
+) -> Tuple[List[str], Optional[int]]:
+    """
+    依相關度排序的一頁 id 與總筆數（include_total=False 時為 None）；filters 與列表端點相同。
+    """
+    if cursor:
+        raise HTTPException(status_code=400, detail="cursor cannot be combined with q; use offset instead.")
+    target = SEARCHABLE[table]
+    if _uses_postgres(db):
+        return await crud_async.search_ids(
+            db, target.model, q, skip=skip, limit=limit, include_total=include_total, **filters
+        )
+    ranked = (await search_indexes.get(db, table)).search(q)
+    if ranked and any(value is not None for value in filters.values()):
+        allowed = await crud_async.filter_ids(db, target.model, ranked, **filters)
+        ranked = [id_ for id_ in ranked if id_ in allowed]
+    return ranked[skip:skip + limit], len(ranked) if include_total else None
+
+
+async def search_rows(
+        db: DbSession, table: str, columns, q: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+        include_total: bool = True, **filters
+) -> Tuple[List, Optional[int]]:
+    """
+    與 search_ids 相同，但直接取出指定欄位的資料列（依相關度排序），供 RowSerializer 轉為回應。
+    """
+    ids, total = await search_ids(
+        db, table, q, skip=skip, limit=limit, cursor=cursor, include_total=include_total, **filters
+    )
+    if not ids:
+        return [], total
+    rows = {row.id: row for row in await crud_async.get_rows_by_ids(db, SEARCHABLE[table].model, columns, ids)}
+    return [rows[id_] for id_ in ids if id_ in rows], total
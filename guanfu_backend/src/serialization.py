@@ -0,0 +1,219 @@
+import datetime
+import enum
+import typing
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import orjson
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from pydantic_core import PydanticUndefined
+from starlette.responses import Response
+
+from .pagination import keyset_columns, next_cursor
+
+Converter = Callable[[Any], Any]
+
+# 與 FastAPI 預設 JSONResponse（json.dumps, ensure_ascii=False, 緊湊分隔）及 Pydantic 的日期格式一致
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class FastJSONResponse(Response):
+    """
+    內容已是編碼完成的 JSON bytes，直接輸出，不再經過 response_model 驗證與 json.dumps。
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _to_float(value: Any) -> Any:
+    # Pydantic 的 float 欄位會把整數 / 數字字串轉為 float（例如 23 -> 23.0）
+    if value is None or isinstance(value, float):
+        return value
+    return float(value)
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _enum_value(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _fallback(annotation: Any) -> Converter:
+    # 無法直接對應的型別交給 Pydantic 處理，確保輸出與 response_model 相同
+    adapter = TypeAdapter(annotation)
+    return lambda value: adapter.dump_python(adapter.validate_python(value), mode="json")
+
+
+def _converter(annotation: Any) -> Converter:
+    """
+    依 Pydantic 欄位型別產生轉換函式，輸出與 model_dump(mode="json") 相同的 Python 值。
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Annotated:
+        return _converter(args[0])
+    if origin is typing.Union:
+        non_null = [arg for arg in args if arg is not type(None)]
+        if len(non_null) != 1:
+            return _fallback(annotation)
+        inner = _converter(non_null[0])
+        if inner is _identity:
+            return _identity
+        return lambda value: None if value is None else inner(value)
+    if origin in (list, List):
+        inner = _converter(args[0]) if args else _identity
+        if inner is _identity:
+            return _identity
+        return lambda value: [inner(item) for item in value]
+    if annotation in (str, bool, Any, dict, datetime.datetime):
+        return _identity
+    if annotation is int:
+        return _to_int
+    if annotation is float:
+        return _to_float
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return _enum_value
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _nested_converter(annotation)
+    return _fallback(annotation)
+
+
+def _default(field) -> Any:
+    if field.default is not PydanticUndefined:
+        return field.default
+    if field.default_factory is not None:
+        return field.default_factory()
+    return None
+
+
+def _nested_converter(schema: Type[BaseModel]) -> Converter:
+    """
+    JSONB 內嵌物件（例如 coordinates）：只輸出 schema 宣告的欄位，順序與預設值皆比照 Pydantic。
+    """
+    plan = [(name, _converter(field.annotation), _default(field)) for name, field in schema.model_fields.items()]
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode="json")
+        return {
+            name: convert_field(value[name]) if name in value else default
+            for name, convert_field, default in plan
+        }
+
+    return convert
+
+
+def fields_description(example: str) -> str:
+    """
+    fields 查詢參數的說明；example 須是該資源實際可選的欄位（以逗號分隔）。
+    """
+    return f"只回傳指定欄位（以逗號分隔），例如 {example}；未提供時回傳全部欄位"
+
+
+def parse_fields(
+        fields: Optional[str], model, schema: Type[BaseModel], relationships: Sequence[str] = ()
+) -> Optional[Tuple[str, ...]]:
+    """
+    解析 fields 查詢參數（以逗號分隔）：
+    - 只接受 schema 中同時是資料表欄位的名稱（以及 relationships 指定的關聯），否則回傳 400。
+    - 一律包含 id；回傳值依 schema 欄位順序排列，未提供時回傳 None（全部欄位）。
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    allowed = [name for name in schema.model_fields if name in model.__table__.c or name in relationships]
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in allowed if name in requested)
+
+
+class RowSerializer:
+    """
+    將 Core select() 取得的資料列直接轉為 schema 對應的 dict：
+    - 欄位順序、別名以外的輸出格式與 response_model（from_attributes）序列化結果一致。
+    - schema 中不是資料表欄位的項目（例如統計欄位）輸出其預設值，與讀取 ORM 物件時相同。
+    - fields 指定時只輸出並只 SELECT 這些欄位（稀疏欄位集）。
+    - columns 為需要 SELECT 的欄位，另含 keyset 分頁鍵與 row_version，供 next_cursor 與 ETag 使用。
+    """
+
+    def __init__(self, model, schema: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None):
+        self.model = model
+        self.schema = schema
+        self.fields = fields
+        table_columns = model.__table__.c
+        self.columns = []
+        self._plan: List[Tuple[str, Optional[int], Converter, Any]] = []
+        for name, field in schema.model_fields.items():
+            if fields is not None and name not in fields:
+                continue
+            if name in table_columns:
+                self._plan.append((name, len(self.columns), _converter(field.annotation), None))
+                self.columns.append(table_columns[name])
+            else:
+                self._plan.append((name, None, _identity, _default(field)))
+        for column in (*keyset_columns(model), model.row_version):
+            if column.key not in {c.key for c in self.columns}:
+                self.columns.append(table_columns[column.key])
+
+    @property
+    def field_names(self) -> List[str]:
+        return [name for name, _, _, _ in self._plan]
+
+    def to_dict(self, row: Sequence[Any]) -> Dict[str, Any]:
+        return {
+            name: convert(row[index]) if index is not None else default
+            for name, index, convert, default in self._plan
+        }
+
+    def collection(
+            self, rows: Sequence[Any], total: Optional[int], limit: int, offset: int,
+            headers: Optional[Dict[str, str]] = None, keyset: bool = True,
+    ) -> FastJSONResponse:
+        """
+        組出與 CollectionBase 相同欄位順序的列表回應並以 orjson 編碼。
+        keyset=False（例如依相關度排序的搜尋結果）時不產生 next_cursor。
+        """
+        body = {
+            "totalItems": total,
+            "limit": limit,
+            "offset": offset,
+            "member": [self.to_dict(row) for row in rows],
+            "next_cursor": next_cursor(self.model, rows, limit) if keyset else None,
+        }
+        return FastJSONResponse(orjson.dumps(body, option=_ORJSON_OPTIONS), headers=headers)
+
+    def resource(self, row: Sequence[Any], headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+        return FastJSONResponse(orjson.dumps(self.to_dict(row), option=_ORJSON_OPTIONS), headers=headers)
+
+
+# fields 組合已先經 parse_fields 驗證，快取大小仍設上限以免被任意組合佔滿
+@lru_cache(maxsize=512)
+def row_serializer(model, schema: Type[BaseModel], fields: Optional[Tuple[str, ...]] = None) -> RowSerializer:
+    return RowSerializer(model, schema, fields)
+
+
+@lru_cache(maxsize=512)
+def partial_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    由完整 schema 產生只含 fields 的部分 schema（供含關聯、仍走 ORM 的資源使用，例如供應單）。
+    from_attributes 只會讀取這些欄位，不會觸發其他欄位的延遲載入。
+    """
+    definitions = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    return create_model(
+        f"{schema.__name__}Partial", __config__=ConfigDict(from_attributes=True), **definitions
+    )
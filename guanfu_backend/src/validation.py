@@ -0,0 +1,14 @@
+from typing import Any, Dict, Iterable, List
+
+
+def simplify_errors(errors: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    將 Pydantic 驗證錯誤整理為 {field: [error_message]} 格式，類似 Django REST Framework。
+    全域驗證錯誤處理器與批次端點的逐筆錯誤共用同一格式。
+    """
+    simplified_errors: Dict[str, List[str]] = {}
+    for error in errors:
+        # error['loc'] 是一個元組，例如 ('body', 'status')，我們通常取最後一個作為欄位名
+        field_name = str(error["loc"][-1]) if error["loc"] else "general"
+        simplified_errors.setdefault(field_name, []).append(error["msg"])
+    return simplified_errors
@@ -0,0 +1,35 @@
+from src import models
+from src.cache import response_cache
+
+
+def _insert_items(session_factory, *names):
+    with session_factory() as db:
+        supply = models.Supply(name="光復國小")
+        db.add(supply)
+        db.flush()
+        db.add_all(models.SupplyItem(supply_id=supply.id, total_number=1, tag="food", name=name) for name in names)
+        db.commit()
+
+
+def _suggest(client, prefix):
+    response = client.get("/autocomplete", params={"field": "supply_item.name", "prefix": prefix})
+    assert response.status_code == 200, response.text
+    return [(member["value"], member["count"]) for member in response.json()["member"]]
+
+
+def test_suggests_most_common_values(client, session_factory):
+    _insert_items(session_factory, "礦泉水", "礦泉水", "礦泉水 ", "礦物質", "泡麵")
+
+    assert _suggest(client, "礦") == [("礦泉水", 3), ("礦物質", 1)]
+
+
+def test_reloads_after_generation_changes(client, session_factory):
+    _insert_items(session_factory, "礦泉水")
+    assert _suggest(client, "礦") == [("礦泉水", 1)]
+
+    # 其他 worker 的寫入：資料直接進資料庫，只經由世代號得知資料表有變更
+    _insert_items(session_factory, "礦物質")
+    assert _suggest(client, "礦") == [("礦泉水", 1)]
+    response_cache.invalidate("supply_items")
+
+    assert _suggest(client, "礦") == [("礦泉水", 1), ("礦物質", 1)]
@@ -0,0 +1,101 @@
+import pytest
+
+from src import models
+from src.pagination import encode_cursor
+from src.routers.changes import _server_watermark
+
+from .conftest import both_db_modes
+
+
+@pytest.fixture
+def reports(session_factory):
+    # 依 updated_at 分布在水位線前後：now - 1000 起每筆間隔 100 秒，最後兩筆在未來
+    now = models.current_timestamp_int()
+    with session_factory() as db:
+        rows = [
+            models.Report(name=f"回報 {i}", location_type="road", location_id="x", reason="土石流", status=False,
+                          updated_at=now - 1000 + i * 100)
+            for i in range(12)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return {row.id: row.updated_at for row in rows}
+
+
+def _feed(client, **params):
+    response = client.get("/changes/", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@both_db_modes
+def test_changes_window_between_since_and_watermark(client, reports):
+    body = _feed(client, types="reports")
+
+    watermark = body["watermark"]
+    expected = sorted((updated_at, id_) for id_, updated_at in reports.items() if updated_at <= watermark)
+    assert [(row["updated_at"], row["id"]) for row in body["changes"]["reports"]] == expected
+    assert len(expected) == 10
+    assert (body["has_more"], body["cursor"]) == (False, None)
+    assert set(body["changes"]) == {"reports"}
+
+    since = expected[5][0]
+    later = _feed(client, types="reports", since=since)
+    assert [row["id"] for row in later["changes"]["reports"]] == [id_ for _, id_ in expected[6:]]
+
+
+@both_db_modes
+def test_changes_since_watermark_is_empty(client, reports):
+    watermark = _feed(client, types="reports")["watermark"]
+
+    body = _feed(client, types="reports", since=watermark)
+
+    assert body["changes"]["reports"] == []
+    assert body["watermark"] >= watermark
+
+
+@both_db_modes
+def test_changes_resume_with_cursor(client, reports):
+    pages = [_feed(client, types="reports,shelters", limit=3)]
+    while pages[-1]["has_more"]:
+        pages.append(_feed(client, types="reports,shelters", limit=3, cursor=pages[-1]["cursor"]))
+
+    ids = [row["id"] for page in pages for row in page["changes"]["reports"]]
+    assert len(pages) == 4
+    assert len(ids) == len(set(ids)) == 10
+    # 續取期間水位線固定
+    assert {page["watermark"] for page in pages} == {pages[0]["watermark"]}
+    assert all(page["changes"]["shelters"] == [] for page in pages)
+
+
+def test_changes_unknown_type(client):
+    response = client.get("/changes/", params={"types": "reports,unknown"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage",
+    encode_cursor(["x", {"reports": "y"}]),
+    encode_cursor([1, {"reports": "y"}]),
+    encode_cursor([1, {"reports": [1]}]),
+    encode_cursor([1, {"reports": ["a", "b"]}]),
+    encode_cursor([1, {"reports": [True, "b"]}]),
+    encode_cursor([1, {"reports": [1, 2]}]),
+    encode_cursor([1, {"shelters": None}]),
+    encode_cursor([1, ["reports"]]),
+    encode_cursor([-1, {"reports": None}]),
+    encode_cursor([1.5, {"reports": None}]),
+])
+def test_changes_malformed_cursor_returns_400(client, cursor):
+    response = client.get("/changes/", params={"types": "reports", "cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor."
+
+
+def test_server_watermark_never_decreases(monkeypatch):
+    first = _server_watermark()
+    monkeypatch.setattr("src.routers.changes.current_timestamp_int", lambda: 0)
+
+    assert _server_watermark() == first
@@ -0,0 +1,22 @@
+import pytest
+from pydantic import ValidationError
+
+from src.config import Settings
+
+
+def test_memory_cache_off_by_default():
+    assert Settings().CACHE_ENABLED is False
+
+
+@pytest.mark.parametrize("overrides", [{"CACHE_BACKEND": "redis"}, {"CHANGE_STREAM_ENABLED": True}])
+def test_cache_on_by_default_when_shared(overrides):
+    assert Settings(**overrides).CACHE_ENABLED is True
+
+
+def test_explicitly_disabled_cache_stays_off():
+    assert Settings(CACHE_BACKEND="redis", CACHE_ENABLED=False).CACHE_ENABLED is False
+
+
+def test_memory_cache_without_change_stream_refuses_to_start():
+    with pytest.raises(ValidationError, match="CHANGE_STREAM_ENABLED"):
+        Settings(CACHE_ENABLED=True)
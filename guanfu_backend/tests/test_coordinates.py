@@ -0,0 +1,91 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from src import crud, models
+from src.resources import POINT_FACILITIES
+
+from .conftest import both_db_modes
+
+MIGRATION = Path(__file__).parent.parent / "migrations" / "004_facility_lat_lng.sql"
+
+
+def _shelter(coordinates):
+    return models.Shelter(name="光復國小", location="花蓮縣光復鄉", phone="03-8701234", status="open",
+                          coordinates=coordinates)
+
+
+@pytest.mark.parametrize("coordinates, expected", [
+    ({"lat": 23.66, "lng": 121.42}, (23.66, 121.42)),
+    ({"lat": 23, "lng": 121}, (23.0, 121.0)),
+    ({"lat": "23.66", "lng": 121.42}, (None, 121.42)),
+    ({"lat": True, "lng": None}, (None, None)),
+    ({"lat": 23.66}, (23.66, None)),
+    ({}, (None, None)),
+    (None, (None, None)),
+])
+def test_generated_columns_follow_coordinates(session_factory, coordinates, expected):
+    with session_factory() as db:
+        shelter = _shelter(coordinates)
+        db.add(shelter)
+        db.commit()
+        db.refresh(shelter)
+        assert (shelter.lat, shelter.lng) == expected
+
+
+@both_db_modes
+def test_patch_updates_generated_columns(client, session_factory):
+    response = client.post("/water_refill_stations/", json={
+        "name": "光復車站飲水站", "address": "花蓮縣光復鄉", "water_type": "drinking_water", "opening_hours": "24h",
+        "is_free": True, "status": "active", "accessibility": True, "coordinates": {"lat": 23.66, "lng": 121.42},
+    })
+    assert response.status_code == 201, response.text
+    station = response.json()
+    # lat / lng 只供查詢使用，不是 API 回應的一部分
+    assert "lat" not in station and "lng" not in station
+
+    def stored():
+        with session_factory() as db:
+            row = db.get(models.WaterRefillStation, station["id"])
+            return row.lat, row.lng
+
+    assert stored() == (23.66, 121.42)
+    response = client.patch(f"/water_refill_stations/{station['id']}", json={"coordinates": {"lat": 23.7, "lng": 121.5}})
+    assert response.status_code == 200, response.text
+    assert stored() == (23.7, 121.5)
+
+    response = client.patch(f"/water_refill_stations/{station['id']}", json={"name": "光復車站飲水機"})
+    assert response.status_code == 200, response.text
+    assert stored() == (23.7, 121.5)
+
+
+def test_get_points_skips_missing_and_out_of_range(session_factory):
+    with session_factory() as db:
+        valid = _shelter({"lat": 23.66, "lng": 121.42})
+        db.add_all([
+            valid, _shelter({"lat": "23.66", "lng": 121.42}), _shelter(None),
+            _shelter({"lat": 95.0, "lng": 121.42}), _shelter({"lat": 23.66, "lng": -200}),
+        ])
+        db.commit()
+
+        points = crud.get_points(db, models.Shelter, "location")
+
+    assert [tuple(point) for point in points] == [(valid.id, "光復國小", "open", "花蓮縣光復鄉", 23.66, 121.42)]
+
+
+@pytest.mark.parametrize("table", sorted(POINT_FACILITIES))
+def test_migration_matches_model_columns(table):
+    sql = " ".join(MIGRATION.read_text(encoding="utf-8").split())
+    model_table = POINT_FACILITIES[table].model.__table__
+
+    block = re.search(rf"ALTER TABLE {table} (.*?);", sql).group(1)
+    for name in ("lat", "lng"):
+        expression = " ".join(str(model_table.c[name].computed.sqltext).split())
+        assert (
+            f"ADD COLUMN IF NOT EXISTS {name} DOUBLE PRECISION GENERATED ALWAYS AS ( {expression} ) STORED" in block
+        ), name
+    assert f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_lat_lng ON {table} (lat, lng);" in sql
+    assert [index.name for index in model_table.indexes if [c.name for c in index.columns] == ["lat", "lng"]] == [
+        f"ix_{table}_lat_lng"
+    ]
@@ -0,0 +1,23 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .conftest import both_db_modes
+
+
+@both_db_modes
+def test_routes_use_session_of_db_mode(client, db_mode, monkeypatch):
+    calls = []
+    run_sync = AsyncSession.run_sync
+
+    async def recording_run_sync(self, fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return await run_sync(self, fn, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncSession, "run_sync", recording_run_sync)
+    payload = {"name": "道路中斷", "location_type": "road", "reason": "土石流", "status": False, "location_id": "x"}
+    created = client.post("/reports/", json=payload).json()
+
+    assert client.get("/reports/").json()["totalItems"] == 1
+    assert client.get(f"/reports/{created['id']}").json()["name"] == "道路中斷"
+    # 非同步模式：crud 經由 AsyncSession.run_sync 執行；同步模式交給 threadpool
+    expected = ["create", "get_page_rows", "get_row"] if db_mode == "async" else []
+    assert calls == expected
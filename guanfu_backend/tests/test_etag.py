@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src import models
+from src.cache import response_cache
+
+from .conftest import both_db_modes
+
+pytestmark = both_db_modes
+
+
+def _create_report(client):
+    payload = {"name": "道路中斷", "location_type": "road", "reason": "土石流", "status": False, "location_id": "x"}
+    response = client.post("/reports/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_etag_does_not_depend_on_process_state(client):
+    report = _create_report(client)
+    collection_etag = client.get("/reports/").headers["ETag"]
+    row_etag = client.get(f"/reports/{report['id']}").headers["ETag"]
+
+    # 另一個 worker 的世代號與本 worker 不同，但資料相同時 ETag 也必須相同
+    response_cache.invalidate("reports")
+
+    assert client.get("/reports/").headers["ETag"] == collection_etag
+    assert client.get(f"/reports/{report['id']}").headers["ETag"] == row_etag
+    assert client.get("/reports/", headers={"If-None-Match": collection_etag}).status_code == 304
+
+
+def test_collection_etag_changes_with_data(client):
+    _create_report(client)
+    etag = client.get("/reports/").headers["ETag"]
+
+    _create_report(client)
+
+    assert client.get("/reports/").headers["ETag"] != etag
+    assert client.get("/reports/?limit=5").headers["ETag"] != client.get("/reports/?limit=6").headers["ETag"]
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    # 建立與更新落在同一秒：updated_at 不變，ETag 仍必須改變
+    monkeypatch.setattr(models, "time", SimpleNamespace(time=lambda: 1_759_000_000.0))
+
+
+def _create_shelter(client):
+    payload = {"name": "光復國小", "location": "花蓮縣光復鄉", "phone": "03-8701234", "status": "open"}
+    response = client.post("/shelters/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_patch_in_same_second_changes_etags(client, session_factory, frozen_clock):
+    shelter = _create_shelter(client)
+    detail_url = f"/shelters/{shelter['id']}"
+    detail_etag = client.get(detail_url).headers["ETag"]
+    collection_etag = client.get("/shelters/").headers["ETag"]
+
+    response = client.patch(detail_url, json={"status": "open", "capacity": 80})
+    assert response.status_code == 200, response.text
+    with session_factory() as db:
+        assert db.get(models.Shelter, shelter["id"]).updated_at == 1_759_000_000
+
+    detail = client.get(detail_url, headers={"If-None-Match": detail_etag})
+    assert detail.status_code == 200
+    assert detail.json()["capacity"] == 80
+    collection = client.get("/shelters/", headers={"If-None-Match": collection_etag})
+    assert collection.status_code == 200
+    assert collection.json()["member"][0]["capacity"] == 80
+    assert client.get("/shelters/", headers={"If-None-Match": collection.headers["ETag"]}).status_code == 304
+
+
+def test_item_write_in_same_second_changes_supply_etags(client, frozen_clock):
+    supply = client.post("/supplies/", json={
+        "name": "物資站", "supplies": [{"total_number": 5, "tag": "飲水", "name": "礦泉水", "unit": "箱"}],
+    }).json()
+    item = supply["supplies"][0]
+    detail_etag = client.get(f"/supplies/{supply['id']}").headers["ETag"]
+    collection_etag = client.get("/supplies/").headers["ETag"]
+
+    response = client.patch(f"/supply_items/{item['id']}", json={"valid_pin": supply["valid_pin"], "name": "飲用水"})
+    assert response.status_code == 200, response.text
+
+    assert client.get(f"/supplies/{supply['id']}", headers={"If-None-Match": detail_etag}).status_code == 200
+    collection = client.get("/supplies/", headers={"If-None-Match": collection_etag})
+    assert collection.status_code == 200
+    assert collection.json()["member"][0]["supplies"][0]["name"] == "飲用水"
+
+
+def test_collection_etag_covers_page_membership(client):
+    for _ in range(3):
+        _create_report(client)
+    first_page = client.get("/reports/?limit=2")
+
+    _create_report(client)
+
+    assert client.get("/reports/?limit=2", headers={"If-None-Match": first_page.headers["ETag"]}).status_code == 200
+
+
+def test_list_request_runs_single_query(client):
+    for _ in range(3):
+        _create_report(client)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # 掛在 Engine 類別上，非同步模式的 engine 也會記錄
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/reports/?limit=2")
+        cached = client.get("/reports/?limit=2", headers={"If-None-Match": response.headers["ETag"]})
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert (response.status_code, response.json()["totalItems"], cached.status_code) == (200, 3, 304)
+    assert len(statements) == 2
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import socket
+from types import SimpleNamespace
+
+from src.events import CHANNEL, Broadcaster, ChangeListener
+
+
+def _event(table="supplies", ids=("a",)):
+    return {"table": table, "op": "update", "ids": list(ids), "ts": 1, "origin": "other"}
+
+
+def test_publish_fans_out_to_matching_subscribers_and_handlers():
+    broadcaster = Broadcaster(max_subscribers=10, max_queue=10)
+    everything = broadcaster.subscribe()
+    supplies = broadcaster.subscribe({"supplies"})
+    reports = broadcaster.subscribe({"reports"})
+    seen = []
+    broadcaster.add_handler(lambda event: 1 / 0)  # 處理函式出錯不影響其他處理函式與訂閱者
+    broadcaster.add_handler(seen.append)
+
+    event = _event("supplies")
+    broadcaster.publish(event)
+
+    assert seen == [event]
+    assert everything.queue.get_nowait() == event
+    assert supplies.queue.get_nowait() == event
+    assert reports.queue.empty()
+    assert broadcaster.stats() == {"subscribers": 3, "published": 1, "dropped": 0}
+
+
+def test_subscriber_limit():
+    broadcaster = Broadcaster(max_subscribers=1, max_queue=10)
+    subscription = broadcaster.subscribe()
+    assert broadcaster.subscribe() is None
+
+    broadcaster.unsubscribe(subscription)
+    assert broadcaster.subscribe() is not None
+
+
+def test_overflowing_subscriber_is_evicted():
+    broadcaster = Broadcaster(max_subscribers=10, max_queue=2)
+    slow = broadcaster.subscribe()
+    fast = broadcaster.subscribe()
+
+    for i in range(3):
+        broadcaster.publish(_event(ids=[str(i)]))
+        fast.queue.get_nowait()
+
+    assert slow.overflowed and not fast.overflowed
+    assert broadcaster.subscribers == {fast}
+    assert [slow.queue.get_nowait()["ids"] for _ in range(2)] == [["0"], ["1"]]
+    assert broadcaster.stats() == {"subscribers": 1, "published": 3, "dropped": 1}
+
+    # 已移除的訂閱者不再收到事件，也不重複計入 dropped
+    broadcaster.publish(_event())
+    assert broadcaster.stats()["dropped"] == 1
+    assert fast.queue.qsize() == 1
+
+
+class FakeConnection:
+    """
+    模擬 psycopg2 連線：fileno 取自 socketpair 以便 loop.add_reader 使用，poll 可設定為拋出例外。
+    """
+
+    def __init__(self):
+        self.sock, self.peer = socket.socketpair()
+        self.notifies = []
+        self.executed = []
+        self.closed = False
+        self.fail_poll = False
+
+    def set_isolation_level(self, level):
+        self.isolation_level = level
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                connection.executed.append(sql)
+
+        return Cursor()
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self):
+        if self.fail_poll:
+            raise OSError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+        self.peer.close()
+
+
+class FakeEngine:
+    def __init__(self, failures=0):
+        self.connections = []
+        self.failures = failures
+
+    def raw_connection(self):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("could not connect to server")
+        connection = FakeConnection()
+        self.connections.append(connection)
+        return SimpleNamespace(detach=lambda: None, dbapi_connection=connection)
+
+
+def test_listener_publishes_parsed_notify_payloads():
+    async def scenario():
+        broadcaster = Broadcaster(max_subscribers=10, max_queue=10)
+        subscription = broadcaster.subscribe()
+        listener = ChangeListener(FakeEngine(), broadcaster)
+        listener.start()
+        try:
+            connection = listener._connection
+            assert connection.executed == [f"LISTEN {CHANNEL}"]
+            event = _event("reports", ids=["r1", "r2"])
+            connection.notifies.extend([
+                SimpleNamespace(payload=json.dumps(event)),
+                SimpleNamespace(payload="not json"),  # 無法解析的 payload 直接略過
+                SimpleNamespace(payload=json.dumps(_event("shelters"))),
+            ])
+            listener._on_readable()
+
+            assert connection.notifies == []
+            assert subscription.queue.get_nowait() == event
+            assert subscription.queue.get_nowait()["table"] == "shelters"
+            assert subscription.queue.empty()
+            assert broadcaster.stats()["published"] == 2
+        finally:
+            listener.stop()
+
+    asyncio.run(scenario())
+
+
+def test_listener_reconnects_after_connection_loss():
+    async def scenario():
+        # 第一次重連失敗，之後以退避間隔再試
+        engine = FakeEngine()
+        broadcaster = Broadcaster(max_subscribers=10, max_queue=10)
+        subscription = broadcaster.subscribe()
+        listener = ChangeListener(engine, broadcaster, reconnect_delay=0)
+        listener.start()
+        lost = listener._connection
+        lost.fail_poll = True
+        engine.failures = 1
+
+        listener._on_readable()
+        assert lost.closed and listener._connection is None
+        await asyncio.wait_for(listener._reconnect_task, timeout=1)
+
+        assert len(engine.connections) == 2
+        current = listener._connection
+        assert current is engine.connections[1]
+        assert current.executed == [f"LISTEN {CHANNEL}"]
+
+        # 重連後的連線照常分送事件
+        current.notifies.append(SimpleNamespace(payload=json.dumps(_event())))
+        listener._on_readable()
+        assert subscription.queue.get_nowait() == _event()
+
+        listener.stop()
+        assert current.closed and listener._connection is None
+
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_pending_reconnect():
+    async def scenario():
+        engine = FakeEngine()
+        listener = ChangeListener(engine, Broadcaster(max_subscribers=10, max_queue=10), reconnect_delay=60)
+        listener.start()
+        listener._connection.fail_poll = True
+        listener._on_readable()
+        task = listener._reconnect_task
+
+        listener.stop()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+        assert len(engine.connections) == 1 and listener._connection is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,170 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+
+import pytest
+
+from src.config import settings
+from src.export import _csv_value
+
+from .conftest import both_db_modes
+
+
+@pytest.fixture
+def shelters(client, monkeypatch):
+    # 每批一筆，確保匯出跨越多個 partition
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 1)
+    created = []
+    for name, status, facilities, coordinates in [
+        ("光復國小", "open", ["飲水", "盥洗"], {"lat": 23.66, "lng": 121.42}),
+        ("大進國小", "closed", [], None),
+        ("光復國中", "full", ["床位"], {"lat": 23.67, "lng": 121.43}),
+    ]:
+        response = client.post("/shelters/", json={
+            "name": name, "location": "花蓮縣光復鄉", "phone": "03-8701234", "status": status,
+            "facilities": facilities, "coordinates": coordinates,
+        })
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+    return created
+
+
+def _export(client, path, encoding="identity", **params):
+    response = client.get(path, params=params, headers={"Accept-Encoding": encoding})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _csv_rows(response):
+    text = response.content.decode("utf-8")
+    assert text.startswith("\ufeff")
+    return list(csv.reader(io.StringIO(text[1:])))
+
+
+@both_db_modes
+def test_ndjson_export_matches_list_members(client, shelters):
+    response = _export(client, "/shelters/export")
+
+    assert response.headers["content-type"] == "application/x-ndjson; charset=utf-8"
+    assert response.headers["content-disposition"] == 'attachment; filename="shelters.ndjson"'
+    assert "content-encoding" not in response.headers
+    exported = [json.loads(line) for line in response.content.decode("utf-8").splitlines()]
+    # 與列表相同的欄位與格式，依 (updated_at, id) 排序
+    assert exported == client.get("/shelters/", params={"limit": 10}).json()["member"]
+    assert len(exported) == 3
+
+
+@both_db_modes
+def test_csv_export_header_bom_and_values(client, shelters):
+    response = _export(client, "/shelters/export", format="csv")
+
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"] == 'attachment; filename="shelters.csv"'
+    header, *rows = _csv_rows(response)
+    member = client.get("/shelters/", params={"limit": 10}).json()["member"]
+    assert header == list(member[0])
+    assert len(rows) == 3
+
+    by_name = {row[header.index("name")]: dict(zip(header, row)) for row in rows}
+    assert json.loads(by_name["光復國小"]["facilities"]) == ["飲水", "盥洗"]
+    assert json.loads(by_name["光復國小"]["coordinates"]) == {"lat": 23.66, "lng": 121.42}
+    assert by_name["大進國小"]["facilities"] == "[]"
+    assert by_name["大進國小"]["coordinates"] == ""
+    assert by_name["大進國小"]["capacity"] == ""
+
+
+@both_db_modes
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_gzip_export_decodes_to_identity_body(client, shelters, fmt):
+    plain = _export(client, "/shelters/export", format=fmt)
+    with client.stream("GET", "/shelters/export", params={"format": fmt},
+                       headers={"Accept-Encoding": "gzip"}) as compressed:
+        assert compressed.status_code == 200
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.headers["vary"] == "Accept-Encoding"
+        raw = b"".join(compressed.iter_raw())
+
+    assert raw[:2] == b"\x1f\x8b"
+    assert gzip.decompress(raw) == plain.content
+
+
+@both_db_modes
+@pytest.mark.parametrize("accept_encoding, gzipped", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("GZIP", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0.0, deflate", False),
+    ("br, deflate", False),
+    ("identity", False),
+])
+def test_gzip_negotiation(client, shelters, accept_encoding, gzipped):
+    response = _export(client, "/shelters/export", encoding=accept_encoding)
+
+    assert (response.headers.get("content-encoding") == "gzip") is gzipped
+    assert len(response.content.decode("utf-8").splitlines()) == 3
+
+
+@both_db_modes
+def test_export_applies_filters_and_fields(client, shelters):
+    response = _export(client, "/shelters/export", format="csv", status="closed", fields="id,name,status")
+    header, *rows = _csv_rows(response)
+
+    assert header == ["id", "name", "status"]
+    assert rows == [[shelters[1]["id"], "大進國小", "closed"]]
+
+    # fields 一律包含 id
+    ndjson = _export(client, "/shelters/export", status="open", fields="name,facilities")
+    assert [json.loads(line) for line in ndjson.content.decode("utf-8").splitlines()] == [
+        {"id": shelters[0]["id"], "name": "光復國小", "facilities": ["飲水", "盥洗"]}
+    ]
+
+
+@both_db_modes
+def test_csv_export_bool_filter(client):
+    for name, status in [("道路中斷", True), ("已排除", False)]:
+        response = client.post("/reports/", json={
+            "name": name, "location_type": "road", "location_id": "台9線", "reason": "土石流", "status": status,
+        })
+        assert response.status_code == 201, response.text
+
+    header, *rows = _csv_rows(_export(client, "/reports/export", format="csv", fields="name,status"))
+    assert header == ["id", "name", "status"]
+    assert sorted(row[1:] for row in rows) == [["已排除", "false"], ["道路中斷", "true"]]
+
+    header, *rows = _csv_rows(_export(client, "/reports/export", format="csv", fields="name,status", status="true"))
+    assert [row[1:] for row in rows] == [["道路中斷", "true"]]
+
+
+@both_db_modes
+def test_supplies_csv_export_embeds_items_as_json(client):
+    response = client.post("/supplies/", json={
+        "name": "光復物資站", "address": "花蓮縣光復鄉",
+        "supplies": [{"total_number": 10, "tag": "飲水", "name": "礦泉水", "unit": "箱"}],
+    })
+    assert response.status_code == 201, response.text
+
+    header, *rows = _csv_rows(_export(client, "/supplies/export", format="csv", fields="name,supplies"))
+    assert header == ["id", "name", "supplies"]
+    assert len(rows) == 1 and rows[0][:2] == [response.json()["id"], "光復物資站"]
+    items = json.loads(rows[0][2])
+    assert [(item["name"], item["total_number"], item["received_count"]) for item in items] == [("礦泉水", 10, 0)]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, ""),
+    (True, "true"),
+    (False, "false"),
+    (0, 0),
+    (1.5, 1.5),
+    ("光復", "光復"),
+    (["飲水", "盥洗"], '["飲水","盥洗"]'),
+    ([], "[]"),
+    ({"lat": 23.66, "lng": 121.42}, '{"lat":23.66,"lng":121.42}'),
+    ({"note": '含"引號"'}, '{"note":"含\\"引號\\""}'),
+    (datetime.datetime(2025, 10, 1, 8, 30, tzinfo=datetime.timezone.utc), "2025-10-01T08:30:00Z"),
+])
+def test_csv_value(value, expected):
+    assert _csv_value(value) == expected
@@ -0,0 +1,43 @@
+import re
+
+import pytest
+
+from src.main import app
+
+from .conftest import both_db_modes
+
+
+def _documented_examples():
+    for path, operations in app.openapi()["paths"].items():
+        parameters = operations.get("get", {}).get("parameters", [])
+        for parameter in parameters:
+            match = re.search(r"例如 ([\w,]+)；", parameter.get("description", ""))
+            if parameter["name"] == "fields" and match:
+                yield path.replace("{id}", "missing"), match.group(1)
+
+
+EXAMPLES = list(_documented_examples())
+
+
+def test_every_fields_parameter_has_example():
+    documented = {path for path, _ in EXAMPLES}
+    assert len(documented) == 25
+    assert "/human_resources/" in documented and "/supplies/missing" in documented
+
+
+@both_db_modes
+@pytest.mark.parametrize("path, example", EXAMPLES)
+def test_documented_fields_example_is_accepted(client, path, example):
+    response = client.get(path, params={"fields": example})
+
+    # 單筆端點的 id 不存在：欄位檢查通過後才會回傳 404
+    assert response.status_code == (404 if path.endswith("/missing") else 200), response.text
+    if response.status_code == 200 and not path.endswith("/export"):
+        assert response.json()["member"] == []
+
+
+def test_unknown_field_is_rejected(client):
+    response = client.get("/reports/", params={"fields": "id,coordinates"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: coordinates"
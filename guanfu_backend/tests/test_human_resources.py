@@ -0,0 +1,212 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models
+
+from .conftest import both_db_modes, create_test_engine
+
+
+def _payload(**overrides):
+    return {
+        "org": "光復鄉公所", "address": "花蓮縣光復鄉中正路一段", "phone": "03-8701234", "status": "active",
+        "is_completed": False, "role_name": "搬運志工", "role_type": "general_volunteer",
+        "headcount_need": 5, "headcount_got": 0, "role_status": "pending", "experience_level": "level_1",
+        **overrides,
+    }
+
+
+def _create(client, **overrides):
+    response = client.post("/human_resources/", json=_payload(**overrides))
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _get(client, id_):
+    return client.get(f"/human_resources/{id_}").json()
+
+
+# ---------- 報名 / 取消報名 ----------
+
+@both_db_modes
+def test_signup_and_withdraw_flip_role_status(client):
+    resource = _create(client, headcount_need=3)
+    url = f"/human_resources/{resource['id']}"
+
+    steps = [
+        (client.post(f"{url}/signup"), 1, "partial", False),
+        (client.post(f"{url}/signup", json={"count": 2}), 3, "completed", True),
+        (client.post(f"{url}/withdraw"), 2, "partial", False),
+        (client.post(f"{url}/withdraw", json={"count": 2}), 0, "pending", False),
+    ]
+
+    for response, got, role_status, is_completed in steps:
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert (body["headcount_got"], body["role_status"], body["is_completed"]) == (got, role_status, is_completed)
+    assert _get(client, resource["id"])["headcount_got"] == 0
+
+
+def test_signup_beyond_headcount_need_is_rejected(client):
+    resource = _create(client, headcount_need=2, headcount_got=1, role_status="partial")
+
+    response = client.post(f"/human_resources/{resource['id']}/signup", json={"count": 2})
+
+    assert response.status_code == 400
+    assert _get(client, resource["id"])["headcount_got"] == 1
+
+
+def test_withdraw_below_zero_is_rejected(client):
+    resource = _create(client, headcount_got=1, role_status="partial")
+
+    response = client.post(f"/human_resources/{resource['id']}/withdraw", json={"count": 2})
+
+    assert response.status_code == 400
+    assert _get(client, resource["id"])["headcount_got"] == 1
+
+
+def test_signup_to_cancelled_request_is_rejected(client):
+    resource = _create(client, status="cancelled")
+
+    assert client.post(f"/human_resources/{resource['id']}/signup").status_code == 400
+    assert _get(client, resource["id"])["headcount_got"] == 0
+
+
+@pytest.mark.parametrize("action", ["signup", "withdraw"])
+def test_adjust_missing_request_returns_404(client, action):
+    assert client.post(f"/human_resources/does-not-exist/{action}").status_code == 404
+
+
+@pytest.mark.parametrize("count", [0, -1])
+def test_signup_count_must_be_positive(client, count):
+    resource = _create(client)
+
+    assert client.post(f"/human_resources/{resource['id']}/signup", json={"count": count}).status_code == 422
+
+
+@pytest.fixture
+def concurrent_sessions(tmp_path):
+    # 每個執行緒各自的連線（檔案資料庫），寫入由資料庫序列化，與多個 worker 同時報名相同
+    engine = create_test_engine(f"sqlite:///{tmp_path / 'headcount.db'}", connect_args={"timeout": 60})
+    yield sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    engine.dispose()
+
+
+def _adjust_concurrently(session_factory, id_, deltas):
+    def adjust(delta):
+        with session_factory() as db:
+            return crud.adjust_headcount(db, id_, delta) is not None
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        return list(pool.map(adjust, deltas))
+
+
+def _insert_resource(session_factory, need, got=0):
+    with session_factory() as db:
+        resource = models.HumanResource(**_payload(headcount_need=need, headcount_got=got), valid_pin="123456")
+        db.add(resource)
+        db.commit()
+        return resource.id
+
+
+def _load(session_factory, id_):
+    with session_factory() as db:
+        return db.get(models.HumanResource, id_)
+
+
+def test_concurrent_signups_never_exceed_headcount_need(concurrent_sessions):
+    id_ = _insert_resource(concurrent_sessions, need=50)
+
+    outcomes = _adjust_concurrently(concurrent_sessions, id_, [1] * 300)
+
+    resource = _load(concurrent_sessions, id_)
+    assert outcomes.count(True) == 50
+    assert (resource.headcount_got, resource.role_status, resource.is_completed) == (50, "completed", True)
+
+
+def test_concurrent_signups_and_withdrawals_stay_consistent(concurrent_sessions):
+    id_ = _insert_resource(concurrent_sessions, need=40, got=20)
+    deltas = [1] * 200 + [-1] * 200 + [3] * 50 + [-2] * 50
+    random.Random(13).shuffle(deltas)
+
+    outcomes = _adjust_concurrently(concurrent_sessions, id_, deltas)
+
+    resource = _load(concurrent_sessions, id_)
+    applied = sum(delta for delta, ok in zip(deltas, outcomes) if ok)
+    assert resource.headcount_got == 20 + applied
+    assert 0 <= resource.headcount_got <= 40
+    expected_status = "completed" if resource.headcount_got == 40 else "partial" if resource.headcount_got else "pending"
+    assert resource.role_status == expected_status
+    assert resource.is_completed is (resource.headcount_got == 40)
+
+
+# ---------- 批次建立 ----------
+
+@both_db_modes
+def test_bulk_create_reports_errors_per_item(client):
+    items = [_payload(), _payload(headcount_got=9), {"org": "缺少必填欄位"}, _payload(role_name="醫療人員")]
+
+    response = client.post("/human_resources/bulk", json={"items": items})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    assert [result["status"] for result in body["results"]] == ["created", "error", "error", "created"]
+    assert "headcount_got" in body["results"][1]["errors"]
+    created = [result for result in body["results"] if result["status"] == "created"]
+    for result in created:
+        assert len(result["valid_pin"]) == 6
+        assert _get(client, result["id"])["role_name"] == items[result["index"]]["role_name"]
+    assert client.get("/human_resources/").json()["totalItems"] == 2
+
+
+@both_db_modes
+def test_bulk_create_all_or_nothing_creates_nothing_on_error(client):
+    items = [_payload(), _payload(headcount_got=9)]
+
+    response = client.post("/human_resources/bulk", params={"all_or_nothing": "true"}, json={"items": items})
+
+    assert response.status_code == 400
+    assert response.json()["detail"][0]["index"] == 1
+    assert client.get("/human_resources/").json()["totalItems"] == 0
+
+
+# ---------- 批次更新 ----------
+
+@both_db_modes
+def test_bulk_patch_checks_pin_and_headcount_per_item(client):
+    first = _create(client)
+    second = _create(client)
+    items = [
+        {"id": first["id"], "valid_pin": first["valid_pin"], "shift_notes": "請自備手套"},
+        {"id": second["id"], "valid_pin": "000000" if second["valid_pin"] != "000000" else "111111", "shift_notes": "x"},
+        {"id": "does-not-exist", "valid_pin": "123456"},
+        {"id": first["id"], "valid_pin": first["valid_pin"], "shift_notes": "重複"},
+        {"id": second["id"], "valid_pin": second["valid_pin"], "headcount_got": 9},
+    ]
+
+    response = client.patch("/human_resources/bulk", json={"items": items})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (1, 4)
+    errors = {result["index"]: set(result.get("errors", {})) for result in body["results"]}
+    assert errors == {0: set(), 1: {"valid_pin"}, 2: {"id"}, 3: {"id"}, 4: {"headcount_got"}}
+    assert _get(client, first["id"])["shift_notes"] == "請自備手套"
+    assert _get(client, second["id"])["shift_notes"] is None
+
+
+@both_db_modes
+def test_bulk_patch_all_or_nothing_updates_nothing_on_error(client):
+    resource = _create(client)
+    items = [
+        {"id": resource["id"], "valid_pin": resource["valid_pin"], "shift_notes": "更新"},
+        {"id": "does-not-exist", "valid_pin": "123456"},
+    ]
+
+    response = client.patch("/human_resources/bulk", params={"all_or_nothing": "true"}, json={"items": items})
+
+    assert response.status_code == 400
+    assert _get(client, resource["id"])["shift_notes"] is None
@@ -0,0 +1,369 @@
+"""
+importer 的測試：COPY 需要 PostgreSQL，這裡以 SQLite 的 INSERT ... ON CONFLICT 提供相同合併語意的 loader 取代
+CopyLoader（同一區塊內 id 重複時以最後一列為準、preserve 欄位不覆寫、覆寫時遞增 row_version），
+其餘流程（驗證、分區塊提交、續傳紀錄、錯誤 / 結果報告）照常執行。
+"""
+import csv
+import json
+import sys
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import importer.__main__ as importer_main
+from importer import copy_loader, pipeline, readers
+from importer.copy_loader import CopyLoader
+from importer.pipeline import ImportAborted, run_import
+from importer.readers import iter_records
+from importer.resources import TARGETS
+from src import models
+
+
+class SqliteLoader:
+    """
+    CopyLoader 的替代品；failures 為「第幾次 load（從 1 起算）→ 例外」，寫入後才拋出，確認整個區塊會回滾。
+    """
+    failures = {}
+    calls = 0
+
+    def __init__(self, db, target, columns, on_conflict="update"):
+        self.db = db
+        self.target = target
+        self.columns = list(columns)
+        self.on_conflict = on_conflict
+
+    def setup(self):
+        pass
+
+    def load(self, rows):
+        type(self).calls += 1
+        model = self.target.model
+        latest = {}
+        for _, row in rows:
+            latest.pop(row["id"], None)
+            latest[row["id"]] = row
+        existing = set(self.db.execute(select(model.id).where(model.id.in_(latest))).scalars())
+
+        stmt = sqlite_insert(model.__table__).values([
+            {column: row.get(column) for column in self.columns} for row in latest.values()
+        ])
+        if self.on_conflict == "skip":
+            stmt = stmt.on_conflict_do_nothing(index_elements=["id"])
+        else:
+            assignments = {
+                column: stmt.excluded[column] for column in self.columns if column not in self.target.preserve
+            }
+            assignments["row_version"] = model.__table__.c.row_version + 1
+            stmt = stmt.on_conflict_do_update(index_elements=["id"], set_=assignments)
+        self.db.execute(stmt)
+
+        failure = self.failures.get(self.calls)
+        if failure is not None:
+            raise failure
+
+        inserted = [id_ for id_ in latest if id_ not in existing]
+        updated = [] if self.on_conflict == "skip" else [id_ for id_ in latest if id_ in existing]
+        return inserted, updated
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    monkeypatch.setattr(pipeline, "CopyLoader", SqliteLoader)
+    monkeypatch.setattr(SqliteLoader, "failures", {})
+    monkeypatch.setattr(SqliteLoader, "calls", 0)
+    return SqliteLoader
+
+
+def _report(number, **overrides):
+    return {
+        "id": f"report-{number:02d}", "name": f"回報 {number}", "location_type": "road", "location_id": "台9線",
+        "reason": "土石流", "status": True, **overrides,
+    }
+
+
+def _write_ndjson(path, rows):
+    path.write_text("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def _import(db, target_name, source, **kwargs):
+    return run_import(db, target_name, TARGETS[target_name], source, iter_records(source), **kwargs)
+
+
+def _count(session_factory, model):
+    with session_factory() as db:
+        return db.scalar(select(func.count(model.id)))
+
+
+def test_csv_import_validates_rows_and_writes_reports(tmp_path, session_factory, loader):
+    source = tmp_path / "shelters.csv"
+    rows = [
+        ["name", "location", "phone", "status", "facilities", "coordinates", "capacity"],
+        ["光復國小", "花蓮縣光復鄉", "03-8701234", "open", '["飲水","盥洗"]', '{"lat": 23.66, "lng": 121.42}', "200"],
+        ["大進國小", "花蓮縣光復鄉", "03-8701235", "open", "[飲水", "", ""],
+        ["糖廠", "花蓮縣光復鄉", "", "open", "", "", ""],
+        ["太巴塱", "花蓮縣光復鄉", "03-8701236", "unknown", "", "", ""],
+        ["光復國中", "花蓮縣光復鄉", "03-8701237", "full", "", "", ""],
+    ]
+    with open(source, "w", newline="", encoding="utf-8-sig") as f:
+        csv.writer(f).writerows(rows)
+
+    with session_factory() as db:
+        stats = _import(db, "shelters", source, chunk_size=1, error_path=tmp_path / "errors.csv",
+                        results_path=tmp_path / "results.csv")
+
+    assert (stats.read, stats.invalid, stats.inserted, stats.failed, stats.chunks) == (5, 3, 2, 0, 2)
+    header, *errors = _read_csv(tmp_path / "errors.csv")
+    assert header == ["row", "errors"]
+    assert [(int(row), sorted(json.loads(detail))) for row, detail in errors] == [
+        (2, ["facilities"]), (3, ["phone"]), (4, ["status"])
+    ]
+
+    header, *results = _read_csv(tmp_path / "results.csv")
+    assert header == ["row", "id", "status", "valid_pin"]
+    assert [(row, status) for row, _, status, _ in results] == [("1", "inserted"), ("5", "inserted")]
+    with session_factory() as db:
+        first = db.get(models.Shelter, results[0][1])
+        assert (first.name, first.facilities, first.capacity) == ("光復國小", ["飲水", "盥洗"], 200)
+        assert (first.lat, first.lng) == (23.66, 121.42)
+        assert first.created_at is not None and first.row_version == 1
+
+
+def test_reimport_updates_or_skips_existing_ids(tmp_path, session_factory, loader):
+    source = _write_ndjson(tmp_path / "reports.ndjson", [_report(i) for i in range(1, 4)])
+    with session_factory() as db:
+        assert _import(db, "reports", source).inserted == 3
+        created_at = db.get(models.Report, "report-01").created_at
+
+    # 同一區塊內 id 重複時以最後出現的列為準，結果報告只記錄該列
+    _write_ndjson(source, [
+        _report(1, reason="淹水"), _report(2, reason="坍方"), _report(2, reason="路基流失"), _report(4),
+    ])
+    with session_factory() as db:
+        stats = _import(db, "reports", source, results_path=tmp_path / "results.csv")
+    assert (stats.inserted, stats.updated, stats.unchanged) == (1, 2, 1)
+    assert [row[:3] for row in _read_csv(tmp_path / "results.csv")[1:]] == [
+        ["1", "report-01", "updated"], ["3", "report-02", "updated"], ["4", "report-04", "inserted"]
+    ]
+    with session_factory() as db:
+        report = db.get(models.Report, "report-02")
+        assert (report.reason, report.row_version) == ("路基流失", 2)
+        assert db.get(models.Report, "report-01").created_at == created_at
+
+    _write_ndjson(source, [_report(1, reason="已排除"), _report(5)])
+    with session_factory() as db:
+        stats = _import(db, "reports", source, on_conflict="skip")
+        assert (stats.inserted, stats.updated, stats.unchanged) == (1, 0, 1)
+        assert db.get(models.Report, "report-01").reason == "淹水"
+
+
+def test_human_resource_pins_only_reported_for_new_rows(tmp_path, session_factory, loader):
+    payload = {
+        "org": "光復鄉公所", "address": "花蓮縣光復鄉", "phone": "03-8701234", "status": "active",
+        "is_completed": False, "role_name": "搬運志工", "role_type": "general_volunteer",
+        "headcount_need": 5, "headcount_got": 0, "role_status": "pending", "experience_level": "level_1",
+    }
+    source = _write_ndjson(tmp_path / "hr.ndjson", [
+        {"id": "hr-1", **payload}, {"id": "hr-2", **payload}, {"id": "hr-3", **payload, "headcount_got": 6},
+    ])
+    with session_factory() as db:
+        stats = _import(db, "human_resources", source, results_path=tmp_path / "results.csv",
+                        error_path=tmp_path / "errors.csv")
+    assert (stats.inserted, stats.invalid) == (2, 1)
+    assert json.loads(_read_csv(tmp_path / "errors.csv")[1][1]) == {
+        "headcount_got": ["headcount_got must be less than or equal to headcount_need."]
+    }
+    results = {id_: pin for _, id_, _, pin in _read_csv(tmp_path / "results.csv")[1:]}
+    with session_factory() as db:
+        pins = {id_: db.get(models.HumanResource, id_).valid_pin for id_ in ("hr-1", "hr-2")}
+    assert results == pins and all(pins.values())
+
+    # 既有資料保留原本的 PIN，結果報告不輸出重新匯入時產生的值
+    with session_factory() as db:
+        _import(db, "human_resources", source, results_path=tmp_path / "results.csv")
+        assert {id_: db.get(models.HumanResource, id_).valid_pin for id_ in pins} == pins
+    assert [(id_, status, pin) for _, id_, status, pin in _read_csv(tmp_path / "results.csv")[1:]] == [
+        ("hr-1", "updated", ""), ("hr-2", "updated", "")
+    ]
+
+
+def test_resume_after_failure_midway(tmp_path, session_factory, loader):
+    rows = [_report(i) for i in range(1, 11)]
+    rows[1] = _report(2, status="not a bool")  # 第 2 列驗證失敗
+    source = _write_ndjson(tmp_path / "reports.ndjson", rows)
+    paths = {
+        "checkpoint_path": tmp_path / "checkpoint.json",
+        "error_path": tmp_path / "errors.csv",
+        "results_path": tmp_path / "results.csv",
+    }
+
+    # 每區塊 3 筆有效資料：[1, 3, 4] [5, 6, 7] [8, 9, 10]；第二個區塊寫入後連線中斷
+    loader.failures = {2: OperationalError("COPY", {}, Exception("server closed the connection unexpectedly"))}
+    with session_factory() as db:
+        with pytest.raises(ImportAborted) as aborted:
+            _import(db, "reports", source, chunk_size=3, **paths)
+    assert "server closed the connection" in str(aborted.value)
+    assert (aborted.value.stats.inserted, aborted.value.stats.invalid) == (3, 1)
+    assert json.loads(paths["checkpoint_path"].read_text(encoding="utf-8"))["rows_done"] == 4
+    # 失敗的區塊整個回滾
+    with session_factory() as db:
+        assert sorted(db.scalars(select(models.Report.id))) == ["report-01", "report-03", "report-04"]
+
+    with session_factory() as db:
+        stats = _import(db, "reports", source, chunk_size=3, resume=True, **paths)
+    assert (stats.read, stats.skipped, stats.inserted, stats.invalid) == (10, 4, 6, 0)
+    assert json.loads(paths["checkpoint_path"].read_text(encoding="utf-8"))["rows_done"] == 10
+    assert _count(session_factory, models.Report) == 9
+
+    # 報告於續傳時接續寫入：標題列只有一次，每一列只出現一次
+    errors = _read_csv(paths["error_path"])
+    assert [row[0] for row in errors] == ["row", "2"]
+    results = _read_csv(paths["results_path"])
+    assert results[0] == ["row", "id", "status", "valid_pin"]
+    assert [int(row[0]) for row in results[1:]] == [1, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert {row[2] for row in results[1:]} == {"inserted"}
+
+
+def test_checkpoint_ignored_for_other_source_or_without_resume(tmp_path, session_factory, loader):
+    source = _write_ndjson(tmp_path / "reports.ndjson", [_report(i) for i in range(1, 4)])
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"source": str(tmp_path / "other.ndjson"), "target": "reports", "rows_done": 2}))
+
+    with session_factory() as db:
+        stats = _import(db, "reports", source, checkpoint_path=checkpoint, resume=True)
+    assert (stats.skipped, stats.inserted) == (0, 3)
+
+    with session_factory() as db:
+        stats = _import(db, "reports", source, checkpoint_path=checkpoint, resume=False)
+    assert (stats.skipped, stats.updated) == (0, 3)
+
+
+def test_constraint_error_fails_only_its_chunk(tmp_path, session_factory, loader):
+    source = _write_ndjson(tmp_path / "reports.ndjson", [_report(i) for i in range(1, 7)])
+    loader.failures = {2: IntegrityError("INSERT", {}, Exception("duplicate key value violates unique constraint"))}
+
+    with session_factory() as db:
+        stats = _import(db, "reports", source, chunk_size=2, checkpoint_path=tmp_path / "checkpoint.json",
+                        error_path=tmp_path / "errors.csv")
+
+    assert (stats.inserted, stats.failed, stats.chunks) == (4, 2, 3)
+    assert [(row, json.loads(detail)) for row, detail in _read_csv(tmp_path / "errors.csv")[1:]] == [
+        (str(number), {"general": ["duplicate key value violates unique constraint"]}) for number in (3, 4)
+    ]
+    # 資料錯誤不需重試，續傳紀錄照常前進
+    assert json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))["rows_done"] == 6
+    with session_factory() as db:
+        assert db.get(models.Report, "report-03") is None
+        assert _count(session_factory, models.Report) == 4
+
+
+def test_dry_run_rolls_back_and_writes_no_state(tmp_path, session_factory, loader):
+    source = _write_ndjson(tmp_path / "reports.ndjson", [_report(i) for i in range(1, 5)])
+
+    with session_factory() as db:
+        stats = _import(db, "reports", source, chunk_size=2, dry_run=True,
+                        checkpoint_path=tmp_path / "checkpoint.json", results_path=tmp_path / "results.csv")
+
+    assert stats.inserted == 4
+    assert _count(session_factory, models.Report) == 0
+    assert not (tmp_path / "checkpoint.json").exists()
+    assert not (tmp_path / "results.csv").exists()
+
+
+def test_supply_item_import_refreshes_supply_progress(tmp_path, session_factory, loader):
+    with session_factory() as db:
+        supply = models.Supply(name="光復物資站")
+        db.add(supply)
+        db.commit()
+        supply_id = supply.id
+    source = _write_ndjson(tmp_path / "items.ndjson", [
+        {"supply_id": supply_id, "total_number": 10, "tag": "飲水", "name": "礦泉水", "received_count": 10},
+        {"supply_id": supply_id, "total_number": 5, "tag": "食物", "name": "白米", "received_count": 1},
+    ])
+
+    with session_factory() as db:
+        assert _import(db, "supply_items", source).inserted == 2
+    with session_factory() as db:
+        supply = db.get(models.Supply, supply_id)
+        assert (supply.items_total, supply.items_fulfilled, supply.units_needed, supply.units_received) == (2, 1, 15, 11)
+        assert supply.is_fulfilled is False
+
+
+def test_main_exit_codes_and_default_paths(tmp_path, session_factory, loader, monkeypatch):
+    monkeypatch.setattr(importer_main, "SessionLocal", session_factory)
+    source = _write_ndjson(tmp_path / "reports.ndjson", [_report(1), _report(2, status="x")])
+    monkeypatch.setattr(sys, "argv", ["python -m importer", "reports", str(source)])
+    assert importer_main.main() == 1
+    for suffix in ("checkpoint.json", "errors.csv", "results.csv"):
+        assert (tmp_path / f"reports.ndjson.reports.{suffix}").exists()
+
+    loader.failures = {loader.calls + 1: OperationalError("COPY", {}, Exception("connection lost"))}
+    monkeypatch.setattr(sys, "argv", ["python -m importer", "reports", str(source), "--on-conflict", "skip"])
+    assert importer_main.main() == 2
+
+    _write_ndjson(source, [_report(1)])
+    monkeypatch.setattr(sys, "argv", ["python -m importer", "reports", str(source)])
+    assert importer_main.main() == 0
+
+
+def test_copy_loader_merge_sql(session_factory):
+    target = TARGETS["human_resources"]
+    columns = pipeline.copy_columns(target)
+    assert {"id", "created_at", "updated_at", "valid_pin", "org"} <= set(columns)
+    assert "row_version" not in columns
+
+    with session_factory() as db:
+        update = CopyLoader(db, target, columns).merge_sql
+        skip = CopyLoader(db, target, columns, on_conflict="skip").merge_sql
+
+    assert "ON CONFLICT (id) DO UPDATE SET" in update
+    assert "org = EXCLUDED.org" in update
+    assert "row_version = human_resources.row_version + 1" in update
+    for preserved in ("id", "created_at", "valid_pin"):
+        assert f"{preserved} = EXCLUDED.{preserved}" not in update
+    assert "ON CONFLICT (id) DO NOTHING" in skip
+    assert "row_version" not in skip
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, ""),
+    ("", '""'),
+    (True, "true"),
+    (3, "3"),
+    (1.5, "1.5"),
+    ('含"引號"', '"含""引號"""'),
+    (["飲水"], '"[""飲水""]"'),
+    ({"lat": 23.66}, '"{""lat"": 23.66}"'),
+])
+def test_copy_csv_value(value, expected):
+    assert copy_loader._csv_value(value) == expected
+
+
+def test_readers(tmp_path, monkeypatch):
+    source = tmp_path / "rows.csv"
+    source.write_text("\ufeffname,notes\n光復,\n大進,備註\n", encoding="utf-8")
+    assert list(iter_records(source)) == [(1, {"name": "光復"}), (2, {"name": "大進", "notes": "備註"})]
+
+    ndjson = tmp_path / "rows.ndjson"
+    ndjson.write_text('{"a": 1}\n\n{"a": 2}\n', encoding="utf-8")
+    assert list(iter_records(ndjson)) == [(1, {"a": 1}), (2, {"a": 2})]
+
+    # 讀取緩衝區小於單一元素時，元素跨越多次讀取仍能正確解析
+    monkeypatch.setattr(readers, "_JSON_READ_SIZE", 7)
+    values = [{"name": "光復" * i, "count": 12345 * i, "tags": ["a", "b"]} for i in range(1, 6)]
+    array = tmp_path / "out.json"
+    array.write_text(json.dumps(values, ensure_ascii=False, indent=2), encoding="utf-8")
+    assert list(iter_records(array)) == list(enumerate(values, start=1))
+
+    (tmp_path / "empty.json").write_text("[ ]", encoding="utf-8")
+    assert list(iter_records(tmp_path / "empty.json")) == []
+    (tmp_path / "object.json").write_text('{"a": 1}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_records(tmp_path / "object.json"))
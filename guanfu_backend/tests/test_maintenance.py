@@ -0,0 +1,103 @@
+import sys
+
+import pytest
+from sqlalchemy import update
+
+from src import maintenance, models
+from src.cache import response_cache
+
+PROGRESS = ("items_total", "items_fulfilled", "units_needed", "units_received", "is_fulfilled")
+
+
+@pytest.fixture
+def supplies(client):
+    created = []
+    for name, items in [
+        ("光復物資站", [(10, "礦泉水"), (5, "白米")]),
+        ("大進物資站", [(3, "睡袋")]),
+        ("糖廠物資站", [(4, "口罩")]),
+    ]:
+        response = client.post("/supplies/", json={
+            "name": name, "address": "花蓮縣光復鄉",
+            "supplies": [{"total_number": total, "tag": "物資", "name": item, "unit": "件"} for total, item in items],
+        })
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+    # 大進物資站全部到貨
+    second = created[1]
+    response = client.post(f"/supplies/{second['id']}/distribute", json={
+        "valid_pin": second["valid_pin"],
+        "items": [{"id": second["supplies"][0]["id"], "count": 3}],
+    })
+    assert response.status_code == 200, response.text
+    return [supply["id"] for supply in created]
+
+
+def _progress(session_factory, supply_id):
+    with session_factory() as db:
+        supply = db.get(models.Supply, supply_id)
+        return {name: getattr(supply, name) for name in PROGRESS}, supply.row_version
+
+
+def _repair(monkeypatch, session_factory, batch_size):
+    monkeypatch.setattr(maintenance, "SessionLocal", session_factory)
+    return maintenance.repair_supply_fulfillment(batch_size=batch_size)
+
+
+def test_repair_fixes_only_drifted_supplies(client, supplies, session_factory, monkeypatch):
+    first, second, third = supplies
+    expected = {supply_id: _progress(session_factory, supply_id) for supply_id in supplies}
+    assert expected[first][0] == {
+        "items_total": 2, "items_fulfilled": 0, "units_needed": 15, "units_received": 0, "is_fulfilled": False
+    }
+    assert expected[second][0]["is_fulfilled"] is True
+
+    # 模擬程式以外的修改：直接改寫彙總欄位，以及不經 API 新增物資項目
+    with session_factory() as db:
+        db.execute(update(models.Supply).where(models.Supply.id == first).values(items_total=0, is_fulfilled=True))
+        db.execute(update(models.Supply).where(models.Supply.id == second).values(units_received=0))
+        db.commit()
+        db.add(models.SupplyItem(supply_id=third, total_number=2, tag="物資", name="雨衣", received_count=2))
+        db.commit()
+    drifted = {supply_id: _progress(session_factory, supply_id)[1] for supply_id in supplies}
+    generation = response_cache.generation(models.Supply.__tablename__)
+
+    # 每批 2 筆，涵蓋跨批次的 keyset 續讀
+    assert _repair(monkeypatch, session_factory, batch_size=2) == 3
+
+    assert _progress(session_factory, first)[0] == expected[first][0]
+    assert _progress(session_factory, second)[0] == expected[second][0]
+    assert _progress(session_factory, third)[0] == {
+        "items_total": 2, "items_fulfilled": 1, "units_needed": 6, "units_received": 2, "is_fulfilled": False
+    }
+    assert all(_progress(session_factory, supply_id)[1] == drifted[supply_id] + 1 for supply_id in supplies)
+    assert response_cache.generation(models.Supply.__tablename__) > generation
+
+    # 修復後的狀態立即反映在預設（只列出未全部到貨）的列表
+    listed = client.get("/supplies/").json()["member"]
+    assert sorted(supply["id"] for supply in listed) == sorted([first, third])
+
+
+def test_repair_is_idempotent(client, supplies, session_factory, monkeypatch):
+    before = {supply_id: _progress(session_factory, supply_id) for supply_id in supplies}
+    generation = response_cache.generation(models.Supply.__tablename__)
+
+    assert _repair(monkeypatch, session_factory, batch_size=1) == 0
+
+    # 一致的供應單不更新（row_version、updated_at 不變，回應快取也不失效）
+    assert {supply_id: _progress(session_factory, supply_id) for supply_id in supplies} == before
+    assert response_cache.generation(models.Supply.__tablename__) == generation
+
+
+def test_repair_empty_table(session_factory, monkeypatch):
+    assert _repair(monkeypatch, session_factory, batch_size=500) == 0
+
+
+def test_cli_runs_repair(monkeypatch):
+    calls = []
+    monkeypatch.setattr(maintenance, "repair_supply_fulfillment", lambda batch_size: calls.append(batch_size))
+    monkeypatch.setattr(sys, "argv", ["python -m src.maintenance", "repair-supply-fulfillment", "--batch-size", "50"])
+
+    maintenance.main()
+
+    assert calls == [50]
@@ -0,0 +1,146 @@
+import pytest
+
+from src import models
+from src.config import settings
+from src.geo import CLUSTER_GRID_BITS, tile_bounds, tile_cache, tile_of
+
+from .conftest import both_db_modes
+
+ORIGIN = (23.66, 121.42)
+BBOX = "121.35,23.60,121.55,23.75"
+ZOOM = 12
+
+
+def _cell_center(lat, lng, zoom):
+    min_lat, min_lng, max_lat, max_lng = tile_bounds(zoom, *tile_of(lat, lng, zoom))
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def _restroom(name, lat, lng, status="active"):
+    return models.Restroom(
+        name=name, address="花蓮縣光復鄉", facility_type="mobile_toilet", opening_hours="24h",
+        is_free=True, has_water=True, has_lighting=True, status=status, coordinates={"lat": lat, "lng": lng},
+    )
+
+
+@pytest.fixture
+def pins(session_factory):
+    # 三筆落在 zoom 12 的同一個叢集格子中央附近，一筆在遠處的格子，一筆已關閉，一筆在 bbox 外
+    lat, lng = _cell_center(*ORIGIN, ZOOM + CLUSTER_GRID_BITS)
+    with session_factory() as db:
+        rows = {
+            "a": _restroom("流動廁所 A", lat + 0.001, lng),
+            "b": _restroom("流動廁所 B", lat - 0.001, lng + 0.001),
+            "c": models.Shelter(name="光復國小", location="花蓮縣光復鄉", phone="03-8701234", status="open",
+                                coordinates={"lat": lat, "lng": lng - 0.001}),
+            "far": _restroom("大農流動廁所", lat + 0.05, lng + 0.05),
+            "closed": _restroom("已撤除的廁所", lat, lng, status="closed"),
+            "outside": _restroom("花蓮市區廁所", 23.98, 121.60),
+        }
+        db.add_all(rows.values())
+        db.commit()
+        return {key: row.id for key, row in rows.items()}
+
+
+def _map(client, **params):
+    response = client.get("/map/pins", params={"bbox": BBOX, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("lat, lng, zoom", [
+    (23.66, 121.42, 0), (23.66, 121.42, 12), (23.66, 121.42, 18), (-33.86, 151.21, 10), (0.0, 0.0, 5),
+])
+def test_point_lies_in_its_tile_bounds(lat, lng, zoom):
+    min_lat, min_lng, max_lat, max_lng = tile_bounds(zoom, *tile_of(lat, lng, zoom))
+    assert min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+
+@both_db_modes
+def test_zoomed_in_returns_pins_in_bbox(client, pins):
+    body = _map(client, zoom=settings.MAP_CLUSTER_MAX_ZOOM + 1)
+
+    assert body["clustered"] is False
+    assert body["totalItems"] == 4
+    assert {pin["id"] for pin in body["member"]} == {pins["a"], pins["b"], pins["c"], pins["far"]}
+    assert all(pin["kind"] == "pin" for pin in body["member"])
+
+
+@both_db_modes
+def test_zoomed_out_clusters_nearby_points(client, pins):
+    body = _map(client, zoom=ZOOM)
+
+    assert (body["zoom"], body["clustered"], body["totalItems"]) == (ZOOM, True, 4)
+    clusters = [feature for feature in body["member"] if feature["kind"] == "cluster"]
+    singles = [feature for feature in body["member"] if feature["kind"] == "pin"]
+    assert len(clusters) == 1 and clusters[0]["count"] == 3
+    assert clusters[0]["types"] == {"restrooms": 2, "shelters": 1}
+    min_lng, min_lat, max_lng, max_lat = clusters[0]["bbox"]
+    assert min_lat <= clusters[0]["coordinates"]["lat"] <= max_lat
+    assert min_lng <= clusters[0]["coordinates"]["lng"] <= max_lng
+    # 格子裡只有一筆時直接回傳圖釘
+    assert [pin["id"] for pin in singles] == [pins["far"]]
+
+
+@both_db_modes
+def test_falls_back_to_clusters_past_max_pins(client, pins, monkeypatch):
+    zoom = settings.MAP_CLUSTER_MAX_ZOOM + 2
+    assert _map(client, zoom=zoom)["clustered"] is False
+
+    monkeypatch.setattr(settings, "MAP_MAX_PINS", 3)
+    body = _map(client, zoom=zoom)
+    assert body["clustered"] is True
+    assert body["totalItems"] == 4
+    assert body["zoom"] <= zoom
+
+
+def test_cluster_zoom_coarsens_to_max_tiles(client, pins, monkeypatch):
+    monkeypatch.setattr(settings, "MAP_MAX_TILES", 1)
+    body = _map(client, zoom=ZOOM)
+
+    # bbox 在 zoom 12 跨越多個圖磚，降到單一圖磚的層級
+    assert body["zoom"] < ZOOM
+    x0, y0 = tile_of(23.75, 121.35, body["zoom"])
+    x1, y1 = tile_of(23.60, 121.55, body["zoom"])
+    assert (x0, y0) == (x1, y1)
+    assert body["totalItems"] == 4
+
+
+def test_status_and_types_filters(client, pins):
+    body = _map(client, zoom=settings.MAP_CLUSTER_MAX_ZOOM + 1, types="restrooms", status="active,closed")
+    assert {pin["id"] for pin in body["member"]} == {pins["a"], pins["b"], pins["far"], pins["closed"]}
+
+    body = _map(client, zoom=ZOOM, types="shelters")
+    assert [(feature["kind"], feature["id"]) for feature in body["member"]] == [("pin", pins["c"])]
+
+
+def test_tile_clusters_cached_until_write(client, pins):
+    _map(client, zoom=ZOOM)
+    before = tile_cache.stats()
+    _map(client, zoom=ZOOM)
+    after = tile_cache.stats()
+    assert after["misses"] == before["misses"] and after["hits"] > before["hits"]
+
+    lat, lng = _cell_center(*ORIGIN, ZOOM + CLUSTER_GRID_BITS)
+    response = client.post("/restrooms/", json={
+        "name": "新設流動廁所", "address": "花蓮縣光復鄉", "facility_type": "mobile_toilet", "opening_hours": "24h",
+        "is_free": True, "has_water": True, "has_lighting": True, "status": "active",
+        "coordinates": {"lat": lat, "lng": lng},
+    })
+    assert response.status_code == 201, response.text
+
+    body = _map(client, zoom=ZOOM)
+    assert tile_cache.stats()["misses"] > after["misses"]
+    assert [feature["count"] for feature in body["member"] if feature["kind"] == "cluster"] == [4]
+    assert body["totalItems"] == 5
+
+
+@pytest.mark.parametrize("params", [
+    {"bbox": "121.35,23.60,121.55"},
+    {"bbox": "a,b,c,d"},
+    {"bbox": "121.55,23.60,121.35,23.75"},
+    {"bbox": BBOX, "types": "restrooms,bogus"},
+])
+def test_rejects_invalid_params(client, params):
+    response = client.get("/map/pins", params={"zoom": ZOOM, **params})
+    assert response.status_code == 400
@@ -0,0 +1,20 @@
+import re
+from pathlib import Path
+
+from src import models
+
+MIGRATIONS = sorted((Path(__file__).parent.parent / "migrations").glob("*.sql"))
+
+
+def test_migrations_only_build_final_indexes():
+    # 尚未部署的一系列遷移不應先建立大型索引、再由後續檔案刪除
+    declared = {index.name for table in models.Base.metadata.tables.values() for index in table.indexes}
+    created = set()
+    for path in MIGRATIONS:
+        sql = path.read_text(encoding="utf-8")
+        assert "DROP INDEX" not in sql, path.name
+        created.update(re.findall(r"CREATE INDEX (?:CONCURRENTLY )?IF NOT EXISTS (\w+)", sql))
+
+    assert created
+    assert created <= declared
+
@@ -0,0 +1,164 @@
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src import geo, models
+from src.cache import response_cache
+from src.geo import METERS_PER_DEGREE_LAT, GeoPoint, GridIndex, facility_index, haversine_m
+
+from .conftest import both_db_modes
+
+ORIGIN = (23.66, 121.42)
+
+
+def _offset(north_m=0.0, east_m=0.0):
+    lat, lng = ORIGIN
+    return {
+        "lat": lat + north_m / METERS_PER_DEGREE_LAT,
+        "lng": lng + east_m / (METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))),
+    }
+
+
+def _restroom(name, coordinates, status="active"):
+    return models.Restroom(
+        name=name, address="花蓮縣光復鄉", facility_type="mobile_toilet", opening_hours="24h",
+        is_free=True, has_water=True, has_lighting=True, status=status, coordinates=coordinates,
+    )
+
+
+def _shelter(name, coordinates, status="open"):
+    return models.Shelter(name=name, location="花蓮縣光復鄉", phone="03-8701234", status=status, coordinates=coordinates)
+
+
+@pytest.fixture
+def facilities(session_factory):
+    with session_factory() as db:
+        rows = {
+            "north_100": _restroom("北側流動廁所", _offset(north_m=100)),
+            "east_500": _shelter("光復國小", _offset(east_m=500)),
+            "south_2000": _restroom("南側流動廁所", _offset(north_m=-2000)),
+            "closed_50": _shelter("大進國小", _offset(east_m=-50), status="closed"),
+            "far_5000": _restroom("大農流動廁所", _offset(north_m=5000)),
+        }
+        db.add_all(rows.values())
+        db.commit()
+        return {key: row.id for key, row in rows.items()}
+
+
+def _nearby(client, **params):
+    lat, lng = ORIGIN
+    response = client.get("/nearby/", params={"lat": lat, "lng": lng, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_haversine_m():
+    # 經線上 1 度約 111.2 公里；同一點距離為 0
+    assert haversine_m(23.0, 121.0, 24.0, 121.0) == pytest.approx(METERS_PER_DEGREE_LAT)
+    assert haversine_m(*ORIGIN, *ORIGIN) == 0
+    assert haversine_m(23.66, 121.42, 23.67, 121.43) == pytest.approx(haversine_m(23.67, 121.43, 23.66, 121.42))
+
+
+def test_grid_within_matches_brute_force():
+    rng = random.Random(20250923)
+    points = [
+        GeoPoint("restrooms", str(i), f"p{i}", "active", None,
+                 ORIGIN[0] + rng.uniform(-0.05, 0.05), ORIGIN[1] + rng.uniform(-0.05, 0.05))
+        for i in range(500)
+    ]
+    index = GridIndex(points)
+
+    for radius in (50, 800, 2500, 20000):
+        lat, lng = ORIGIN[0] + rng.uniform(-0.02, 0.02), ORIGIN[1] + rng.uniform(-0.02, 0.02)
+        expected = {point.id for point in points if haversine_m(lat, lng, point.lat, point.lng) <= radius}
+        found = {point.id: distance for distance, point in index.within(lat, lng, radius)}
+        assert set(found) == expected
+        assert all(distance <= radius for distance in found.values())
+
+
+@both_db_modes
+def test_nearby_orders_by_distance_within_radius(client, facilities):
+    body = _nearby(client, radius=3000)
+
+    # 預設只含營運中的據點，半徑外的不列入
+    assert [row["id"] for row in body["member"]] == [
+        facilities["north_100"], facilities["east_500"], facilities["south_2000"]
+    ]
+    assert [row["distance_m"] for row in body["member"]] == pytest.approx([100, 500, 2000], abs=1)
+    assert [row["type"] for row in body["member"]] == ["restrooms", "shelters", "restrooms"]
+    assert body["totalItems"] == 3
+    first = body["member"][0]
+    assert first["address"] == "花蓮縣光復鄉"
+    assert first["coordinates"] == pytest.approx(_offset(north_m=100))
+
+
+@both_db_modes
+def test_nearby_limit_types_and_status(client, facilities):
+    body = _nearby(client, radius=3000, limit=2)
+    assert [row["id"] for row in body["member"]] == [facilities["north_100"], facilities["east_500"]]
+    assert (body["totalItems"], body["limit"]) == (3, 2)
+
+    body = _nearby(client, radius=10000, types="restrooms")
+    assert [row["id"] for row in body["member"]] == [
+        facilities["north_100"], facilities["south_2000"], facilities["far_5000"]
+    ]
+
+    body = _nearby(client, radius=3000, types="shelters", status="open,closed")
+    assert [row["id"] for row in body["member"]] == [facilities["closed_50"], facilities["east_500"]]
+
+
+@both_db_modes
+def test_nearby_rejects_unknown_type(client):
+    lat, lng = ORIGIN
+    response = client.get("/nearby/", params={"lat": lat, "lng": lng, "types": "restrooms,bogus"})
+    assert response.status_code == 400
+    assert "bogus" in response.json()["detail"]
+
+
+def test_index_rebuilds_after_api_write(client, facilities):
+    assert _nearby(client, radius=300)["totalItems"] == 1
+
+    response = client.post("/restrooms/", json={
+        "name": "新設流動廁所", "address": "花蓮縣光復鄉", "facility_type": "mobile_toilet", "opening_hours": "24h",
+        "is_free": True, "has_water": True, "has_lighting": True, "status": "active",
+        "coordinates": _offset(north_m=-200),
+    })
+    assert response.status_code == 201, response.text
+
+    body = _nearby(client, radius=300)
+    assert [row["id"] for row in body["member"]] == [facilities["north_100"], response.json()["id"]]
+
+
+def test_index_invalidated_by_generation_and_ttl(client, facilities, session_factory, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(geo, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(geo.settings, "GEO_INDEX_TTL_SECONDS", 60)
+    assert _nearby(client, radius=300)["totalItems"] == 1
+    first = facility_index._snapshots["restrooms"].index
+
+    # 不經 API 的寫入：世代號與存活時間都未到期前沿用舊索引
+    with session_factory() as db:
+        db.add(_restroom("匯入的流動廁所", _offset(east_m=150)))
+        db.commit()
+    clock[0] += 30
+    assert _nearby(client, radius=300)["totalItems"] == 1
+    assert facility_index._snapshots["restrooms"].index is first
+
+    # 其他 worker 的寫入事件遞增世代號：只重建該資料表
+    shelters = facility_index._snapshots["shelters"].index
+    response_cache.invalidate(models.Restroom.__tablename__)
+    assert _nearby(client, radius=300)["totalItems"] == 2
+    second = facility_index._snapshots["restrooms"].index
+    assert second is not first
+    assert facility_index._snapshots["shelters"].index is shelters
+
+    with session_factory() as db:
+        db.add(_restroom("另一筆匯入", _offset(north_m=-150)))
+        db.commit()
+    clock[0] += 60
+    assert _nearby(client, radius=300)["totalItems"] == 2
+    clock[0] += 1
+    assert _nearby(client, radius=300)["totalItems"] == 3
+    assert facility_index._snapshots["restrooms"].index is not second
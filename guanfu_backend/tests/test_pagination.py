@@ -0,0 +1,130 @@
+import pytest
+
+from src import models
+from src.pagination import encode_cursor
+
+from .conftest import both_db_modes
+
+pytestmark = both_db_modes
+
+
+@pytest.fixture
+def reports(session_factory):
+    # 多筆相同 updated_at 的資料列，確認 (updated_at, id) 游標在同一秒內也不會重複或遺漏
+    with session_factory() as db:
+        rows = [
+            models.Report(name=f"回報 {i}", location_type="road", location_id="x", reason="土石流", status=False,
+                          updated_at=1_759_000_000 + i // 4)
+            for i in range(23)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return sorted(row.id for row in rows)
+
+
+def _walk(client, path, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        ids.extend(item["id"] for item in body["member"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_walks_every_row_once(client, reports):
+    ids, pages = _walk(client, "/reports/", limit=5)
+
+    assert sorted(ids) == reports
+    assert len(ids) == len(set(ids))
+    assert pages == 5
+
+
+def test_cursor_ignores_offset(client, reports):
+    first = client.get("/reports/", params={"limit": 5}).json()
+
+    following = client.get("/reports/", params={"limit": 5, "offset": 100, "cursor": first["next_cursor"]}).json()
+
+    assert len(following["member"]) == 5
+    assert not {item["id"] for item in following["member"]} & {item["id"] for item in first["member"]}
+
+
+def test_cursor_pages_follow_offset_order(client, reports):
+    by_offset = [item["id"] for item in client.get("/reports/", params={"limit": 100}).json()["member"]]
+
+    ids, _ = _walk(client, "/reports/", limit=7)
+
+    assert ids == by_offset
+
+
+def test_full_last_page_ends_with_empty_page(client, reports):
+    # 本頁剛好滿 limit 時無法得知是否還有下一頁，下一頁為空且不再提供 cursor
+    body = client.get("/reports/", params={"limit": 23}).json()
+    assert len(body["member"]) == 23
+
+    last = client.get("/reports/", params={"limit": 23, "cursor": body["next_cursor"]}).json()
+
+    assert last["member"] == []
+    assert last["next_cursor"] is None
+
+
+def test_cursor_without_updated_at(client):
+    for i in range(7):
+        assert client.post("/volunteer_organizations/", json={"organization_name": f"志工隊 {i}"}).status_code == 201
+
+    ids, pages = _walk(client, "/volunteer_organizations/", limit=3)
+
+    assert len(set(ids)) == 7
+    assert pages == 3
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor", "W10", "WzFd",
+    encode_cursor(["x", "y"]),
+    encode_cursor([1759000000, 5]),
+    encode_cursor([True, "id"]),
+    encode_cursor([1.5, "id"]),
+    encode_cursor([2 ** 70, "id"]),
+    encode_cursor([None, "id"]),
+    encode_cursor([[1], {"id": 1}]),
+])
+def test_invalid_cursor_returns_400(client, reports, cursor):
+    response = client.get("/reports/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor."
+
+
+@pytest.mark.parametrize("values", [[1], [None], ["a", "b"]])
+def test_invalid_cursor_without_updated_at_returns_400(client, values):
+    assert client.get("/volunteer_organizations/", params={"cursor": encode_cursor(values)}).status_code == 400
+
+
+def test_total_items_counts_whole_result_on_every_page(client, reports):
+    first = client.get("/reports/", params={"limit": 5}).json()
+    following = client.get("/reports/", params={"limit": 5, "cursor": first["next_cursor"]}).json()
+    by_offset = client.get("/reports/", params={"limit": 5, "offset": 20}).json()
+
+    assert [first["totalItems"], following["totalItems"], by_offset["totalItems"]] == [23, 23, 23]
+    assert len(by_offset["member"]) == 3
+
+
+def test_total_items_past_last_page(client, reports):
+    body = client.get("/reports/", params={"limit": 5, "offset": 50}).json()
+
+    assert body["member"] == []
+    assert body["totalItems"] == 23
+
+
+def test_total_items_of_empty_table(client):
+    assert client.get("/reports/").json()["totalItems"] == 0
+
+
+def test_include_total_false_skips_count(client, reports):
+    body = client.get("/reports/", params={"limit": 5, "include_total": "false"}).json()
+
+    assert body["totalItems"] is None
+    assert len(body["member"]) == 5
@@ -0,0 +1,45 @@
+import re
+from pathlib import Path
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from src.resources import SEARCHABLE
+
+MIGRATION = Path(__file__).parent.parent / "migrations" / "006_search_text_bigm.sql"
+
+
+def _create(client, **overrides):
+    payload = {"name": "光復國小避難所", "location": "花蓮縣光復鄉中正路一段", "phone": "03-8701234", "status": "open",
+               **overrides}
+    response = client.post("/shelters/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+@pytest.mark.parametrize("q", ["光復", "中正", "復國", "光復 中正路", "ＡＢＣ", "abc"])
+def test_short_and_normalized_terms_match(client, q):
+    expected = _create(client, name="ABC光復國小")
+    _create(client, name="鳳林國中", location="花蓮縣鳳林鎮")
+
+    response = client.get("/shelters/", params={"q": q})
+
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()["member"]] == [expected]
+
+
+def test_terms_do_not_match_across_columns(client):
+    _create(client, name="光復國小", location="中正路")
+
+    assert client.get("/shelters/", params={"q": "小中"}).json()["member"] == []
+
+
+@pytest.mark.parametrize("table", sorted(SEARCHABLE))
+def test_migration_matches_model(table):
+    target = SEARCHABLE[table]
+    ddl = str(CreateTable(target.model.__table__).compile(dialect=postgresql.dialect()))
+    expression = re.search(r"search_text TEXT GENERATED ALWAYS AS \((.*)\) STORED", ddl).group(1)
+
+    assert expression in MIGRATION.read_text(encoding="utf-8")
+    assert all(f"coalesce({column}, '')" in expression for column in target.columns)
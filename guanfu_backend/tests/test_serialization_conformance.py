@@ -0,0 +1,196 @@
+"""
+快速序列化（Core select + orjson 的 RowSerializer / FastJSONResponse）與 response_model 的一致性：
+每個資源的列表與單筆端點，回應內容（含欄位順序）必須等於以 Pydantic 從 ORM 物件產生的結果。
+測試資料依 schema 的型別自動產生，涵蓋 Enum、JSONB 內嵌物件（含 schema 未宣告的鍵、整數座標）、
+NULL 值、供應單內嵌的物資項目，以及 fields= 稀疏欄位集。
+"""
+import datetime
+import enum
+import json
+import typing
+
+import pytest
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from sqlalchemy import inspect
+
+from src import models
+from src.main import app
+
+# 列表的預設篩選會隱藏部分資料（例如已全部到貨的供應單），比對時一併列出
+LIST_PARAMS = {"supplies": {"show_fulfilled": "true"}}
+
+
+def _routes():
+    routes = {}
+    for route in app.routes:
+        if isinstance(route, APIRoute) and "GET" in route.methods and route.response_model is not None:
+            routes[route.path] = route.response_model
+    endpoints = []
+    for path, collection in routes.items():
+        namespace = path.strip("/")
+        detail = routes.get(f"/{namespace}/{{id}}")
+        if "/" in namespace or detail is None or "member" not in collection.model_fields:
+            continue
+        member = typing.get_args(collection.model_fields["member"].annotation)[0]
+        endpoints.append((namespace, member, detail))
+    return sorted(endpoints, key=lambda endpoint: endpoint[0])
+
+
+ENDPOINTS = _routes()
+MODELS = {mapper.class_.__tablename__: mapper.class_ for mapper in models.Base.registry.mappers}
+
+
+def _unwrap(annotation):
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin is typing.Annotated:
+            annotation = typing.get_args(annotation)[0]
+        elif origin is typing.Union:
+            annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        else:
+            return annotation
+
+
+def _optional(annotation) -> bool:
+    return typing.get_origin(annotation) is typing.Union and type(None) in typing.get_args(annotation)
+
+
+def _sample(annotation, name: str):
+    annotation = _unwrap(annotation)
+    origin = typing.get_origin(annotation)
+    if origin in (list, typing.List):
+        args = typing.get_args(annotation)
+        return [_sample(args[0], name)] if args else ["項目"]
+    if origin in (dict, typing.Dict) or annotation is dict:
+        return {"說明": "內容", "數量": [1, 2]}
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return list(annotation)[-1].value
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        nested = {key: _sample(field.annotation, key) for key, field in annotation.model_fields.items()}
+        return {**nested, "schema_外的鍵": True}
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return 7
+    if annotation is float:
+        return 23  # JSON 中的整數，float 欄位須輸出 23.0
+    if annotation is datetime.datetime:
+        return datetime.datetime(2025, 10, 1, 12, 30, 15)
+    if annotation is typing.Any:
+        return {"任意": ["值"]}
+    return f"{name} 測試"
+
+
+def _column_sample(column):
+    python_type = column.type.python_type
+    if python_type is dict:
+        return {}
+    return _sample(python_type, column.key)
+
+
+def _insert(db, model, schema, sparse: bool, parents):
+    values = {}
+    for column in model.__table__.columns:
+        if column.primary_key or column.computed is not None:
+            continue
+        field = schema.model_fields.get(column.key)
+        if column.foreign_keys:
+            values[column.key] = parents[next(iter(column.foreign_keys)).column.table.name]
+        elif sparse and column.nullable and (field is None or _optional(field.annotation)):
+            values[column.key] = None
+        elif field is not None:
+            values[column.key] = _sample(field.annotation, column.key)
+        else:
+            values[column.key] = _column_sample(column)
+    row = model(**values)
+    db.add(row)
+    db.flush()
+    return row.id
+
+
+@pytest.fixture
+def dataset(session_factory):
+    """
+    每張資料表一筆完整資料與一筆可為 NULL 的欄位都是 NULL 的資料；回傳 {資料表: [id, ...]}。
+    """
+    ids = {}
+    with session_factory() as db:
+        for sparse in (False, True):
+            parents = {}
+            for table in models.Base.metadata.sorted_tables:
+                model = MODELS[table.name]
+                schema = next((detail for namespace, _, detail in ENDPOINTS if namespace == table.name), None)
+                if schema is None:
+                    continue
+                parents[table.name] = _insert(db, model, schema, sparse, parents)
+                ids.setdefault(table.name, []).append(parents[table.name])
+        db.commit()
+    return ids
+
+
+def _expected(session_factory, namespace, schema, id_, fields=None):
+    with session_factory() as db:
+        body = schema.model_validate(db.get(MODELS[namespace], id_)).model_dump(mode="json")
+    body = json.loads(json.dumps(body))
+    if fields is not None:
+        body = {key: value for key, value in body.items() if key in fields or key == "id"}
+    return body
+
+
+def _assert_same(actual, expected):
+    assert actual == expected
+    # 再比對 JSON 文字：區分 23 與 23.0，並檢查欄位順序
+    assert json.dumps(actual, ensure_ascii=False) == json.dumps(expected, ensure_ascii=False)
+
+
+def _sparse_fields(schema, model):
+    # 每隔一個取 schema 中的資料表欄位（或關聯），並確保包含 JSONB / 內嵌欄位
+    columns = inspect(model).attrs.keys()
+    names = [name for name in schema.model_fields if name in columns]
+    selected = names[1::2] + [name for name in ("coordinates", "supplies") if name in names]
+    return sorted(set(selected), key=names.index)
+
+
+def test_every_resource_is_covered():
+    namespaces = {namespace for namespace, _, _ in ENDPOINTS}
+    assert {"shelters", "supplies", "supply_items", "human_resources", "volunteer_organizations"} <= namespaces
+    assert len(namespaces) == 12
+
+
+@pytest.mark.parametrize("namespace,member,detail", ENDPOINTS, ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_collection_matches_response_model(client, session_factory, dataset, namespace, member, detail):
+    response = client.get(f"/{namespace}/", params={"limit": 100, **LIST_PARAMS.get(namespace, {})})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert list(body) == ["totalItems", "limit", "offset", "member", "next_cursor"]
+    assert sorted(item["id"] for item in body["member"]) == sorted(dataset[namespace])
+    if namespace == "supplies":
+        assert all(len(item["supplies"]) == 1 for item in body["member"])  # 內嵌的物資項目
+    for item in body["member"]:
+        _assert_same(item, _expected(session_factory, namespace, member, item["id"]))
+
+
+@pytest.mark.parametrize("namespace,member,detail", ENDPOINTS, ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_detail_matches_response_model(client, session_factory, dataset, namespace, member, detail):
+    for id_ in dataset[namespace]:
+        response = client.get(f"/{namespace}/{id_}")
+
+        assert response.status_code == 200, response.text
+        _assert_same(response.json(), _expected(session_factory, namespace, detail, id_))
+
+
+@pytest.mark.parametrize("namespace,member,detail", ENDPOINTS, ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_sparse_fields_match_response_model(client, session_factory, dataset, namespace, member, detail):
+    fields = _sparse_fields(detail, MODELS[namespace])
+    params = {"fields": ",".join(fields)}
+
+    listed = client.get(f"/{namespace}/", params={**params, "limit": 100, **LIST_PARAMS.get(namespace, {})})
+    assert listed.status_code == 200, listed.text
+    for item in listed.json()["member"]:
+        _assert_same(item, _expected(session_factory, namespace, member, item["id"], fields))
+    for id_ in dataset[namespace]:
+        response = client.get(f"/{namespace}/{id_}", params=params)
+        assert response.status_code == 200, response.text
+        _assert_same(response.json(), _expected(session_factory, namespace, detail, id_, fields))
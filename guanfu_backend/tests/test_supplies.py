@@ -0,0 +1,163 @@
+import pytest
+
+from src import models
+
+from .conftest import both_db_modes
+
+pytestmark = both_db_modes
+
+
+@pytest.fixture
+def supply(client):
+    response = client.post("/supplies/", json={
+        "name": "光復物資站",
+        "address": "花蓮縣光復鄉",
+        "phone": "0912345678",
+        "supplies": [
+            {"total_number": 10, "tag": "飲水", "name": "礦泉水", "unit": "箱"},
+            {"total_number": 5, "tag": "食物", "name": "白米", "unit": "包"},
+        ],
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _items(supply):
+    return {item["name"]: item for item in supply["supplies"]}
+
+
+def _distribute(client, supply, items, valid_pin=None):
+    return client.post(f"/supplies/{supply['id']}/distribute", json={
+        "valid_pin": supply["valid_pin"] if valid_pin is None else valid_pin,
+        "items": items,
+    })
+
+
+def _received(client, supply):
+    current = client.get(f"/supplies/{supply['id']}").json()
+    return {item["name"]: item["received_count"] for item in current["supplies"]}, current
+
+
+def test_distribute_accumulates_and_merges_duplicates(client, supply):
+    water, rice = _items(supply)["礦泉水"], _items(supply)["白米"]
+
+    response = _distribute(client, supply, [
+        {"id": water["id"], "count": 3},
+        {"id": water["id"], "count": 4},
+        {"id": rice["id"], "count": 5},
+    ])
+
+    assert response.status_code == 200, response.text
+    assert {item["name"]: item["received_count"] for item in response.json()} == {"礦泉水": 7, "白米": 5}
+    received, current = _received(client, supply)
+    assert received == {"礦泉水": 7, "白米": 5}
+    assert current["items_fulfilled"] == 1
+    assert current["units_received"] == 12
+    assert current["is_fulfilled"] is False
+
+    assert _distribute(client, supply, [{"id": water["id"], "count": 3}]).status_code == 200
+    _, current = _received(client, supply)
+    assert current["items_fulfilled"] == 2
+    assert current["is_fulfilled"] is True
+
+
+def test_distribute_over_total_rolls_back_whole_batch(client, supply):
+    water, rice = _items(supply)["礦泉水"], _items(supply)["白米"]
+
+    response = _distribute(client, supply, [{"id": water["id"], "count": 2}, {"id": rice["id"], "count": 6}])
+
+    assert response.status_code == 400
+    assert _received(client, supply)[0] == {"礦泉水": 0, "白米": 0}
+
+
+def test_distribute_item_of_other_supply_rolls_back(client, supply):
+    other = client.post("/supplies/", json={
+        "name": "其他物資站", "supplies": [{"total_number": 3, "tag": "清潔", "name": "手套", "unit": "雙"}],
+    }).json()
+
+    response = _distribute(client, supply, [
+        {"id": _items(supply)["礦泉水"]["id"], "count": 1},
+        {"id": other["supplies"][0]["id"], "count": 1},
+    ])
+
+    assert response.status_code == 400
+    assert _received(client, supply)[0] == {"礦泉水": 0, "白米": 0}
+    assert _received(client, other)[0] == {"手套": 0}
+
+
+def test_distribute_wrong_pin(client, supply):
+    wrong = "000000" if supply["valid_pin"] != "000000" else "111111"
+
+    response = _distribute(client, supply, [{"id": _items(supply)["礦泉水"]["id"], "count": 1}], valid_pin=wrong)
+
+    assert response.status_code == 400
+    assert _received(client, supply)[0]["礦泉水"] == 0
+
+
+def test_distribute_missing_supply(client, supply):
+    response = client.post("/supplies/missing/distribute", json={
+        "valid_pin": supply["valid_pin"], "items": [{"id": _items(supply)["礦泉水"]["id"], "count": 1}],
+    })
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("count", [0, -1])
+def test_distribute_rejects_non_positive_count(client, supply, count):
+    assert _distribute(client, supply, [{"id": _items(supply)["礦泉水"]["id"], "count": count}]).status_code == 422
+
+
+@pytest.fixture
+def supplies_with_items(session_factory):
+    # 項目的建立時間與插入順序相反，確認內嵌依 (created_at, id) 排序而非插入順序
+    with session_factory() as db:
+        created = {}
+        for name, count in [("光復物資站", 5), ("大進物資站", 1), ("糖廠物資站", 0)]:
+            supply = models.Supply(name=name, address="花蓮縣光復鄉", is_fulfilled=False)
+            supply.supplies = [
+                models.SupplyItem(total_number=10, tag="物資", name=f"{name} {i}", created_at=1_759_000_000 - i)
+                for i in range(count)
+            ]
+            db.add(supply)
+            created[name] = supply
+        db.commit()
+        return {
+            name: [item.id for item in sorted(supply.supplies, key=lambda item: (item.created_at, item.id))]
+            for name, supply in created.items()
+        }
+
+
+def _embedded(client, **params):
+    response = client.get("/supplies/", params=params)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return body, {supply["name"]: [item["id"] for item in supply["supplies"]] for supply in body["member"]}
+
+
+def test_embeds_all_items_in_order(client, supplies_with_items):
+    body, embedded = _embedded(client)
+
+    assert embedded == supplies_with_items
+    assert body["totalItems"] == 3
+
+
+@pytest.mark.parametrize("max_items", [1, 2, 5, 6])
+def test_max_items_per_supply_truncates_each_supply(client, supplies_with_items, max_items):
+    body, embedded = _embedded(client, max_items_per_supply=max_items)
+
+    assert embedded == {name: ids[:max_items] for name, ids in supplies_with_items.items()}
+    # 只截斷內嵌的項目，不影響供應單本身的分頁與總數
+    assert body["totalItems"] == 3
+
+
+def test_max_items_per_supply_with_paging(client, supplies_with_items):
+    _, first = _embedded(client, max_items_per_supply=2, limit=2)
+    _, second = _embedded(client, max_items_per_supply=2, limit=2, offset=2)
+
+    assert {**first, **second} == {name: ids[:2] for name, ids in supplies_with_items.items()}
+    assert len(first) == 2 and len(second) == 1
+
+
+@pytest.mark.parametrize("max_items", [0, -1])
+def test_max_items_per_supply_must_be_positive(client, max_items):
+    assert client.get("/supplies/", params={"max_items_per_supply": max_items}).status_code == 422
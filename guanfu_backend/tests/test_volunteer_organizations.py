@@ -0,0 +1,23 @@
+def _create(client, **overrides):
+    payload = {"organization_name": "光復鄉志工隊", "registration_status": "open", **overrides}
+    response = client.post("/volunteer_organizations/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_patch_updates_fields(client):
+    org = _create(client)
+
+    response = client.patch(f"/volunteer_organizations/{org['id']}", json={"registration_status": "closed"})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["registration_status"] == "closed"
+    assert body["organization_name"] == "光復鄉志工隊"
+    assert client.get(f"/volunteer_organizations/{org['id']}").json()["registration_status"] == "closed"
+
+
+def test_patch_missing_returns_404(client):
+    response = client.patch("/volunteer_organizations/does-not-exist", json={"notes": "x"})
+
+    assert response.status_code == 404